@@ -5,6 +5,8 @@ from .exc import GetDataError
 from .exc import MalformedSettingError
 from .setting import Setting
 from .dataset import Dataset
+from .dataset import IndexReader
+from .handle_pool import HandlePool
 from .data_catalog import DataCatalog
 from .data_catalog import DatasetMeta
 from .data_catalog import DatasetMetaStatusEnum
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+Detached background refresh of a dataset's index.
+
+``fts`` must never wait for a rebuild.  When it finds the published index
+stale (:meth:`.Dataset.needs_refresh`) it answers from that index right away
+and calls :func:`spawn_refresh`, which starts::
+
+    python -m afwf_fts_anything.background {dir_root} {name} [--dir-cache DIR]
+
+in its own session (a detached process group on Windows), away from
+Alfred's process.  The child runs :meth:`.Dataset.refresh`; the new
+generation is published atomically when it is done, so the following
+keystrokes see fresh results.  It inherits the caller's interpreter and
+environment, so the package is importable there just as it is for the CLI.
+Requests are throttled per dataset, and a refresh that finds another build
+running simply exits.
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import traceback
+import subprocess
+import typing as T
+from pathlib import Path
+
+from .index_generation import REFRESH_REQUEST_FILENAME
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .dataset import Dataset
+
+REFRESH_THROTTLE = 30
+"""Seconds during which repeated refresh requests for one dataset are ignored."""
+
+if os.name == "nt":  # pragma: no cover
+    # no console, and Ctrl+C in Alfred's process group does not reach the child
+    _DETACH_KWARGS = dict(
+        creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP,
+    )
+else:
+    _DETACH_KWARGS = dict(start_new_session=True)
+
+
+def spawn_refresh(
+    dataset: "Dataset",
+    path_log: Path | None = None,
+    throttle: float = REFRESH_THROTTLE,
+) -> subprocess.Popen | None:
+    """
+    Start a detached process that refreshes *dataset*.
+
+    :param path_log: errors of the child are appended to this file;
+        discarded if ``None``.
+    :param throttle: do nothing if a refresh was requested less than this
+        many seconds ago.
+    :returns: the child process, or ``None`` when throttled.
+    """
+    return spawn_refresh_process(
+        dir_root=dataset.dir_root,
+        name=dataset.name,
+        dir_cache=dataset.dir_cache,
+        path_log=path_log,
+        throttle=throttle,
+    )
+
+
+def spawn_refresh_process(
+    dir_root: Path,
+    name: str,
+    dir_cache: Path | None = None,
+    path_log: Path | None = None,
+    throttle: float = REFRESH_THROTTLE,
+) -> subprocess.Popen | None:
+    """
+    :func:`spawn_refresh` for the dataset *name* in *dir_root*, without a
+    :class:`.Dataset` object — for the CLI, which checks freshness without
+    importing it.
+    """
+    dir_index = dir_root / f"{name}-index"
+    path_request = dir_index / REFRESH_REQUEST_FILENAME
+    try:
+        age = time.time() - path_request.stat().st_mtime
+    except FileNotFoundError:
+        age = None
+    if age is not None and 0 <= age < throttle:
+        return None
+    dir_index.mkdir(parents=True, exist_ok=True)
+    path_request.touch()
+
+    args = [sys.executable, "-m", __name__, str(dir_root), name]
+    if dir_cache is not None:
+        args.extend(["--dir-cache", str(dir_cache)])
+    if path_log is None:
+        stderr = subprocess.DEVNULL
+    else:
+        path_log.parent.mkdir(parents=True, exist_ok=True)
+        stderr = path_log.open("a")
+    try:
+        return subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+            close_fds=True,
+            **_DETACH_KWARGS,
+        )
+    finally:
+        if path_log is not None:
+            stderr.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point of the background process; returns the exit code."""
+    parser = argparse.ArgumentParser(prog=f"python -m {__name__}")
+    parser.add_argument("dir_root", type=Path)
+    parser.add_argument("name")
+    parser.add_argument("--dir-cache", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    from .dataset import Dataset
+
+    dataset = Dataset(name=args.name, dir_root=args.dir_root, dir_cache=args.dir_cache)
+    try:
+        dataset.refresh()
+    except Exception:
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        sys.stderr.write(f"{now} background refresh of {args.name!r} failed:\n")
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""
+Many queries against one dataset, NDJSON in and NDJSON out — the engine of
+``afwf-fts-anything fts-batch``, e.g. for relevance checks over thousands of
+queries without starting one process per query.
+
+Input is one query per line, either a JSON string or a JSON object with a
+``"query"`` and an optional ``"id"`` of any JSON type; blank lines are
+skipped::
+
+    "god father"
+    {"id": 7, "query": "dark knight"}
+
+Output is one JSON object per input line, in input order, with the ``id``
+and ``query`` of the input and either the ``hits`` (``hit.source`` dicts) or
+an ``error`` describing why the line failed::
+
+    {"id": null, "query": "god father", "hits": [{"movie_id": 2, ...}]}
+    {"id": 7, "query": "dark knight", "hits": [...]}
+    {"id": null, "query": null, "error": "invalid input line 3: ..."}
+
+The queries are searched with :meth:`.Dataset.search_many`.  Without a
+thread pool each line is answered as soon as it is read; with one, lines are
+read and answered in chunks of :data:`CHUNK_SIZE`, so results keep streaming
+while memory stays bounded.
+"""
+
+import json
+import itertools
+import typing as T
+from dataclasses import dataclass
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .dataset import Dataset
+
+CHUNK_SIZE = 256
+"""Lines searched together when a thread pool is used."""
+
+
+def parse_line(line: str) -> tuple[T.Any, str]:
+    """Return the ``(id, query)`` of one input line; raise :class:`ValueError`
+    if it is malformed.
+    """
+    value = json.loads(line)
+    if isinstance(value, str):
+        return None, value
+    if isinstance(value, dict) and isinstance(value.get("query"), str):
+        return value.get("id"), value["query"]
+    raise ValueError('expected a JSON string or an object with a string "query"')
+
+
+@dataclass
+class BatchReport:
+    """Outcome of :func:`run_batch`."""
+
+    n_queries: int = 0
+    """Input lines answered, blank lines excluded."""
+    n_failed: int = 0
+    """Lines answered with an ``error``."""
+
+
+def _iter_chunks(lines: T.Iterable[str], size: int) -> T.Iterator[list[tuple[int, str]]]:
+    numbered = ((i, line) for i, line in enumerate(lines, start=1) if line.strip())
+    while True:
+        chunk = list(itertools.islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_results(
+    dataset: "Dataset",
+    lines: T.Iterable[str],
+    limit: int = 20,
+    max_workers: int | None = None,
+) -> T.Iterator[dict[str, T.Any]]:
+    """Yield the output object of every non-blank line of *lines*, see the
+    module docstring.  The parameters are those of :meth:`.Dataset.search_many`.
+    """
+    size = CHUNK_SIZE if max_workers is not None and max_workers > 1 else 1
+    for chunk in _iter_chunks(lines, size):
+        parsed = []
+        for lineno, line in chunk:
+            try:
+                parsed.append(parse_line(line))
+            except ValueError as e:
+                parsed.append(ValueError(f"invalid input line {lineno}: {e}"))
+        queries = [item[1] for item in parsed if not isinstance(item, Exception)]
+        answers = iter(
+            dataset.search_many(
+                queries,
+                limit=limit,
+                max_workers=max_workers,
+                return_exceptions=True,
+            )
+        )
+        for item in parsed:
+            if isinstance(item, Exception):
+                yield {"id": None, "query": None, "error": str(item)}
+                continue
+            id_, query = item
+            answer = next(answers)
+            if isinstance(answer, Exception):
+                yield {"id": id_, "query": query, "error": f"{type(answer).__name__}: {answer}"}
+            else:
+                yield {"id": id_, "query": query, "hits": answer}
+
+
+def run_batch(
+    dataset: "Dataset",
+    lines: T.Iterable[str],
+    out: T.TextIO,
+    limit: int = 20,
+    max_workers: int | None = None,
+) -> BatchReport:
+    """Write the output line of every input line of *lines* to *out* as soon
+    as it is answered, see :func:`iter_results`.
+    """
+    report = BatchReport()
+    for result in iter_results(dataset, lines, limit=limit, max_workers=max_workers):
+        report.n_queries += 1
+        report.n_failed += "error" in result
+        # default=str: datetime values of stored fields
+        out.write(json.dumps(result, ensure_ascii=False, default=str))
+        out.write("\n")
+        out.flush()
+    return report
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+Precomputed answer of the empty query.
+
+An empty Alfred query is searched as ``*``, and it is what the user sees
+first every time the workflow keyword is typed — the most frequent query of
+all.  Its answer only depends on the index and the setting, so it is
+rendered once, when an index generation is published by
+:meth:`.Dataset.build_index` or :meth:`.Dataset.update_index`, and saved as
+finished Script Filter JSON next to the index, one file per action::
+
+    {name}-index/gen-.../
+        browse-open_url.json
+        browse-open_file.json
+
+:func:`read_answer` serves an empty query from that file: one read of the
+``current`` pointer, one hash of the setting file and one small JSON read,
+without importing ``afwf`` or the search engine.  The CLI tries it before the response cache
+(see :mod:`.response_cache`).
+
+A snapshot is only used with the setting file it was rendered with, compared
+by SHA-256.  After an edit of the setting, the next empty query is searched
+normally and :func:`.fts.fts_script_filter` writes the snapshot again.
+
+The "Open error log" item that ends every empty-query answer depends on the
+caller's log file, so the snapshot holds it with :data:`ERROR_LOG_PLACEHOLDER`
+in place of the path, substituted by :func:`read_answer`.
+
+Only the standard library is imported, so the CLI fast path can read it
+cheaply.
+"""
+
+import os
+import json
+import threading
+import typing as T
+from pathlib import Path
+
+from .index_generation import get_current_dir
+from .response_cache import get_setting_hash
+
+SNAPSHOT_VERSION = 1
+"""Bump when the layout of the snapshot files changes."""
+
+ERROR_LOG_PLACEHOLDER = "{path_error_log}"
+"""Stands for the error log path in the snapshot's "Open error log" item."""
+
+
+def get_path_snapshot(dir_generation: Path, action: str) -> Path:
+    """The snapshot of *action* (an :class:`.fts.ActionEnum` value) in an
+    index generation directory.
+    """
+    return dir_generation / f"browse-{action}.json"
+
+
+def write_snapshot(
+    path: Path,
+    setting_hash: str,
+    script_filter: dict[str, T.Any],
+    error_log_item: dict[str, T.Any],
+) -> None:
+    """
+    Atomically write a snapshot to *path*.
+
+    :param setting_hash: :func:`.response_cache.get_setting_hash` of the
+        setting file the answer was rendered with.
+    :param script_filter: the Script Filter dict of the empty query, without
+        the "Open error log" item.
+    :param error_log_item: the "Open error log" item dict, for the path
+        :data:`ERROR_LOG_PLACEHOLDER`.
+    """
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "setting_hash": setting_hash,
+        "script_filter": script_filter,
+        "error_log_item": error_log_item,
+    }
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    path_tmp.write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+    os.replace(path_tmp, path)
+
+
+def load_snapshot(path: Path, setting_hash: str | None) -> dict[str, T.Any] | None:
+    """Return the snapshot at *path*, or ``None`` if there is none for
+    *setting_hash*.
+    """
+    if setting_hash is None:
+        return None
+    try:
+        snapshot = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (
+        snapshot.get("version") != SNAPSHOT_VERSION
+        or snapshot.get("setting_hash") != setting_hash
+    ):
+        return None
+    return snapshot
+
+
+def _substitute(value: T.Any, old: str, new: str) -> T.Any:
+    if isinstance(value, str):
+        return value.replace(old, new)
+    if isinstance(value, dict):
+        return {k: _substitute(v, old, new) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_substitute(v, old, new) for v in value]
+    return value
+
+
+def read_answer(
+    dir_dataset: Path,
+    dataset_name: str,
+    action: str,
+    path_error_log: Path | None = None,
+) -> str | None:
+    """
+    Return the Script Filter JSON of the empty query from the snapshot of the
+    published index generation, or ``None`` if there is no current one.
+
+    Follows the :class:`.Dataset` layout (``{dir_dataset}/{name}-setting.json``
+    and ``{dir_dataset}/{name}-index/``) without importing it.
+
+    :param path_error_log: when given, the "Open error log" item for it is
+        appended, as :func:`.fts.fts_script_filter` does.
+    """
+    dir_generation = get_current_dir(dir_dataset / f"{dataset_name}-index")
+    if dir_generation is None:
+        return None
+    snapshot = load_snapshot(
+        get_path_snapshot(dir_generation, action),
+        get_setting_hash(dir_dataset / f"{dataset_name}-setting.json"),
+    )
+    if snapshot is None:
+        return None
+    script_filter = snapshot["script_filter"]
+    if path_error_log is not None:
+        script_filter["items"].append(
+            _substitute(
+                snapshot["error_log_item"],
+                ERROR_LOG_PLACEHOLDER,
+                str(path_error_log),
+            )
+        )
+    return json.dumps(script_filter, ensure_ascii=False)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+What an index generation was built from, for deciding when it is stale.
+
+Every generation gets a ``build-info.json`` (see :mod:`.index_generation`)
+that records the identity of the data file it indexed — ``mtime`` and size
+for a cheap check on every search, SHA-256 to tell a touched file from a
+changed one — and when the data was last refreshed from ``data_url``.
+
+It also records when the next ``data_url`` refresh is due, so
+:meth:`BuildInfo.needs_refresh` can tell whether the index is stale without
+the setting file; the CLI checks this when it answers from a snapshot or
+the response cache instead of searching.
+"""
+
+import os
+import json
+import time
+import hashlib
+import dataclasses
+from pathlib import Path
+
+BUILD_INFO_FILENAME = "build-info.json"
+"""Name of the build info file inside a generation directory."""
+
+CHUNK_SIZE = 1024 * 1024
+"""Number of bytes read at a time while hashing a data file."""
+
+
+@dataclasses.dataclass
+class BuildInfo:
+    """
+    :param built_at: when the generation was built, epoch seconds.
+    :param refreshed_at: when the data was last downloaded from ``data_url``
+        (or, without a download, read from disk), epoch seconds.
+    :param data_mtime_ns: ``st_mtime_ns`` of the data file that was indexed;
+        ``None`` when the records did not come from the data file.
+    :param data_size: size of that data file in bytes.
+    :param data_sha256: SHA-256 of that data file; ``None`` if unknown, e.g.
+        when the file changed while it was indexed.
+    :param data_file: name of that data file in the dataset directory.
+    :param refresh_due_at: when the data should be downloaded from
+        ``data_url`` again, epoch seconds; ``None`` if never.
+    """
+
+    built_at: float
+    refreshed_at: float
+    data_mtime_ns: int | None = None
+    data_size: int | None = None
+    data_sha256: str | None = None
+    data_file: str | None = None
+    refresh_due_at: float | None = None
+
+    @classmethod
+    def load(cls, dir_generation: Path) -> "BuildInfo | None":
+        """Read the build info of *dir_generation*; ``None`` if missing or unreadable."""
+        try:
+            return cls(**json.loads((dir_generation / BUILD_INFO_FILENAME).read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def dump(self, dir_generation: Path) -> None:
+        """Write the build info into *dir_generation* atomically."""
+        path = dir_generation / BUILD_INFO_FILENAME
+        path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        path_tmp.write_text(json.dumps(dataclasses.asdict(self)))
+        os.replace(path_tmp, path)
+
+    def is_data_changed(self, path_data: Path) -> bool:
+        """``True`` if *path_data* is not the file that was indexed, judged
+        by ``mtime`` and size.  Always ``False`` if no data file was recorded
+        or it is missing.
+        """
+        if self.data_size is None:
+            return False
+        try:
+            st = path_data.stat()
+        except FileNotFoundError:
+            return False
+        return (st.st_mtime_ns, st.st_size) != (self.data_mtime_ns, self.data_size)
+
+    def is_refresh_due(self, refresh_interval: int | None) -> bool:
+        """``True`` if more than *refresh_interval* seconds passed since
+        :attr:`refreshed_at`.
+        """
+        if refresh_interval is None:
+            return False
+        return time.time() - self.refreshed_at >= refresh_interval
+
+    def needs_refresh(self, dir_root: Path) -> bool:
+        """
+        :meth:`.Dataset.needs_refresh` judged only by what this build recorded:
+        ``True`` if the data file in *dir_root* changed or a refresh is due.
+        Needs no setting file, so the CLI can check it without importing the
+        search dependencies.
+        """
+        if self.data_file is not None and self.is_data_changed(dir_root / self.data_file):
+            return True
+        return self.refresh_due_at is not None and time.time() >= self.refresh_due_at
+
+
+def stat_data(path_data: Path) -> tuple[int, int] | None:
+    """``(st_mtime_ns, st_size)`` of *path_data*, or ``None`` if it is missing."""
+    try:
+        st = path_data.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def hash_file(path: Path) -> str:
+    """Hex SHA-256 of the file at *path*."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_build_info(
+    path_data: Path | None,
+    stat_before: tuple[int, int] | None,
+    refreshed_at: float | None = None,
+    refresh_interval: int | None = None,
+) -> BuildInfo:
+    """
+    Describe a build that just indexed *path_data*.
+
+    :param path_data: the data file that was indexed, or ``None`` when the
+        records were passed in directly.
+    :param stat_before: :func:`stat_data` of the file taken *before* it was
+        read; if the file changed since, its hash is not recorded, so the
+        next check rebuilds instead of trusting it.
+    :param refreshed_at: when the data was refreshed; now by default.
+    :param refresh_interval: seconds between ``data_url`` refreshes, if any.
+    """
+    now = time.time()
+    info = BuildInfo(
+        built_at=now,
+        refreshed_at=now if refreshed_at is None else refreshed_at,
+    )
+    if refresh_interval is not None:
+        info.refresh_due_at = info.refreshed_at + refresh_interval
+    if path_data is None or stat_before is None:
+        return info
+    info.data_file = path_data.name
+    info.data_mtime_ns, info.data_size = stat_before
+    digest = hash_file(path_data)
+    if stat_data(path_data) == stat_before:
+        info.data_sha256 = digest
+    return info
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+On-disk manifest of a :class:`.DataCatalog`, so scanning it only parses the
+setting files that changed.
+
+For every dataset, the manifest records the ``mtime`` and size of its setting
+file together with what :meth:`.DataCatalog.scan` reports about it — whether
+the setting is valid, and its ``data_url``.  While the stat of a setting file
+matches the manifest, the recorded answer is reused without reading the
+file; otherwise the setting is loaded (through :mod:`.setting_cache`) and the
+entry replaced.  A scan of an unchanged catalog is thus one directory listing,
+one ``stat`` per dataset and one read of the manifest.
+
+The manifest is a JSON file in ``{dir_cache}/catalog/``, one per catalog
+root, and is only rewritten when an entry changed.
+"""
+
+import os
+import json
+import hashlib
+import dataclasses
+from pathlib import Path
+
+from . import setting_cache
+
+MANIFEST_VERSION = 1
+"""Bump when the manifest layout changes."""
+
+
+@dataclasses.dataclass
+class ManifestEntry:
+    """
+    What is known about one dataset's setting file.
+
+    :param mtime_ns: ``st_mtime_ns`` of the setting file when it was checked.
+    :param size: its size in bytes.
+    :param is_valid: whether it parsed and validated.
+    :param data_url: its ``data_url``, when valid.
+    """
+
+    mtime_ns: int
+    size: int
+    is_valid: bool
+    data_url: str | None = None
+
+
+def get_path_manifest(dir_cache: Path, dir_root: Path) -> Path:
+    """Return the manifest file of the catalog at *dir_root* under *dir_cache*."""
+    key = hashlib.sha256(str(dir_root.absolute()).encode("utf-8")).hexdigest()
+    return dir_cache / "catalog" / f"{key[:16]}.json"
+
+
+def _get_version() -> list[int]:
+    # validation rules travel with the setting cache version
+    return [MANIFEST_VERSION, setting_cache.CACHE_VERSION]
+
+
+def load_manifest(path_manifest: Path) -> dict[str, ManifestEntry]:
+    """Read the manifest at *path_manifest*; empty if missing, unreadable or
+    written by another version.
+    """
+    try:
+        content = json.loads(path_manifest.read_text())
+        if content["version"] != _get_version():
+            return {}
+        return {
+            name: ManifestEntry(**entry)
+            for name, entry in content["datasets"].items()
+        }
+    except Exception:
+        return {}
+
+
+def dump_manifest(path_manifest: Path, entries: dict[str, ManifestEntry]) -> None:
+    """Write *entries* to *path_manifest* atomically."""
+    content = {
+        "version": _get_version(),
+        "datasets": {
+            name: dataclasses.asdict(entry)
+            for name, entry in sorted(entries.items())
+        },
+    }
+    path_manifest.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path_manifest.with_name(f"{path_manifest.name}.{os.getpid()}.tmp")
+    path_tmp.write_text(json.dumps(content, indent=1))
+    os.replace(path_tmp, path_manifest)
+
+
+def check_setting(
+    path_setting: Path,
+    dir_cache: Path | None,
+    entry: ManifestEntry | None,
+) -> ManifestEntry | None:
+    """
+    Return the manifest entry for the setting file at *path_setting*: *entry*
+    itself while the file's stat matches it, else a freshly checked one.
+    ``None`` if the file does not exist.
+    """
+    try:
+        st = path_setting.stat()
+    except FileNotFoundError:
+        return None
+    if (
+        entry is not None
+        and entry.mtime_ns == st.st_mtime_ns
+        and entry.size == st.st_size
+    ):
+        return entry
+    try:
+        setting = setting_cache.load_setting(path_setting, dir_cache)
+    except Exception:
+        return ManifestEntry(mtime_ns=st.st_mtime_ns, size=st.st_size, is_valid=False)
+    return ManifestEntry(
+        mtime_ns=st.st_mtime_ns,
+        size=st.st_size,
+        is_valid=True,
+        data_url=setting.data_url,
+    )
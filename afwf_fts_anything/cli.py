@@ -6,54 +6,83 @@ CLI entry points for the ``afwf-fts-anything`` Alfred workflow.
 This module is the wiring layer only: it hard-codes the project-home paths from
 :mod:`.paths` and delegates all logic to :mod:`.fts`, :mod:`.data_catalog`, and
 :class:`.Dataset`.  :class:`Command` exposes the subcommands via ``fire.Fire``.
+
+Alfred runs ``afwf-fts-anything fts ...`` once per keystroke, so importing
+this module must stay cheap: only the standard library, :mod:`.paths`, the
+:mod:`.daemon` client, :mod:`.response_cache`, :mod:`.browse_snapshot`,
+:mod:`.profiling`, :mod:`.build_info` and :mod:`.index_generation` are
+imported at module level.  Every subcommand imports what it needs when it
+runs, and :func:`main` parses the ``fts`` arguments with
+:func:`parse_fts_argv` instead of going through ``fire``.
 """
 
 import sys
-import shutil
-from pathlib import Path
-
-import fire
-import afwf.api as afwf
-import afwf.opt.fuzzy_item.api as fuzzy_item
+import json
+import functools
+import typing as T
 
-from .data_catalog import DataCatalog
 from .paths import path_enum
-from . import fts as fts_mod
-from .fts import ActionEnum
+from . import daemon as daemon_mod
+from . import response_cache as response_cache_mod
+from . import browse_snapshot
+from . import profiling
+from . import build_info
+from .index_generation import get_current_dir
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    import afwf.api as afwf
+    from .fts import ActionEnum
+    from .data_catalog import RebuildReport
+    from .batch import BatchReport
+
+
+def _log_error(func: T.Callable) -> T.Callable:
+    """
+    Same as ``afwf.log_error(log_file=path_enum.path_error_log, tb_limit=10)``,
+    but ``afwf`` (and :mod:`logging`) is only imported when the wrapped
+    function actually runs.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        from afwf.decorator import log_error
+
+        decorator = log_error(log_file=path_enum.path_error_log, tb_limit=10)
+        return decorator(func)(*args, **kwargs)
 
-_log_error = afwf.log_error(
-    log_file=path_enum.path_error_log,
-    tb_limit=10,
-)
+    return wrapper
 
 
 @_log_error
 def fts(
     dataset_name: str,
     query: str,
-    action: ActionEnum = ActionEnum.open_url,
-) -> afwf.ScriptFilter:
+    action: "ActionEnum | str" = "open_url",
+) -> "afwf.ScriptFilter":
     """
-    Thin wrapper around :func:`.fts_mod.fts` that supplies the project-home
-    paths and wraps the result in a :class:`afwf.ScriptFilter`.
+    Thin wrapper around :func:`.fts_mod.fts_script_filter` that supplies the
+    project-home paths.
 
     Query normalisation (bool → empty string) is handled by :meth:`Command.fts`
     before this is called.
     """
-    items = fts_mod.fts(
+    with profiling.phase("import"):
+        from . import fts as fts_mod
+
+    return fts_mod.fts_script_filter(
         dataset_name=dataset_name,
         query=query,
         dir_datacatalog_root=path_enum.dir_project_home,
-        action=action,
+        action=fts_mod.ActionEnum(action),
         path_error_log=path_enum.path_error_log,
+        dir_cache=path_enum.dir_cache,
     )
-    return afwf.ScriptFilter(items=items)
 
 
 @_log_error
 def list_datasets_for_reset(
     dataset_name_query: str,
-) -> afwf.ScriptFilter:
+) -> "afwf.ScriptFilter":
     """
     Enumerate all valid datasets in the project home and optionally fuzzy-filter
     them.  Each item's action triggers ``rebuild-index`` for that dataset.
@@ -62,7 +91,17 @@ def list_datasets_for_reset(
     files are skipped.  Falls back to the full list when fuzzy matching yields no
     results.
     """
-    catalog = DataCatalog(dir_root=path_enum.dir_project_home)
+    from pathlib import Path
+
+    import afwf.api as afwf
+    import afwf.opt.fuzzy_item.api as fuzzy_item
+
+    from .data_catalog import DataCatalog
+
+    catalog = DataCatalog(
+        dir_root=path_enum.dir_project_home,
+        dir_cache=path_enum.dir_cache,
+    )
     bin_cli = Path(sys.executable).parent / "afwf-fts-anything"
 
     items = []
@@ -70,11 +109,9 @@ def list_datasets_for_reset(
         if not meta.is_valid:
             # skip datasets whose setting file is malformed
             continue
-        dataset = catalog.get_dataset(meta.name)
-        setting = dataset.get_setting()
         subtitle = (
-            f"data_url: {setting.data_url}"
-            if setting.data_url
+            f"data_url: {meta.data_url}"
+            if meta.data_url
             else "local data only (no data_url)"
         )
         item = fuzzy_item.Item(title=meta.name, subtitle=subtitle)
@@ -119,6 +156,8 @@ def setup_sample_data() -> None:
 
     All existing files in the destination are overwritten.
     """
+    import shutil
+
     src_dir = path_enum.dir_package_test_data_movie
     dest_dir = path_enum.dir_project_home / "movie"
     dest_icons_dir = dest_dir / "icons"
@@ -139,24 +178,329 @@ def rebuild_index(
     dataset_name: str,
 ) -> None:
     """
-    Destroy and recreate the tantivy index for *dataset_name*.
-
-    Uses :class:`.DataCatalog` to locate the dataset under the project home,
-    removes the existing index directory, optionally re-downloads the source
-    data, then rebuilds the index.
+    Bring the tantivy index for *dataset_name* up to date with its data.
+
+    Uses :class:`.DataCatalog` to locate the dataset under the project home
+    and re-downloads the source data when ``data_url`` is set (see
+    :meth:`.Dataset.sync`); if the server reports it as not modified, nothing
+    is reindexed.  When the setting defines a
+    ``primary_key``, only the added, changed and removed records are applied
+    (see :meth:`.Dataset.update_index`); otherwise the index is rebuilt from
+    scratch.  Either way the new index is published atomically, so ``fts``
+    keeps answering from the previous one meanwhile.  The counts are printed.
     """
-    catalog = DataCatalog(dir_root=path_enum.dir_project_home)
+    from .data_catalog import DataCatalog
+
+    catalog = DataCatalog(
+        dir_root=path_enum.dir_project_home,
+        dir_cache=path_enum.dir_cache,
+    )
     dataset = catalog.get_dataset(dataset_name)
+    # re-download first so the index reflects the latest remote data
+    result = dataset.sync()
+    print(f"{dataset_name}: {'not modified' if result is None else result}")
 
-    if dataset.dir_index.exists():
-        # remove the stale index so build_index starts from scratch
-        shutil.rmtree(dataset.dir_index)
 
-    if dataset.setting.data_url:
-        # re-download before rebuilding so the index reflects the latest remote data
-        dataset.download_data()
+@_log_error
+def rebuild_all(
+    max_workers: int | None = None,
+) -> list["RebuildReport"]:
+    """
+    Bring the index of every dataset in the project home up to date, like
+    :func:`rebuild_index`, with up to *max_workers* datasets in parallel
+    (see :meth:`.DataCatalog.rebuild_all`).
 
-    dataset.build_index()
+    Prints one line per dataset as it finishes, then a summary.  Exits with
+    status 1 if any dataset failed.
+    """
+    import time
+
+    from .data_catalog import DataCatalog
+
+    catalog = DataCatalog(
+        dir_root=path_enum.dir_project_home,
+        dir_cache=path_enum.dir_cache,
+    )
+    start = time.perf_counter()
+    reports = catalog.rebuild_all(
+        max_workers=max_workers,
+        callback=lambda report: print(report, flush=True),
+    )
+    n_failed = sum(not report.ok for report in reports)
+    print(
+        f"rebuilt {len(reports) - n_failed} of {len(reports)} datasets "
+        f"in {time.perf_counter() - start:.2f}s, {n_failed} failed"
+    )
+    if n_failed:
+        sys.exit(1)
+    return reports
+
+
+@_log_error
+def fts_batch(
+    dataset_name: str,
+    limit: int = 20,
+    max_workers: int | None = None,
+) -> "BatchReport":
+    """
+    Search *dataset_name* for every query read from stdin as NDJSON and
+    stream the results to stdout as NDJSON, see :mod:`.batch`.
+
+    The index is opened once for the whole run; with *max_workers*, queries
+    are searched by that many threads.  A summary is printed to stderr.
+    """
+    import time
+
+    from .data_catalog import DataCatalog
+    from .handle_pool import HandlePool
+    from .batch import run_batch
+
+    start = time.perf_counter()
+    with DataCatalog(
+        dir_root=path_enum.dir_project_home,
+        dir_cache=path_enum.dir_cache,
+        handle_pool=HandlePool(max_open=1),
+    ) as catalog:
+        report = run_batch(
+            catalog.get_dataset(dataset_name),
+            sys.stdin,
+            sys.stdout,
+            limit=limit,
+            max_workers=max_workers,
+        )
+    print(
+        f"{report.n_queries} queries in {time.perf_counter() - start:.2f}s, "
+        f"{report.n_failed} failed",
+        file=sys.stderr,
+    )
+    return report
+
+
+def run_daemon() -> None:  # pragma: no cover
+    """
+    Run the resident search daemon in the foreground.
+
+    While it is running, ``fts`` forwards each query to it over
+    :attr:`~.paths.PathEnum.path_daemon_socket` instead of importing
+    dependencies and opening the index itself.  See :mod:`.daemon`.
+    """
+    daemon_mod.serve(
+        path_socket=path_enum.path_daemon_socket,
+        dir_datacatalog_root=path_enum.dir_project_home,
+        path_error_log=path_enum.path_error_log,
+        dir_cache=path_enum.dir_cache,
+    )
+
+
+def serve(
+    host: str | None = None,
+    port: int | None = None,
+    max_workers: int | None = None,
+) -> None:  # pragma: no cover
+    """
+    Run the local JSON-over-HTTP search server in the foreground, serving
+    the datasets of the project home to other local tools.  See :mod:`.server`.
+    """
+    from . import server as server_mod
+
+    server_mod.serve(
+        dir_datacatalog_root=path_enum.dir_project_home,
+        dir_cache=path_enum.dir_cache,
+        host=server_mod.DEFAULT_HOST if host is None else host,
+        port=server_mod.DEFAULT_PORT if port is None else port,
+        max_workers=server_mod.DEFAULT_MAX_WORKERS if max_workers is None else max_workers,
+    )
+
+
+def stop_daemon() -> None:
+    """Ask a running daemon to shut down."""
+    if daemon_mod.stop(path_enum.path_daemon_socket):
+        print("daemon stopped")
+    else:
+        print("daemon is not running")
+
+
+_ACTIONS = ("open_url", "open_file")  # values of fts.ActionEnum
+
+
+def run_fts(
+    dataset_name: str,
+    query: str,
+    action: str = "open_url",
+    profile: str | None = None,
+) -> None:
+    """
+    Answer one ``fts`` Script Filter call and write the JSON to stdout.
+
+    The query is normalized with :func:`.response_cache.normalize_query`,
+    then answered from the first source that has it:
+
+    1. for the empty query, the precomputed answer saved with the index (see
+       :mod:`.browse_snapshot`);
+    2. the on-disk response cache (see :mod:`.response_cache`);
+    3. the resident daemon, when it is running;
+    4. the in-process :func:`fts` — the only point where the search
+       dependencies get imported.
+
+    Answers from 3 and 4 are stored in the response cache once the dataset
+    has an index generation, unless the search failed.  Answers from 1 and 2
+    skip the freshness check of the search, so it is done here instead (see
+    :meth:`.build_info.BuildInfo.needs_refresh`): a stale index still answers,
+    and a background refresh is started.
+
+    :param profile: the ``--profile`` flag; when given (or when the
+        ``AFWF_FTS_PROFILE`` environment variable is set), the phase timings
+        of this call are recorded, see :mod:`.profiling`.
+    """
+    if action not in _ACTIONS:
+        raise ValueError(f"Unsupported action: {action!r}")
+    top_n = profiling.get_top_n(profile)
+    if top_n is None:
+        _answer_fts(dataset_name, query, action)
+        return
+    with profiling.profile_invocation(
+        path_enum.dir_cache,
+        top_n,
+        dataset=dataset_name,
+        query=query,
+        action=action,
+    ) as record:
+        record["source"] = _answer_fts(dataset_name, query, action)
+
+
+def _answer_fts(dataset_name: str, query: str, action: str) -> str:
+    # the body of run_fts; returns where the answer came from
+    query = response_cache_mod.normalize_query(query)
+    if not query:
+        with profiling.phase("snapshot"):
+            answer = browse_snapshot.read_answer(
+                dir_dataset=path_enum.dir_project_home / dataset_name,
+                dataset_name=dataset_name,
+                action=action,
+                path_error_log=path_enum.path_error_log,
+            )
+        if answer is not None:
+            with profiling.phase("output"):
+                sys.stdout.write(answer)
+                sys.stdout.flush()
+            _refresh_if_stale(dataset_name)
+            return "snapshot"
+    source = "cache"
+    with profiling.phase("response_cache"):
+        key = response_cache_mod.make_key(
+            dir_dataset=path_enum.dir_project_home / dataset_name,
+            dataset_name=dataset_name,
+            query=query,
+            action=action,
+        )
+    with response_cache_mod.ResponseCache(path_enum.dir_cache) as response_cache:
+        with profiling.phase("response_cache"):
+            answer = None if key is None else response_cache.get(key)
+        if answer is None:
+            source = "daemon"
+            with profiling.phase("daemon"):
+                answer = daemon_mod.request_fts(
+                    path_socket=path_enum.path_daemon_socket,
+                    dataset_name=dataset_name,
+                    query=query,
+                    action=action,
+                )
+        else:
+            key = None  # cache hit, nothing to store
+        if answer is None:
+            source = "search"
+            sf = fts(
+                dataset_name=dataset_name,
+                query=query,
+                action=action,
+            )
+            from .fts import FailedScriptFilter
+
+            if isinstance(sf, FailedScriptFilter):
+                key = None  # try again on the next keystroke
+            with profiling.phase("output"):
+                answer = json.dumps(sf.to_script_filter(), ensure_ascii=False)
+        with profiling.phase("output"):
+            sys.stdout.write(answer)
+            sys.stdout.flush()
+        if key is not None:
+            with profiling.phase("response_cache"):
+                response_cache.set(key, dataset_name, answer)
+    if source == "cache":
+        _refresh_if_stale(dataset_name)
+    return source
+
+
+def _refresh_if_stale(dataset_name: str) -> None:
+    # the stale-while-revalidate check of fts_script_filter, for answers that
+    # did not search: only the build info and one stat, no setting
+    dir_dataset = path_enum.dir_project_home / dataset_name
+    try:
+        with profiling.phase("index_check"):
+            dir_generation = get_current_dir(dir_dataset / f"{dataset_name}-index")
+            if dir_generation is None:
+                return
+            info = build_info.BuildInfo.load(dir_generation)
+            if info is not None and not info.needs_refresh(dir_dataset):
+                return
+        with profiling.phase("refresh"):
+            from . import background
+
+            background.spawn_refresh_process(
+                dir_root=dir_dataset,
+                name=dataset_name,
+                dir_cache=path_enum.dir_cache,
+                path_log=path_enum.path_error_log,
+            )
+    except Exception:  # pragma: no cover
+        pass  # a failed freshness check must not break searching
+
+
+_FTS_ARG_NAMES = ("dataset_name", "query", "action")
+_FTS_FLAG_NAMES = ("profile",)  # take a value only in the --flag=value form
+
+
+def parse_fts_argv(argv: list[str]) -> dict[str, str] | None:
+    """
+    Parse the arguments of ``afwf-fts-anything fts`` without ``fire``.
+
+    Accepts what Alfred sends — ``--dataset-name X --query Y --action Z`` —
+    plus the ``--flag=value``, ``--dataset_name`` and positional forms.
+    A flag given without a value (blank Alfred field) becomes ``""``.
+    ``--profile`` never takes the next token as its value, only
+    ``--profile=N``.
+
+    Returns the keyword arguments for :func:`run_fts`, or ``None`` when the
+    command line is anything else so the caller can hand it to ``fire``
+    (which produces the proper usage error).
+    """
+    kwargs: dict[str, str] = {}
+    positionals: list[str] = []
+    i = 0
+    while i < len(argv):
+        token = argv[i]
+        i += 1
+        if not token.startswith("--"):
+            positionals.append(token)
+            continue
+        key, sep, value = token[2:].partition("=")
+        key = key.replace("-", "_")
+        if key not in _FTS_ARG_NAMES + _FTS_FLAG_NAMES or key in kwargs:
+            return None
+        if not sep and key not in _FTS_FLAG_NAMES:
+            if i < len(argv) and not argv[i].startswith("--"):
+                value = argv[i]
+                i += 1
+            else:
+                value = ""
+        kwargs[key] = value
+    for key in _FTS_ARG_NAMES:
+        if positionals and key not in kwargs:
+            kwargs[key] = positionals.pop(0)
+    if positionals or "dataset_name" not in kwargs:
+        return None
+    kwargs.setdefault("query", "*")
+    return kwargs
 
 
 class Command:
@@ -166,19 +510,24 @@ class Command:
         self,
         dataset_name: str,
         query: str = "*",
-        action: str = ActionEnum.open_url.value,
+        action: str = "open_url",
+        profile: bool | int | None = None,
     ):
-        """Full-text search; see :func:`fts`.
+        """Full-text search; see :func:`run_fts`.
 
         Normalises Fire's boolean ``True`` (blank Alfred field) to an empty
-        string before delegating.
+        string before delegating.  When the daemon is running the query is
+        answered by it; otherwise it runs in-process.
         """
         query = "" if isinstance(query, bool) else str(query)
-        fts(
+        if isinstance(profile, bool):
+            profile = "" if profile else None
+        run_fts(
             dataset_name=str(dataset_name),
             query=query,
-            action=ActionEnum(action),
-        ).send_feedback()
+            action=str(action),
+            profile=None if profile is None else str(profile),
+        )
 
     def list_datasets_for_reset(
         self,
@@ -198,10 +547,66 @@ class Command:
         """Rebuild the search index for a dataset; see :func:`rebuild_index`."""
         rebuild_index(dataset_name=str(dataset_name))
 
+    def rebuild_all(
+        self,
+        max_workers: int | None = None,
+    ):
+        """Rebuild the search index of every dataset in parallel; see :func:`rebuild_all`."""
+        rebuild_all(max_workers=None if max_workers is None else int(max_workers))
+
+    def fts_batch(
+        self,
+        dataset_name: str,
+        limit: int = 20,
+        max_workers: int | None = None,
+    ):
+        """Search NDJSON queries from stdin, NDJSON results to stdout; see :func:`fts_batch`."""
+        fts_batch(
+            dataset_name=str(dataset_name),
+            limit=int(limit),
+            max_workers=None if max_workers is None else int(max_workers),
+        )
+
     def setup_sample_data(self):
         """Copy the bundled movie sample dataset to the workflow home; see :func:`setup_sample_data`."""
         setup_sample_data()
 
+    def daemon(self):  # pragma: no cover
+        """Run the resident search daemon in the foreground; see :func:`run_daemon`."""
+        run_daemon()
+
+    def stop_daemon(self):
+        """Stop a running daemon; see :func:`stop_daemon`."""
+        stop_daemon()
+
+    def serve(
+        self,
+        host: str | None = None,
+        port: int | None = None,
+        max_workers: int | None = None,
+    ):  # pragma: no cover
+        """Run the local HTTP search server in the foreground; see :func:`serve`."""
+        serve(
+            host=None if host is None else str(host),
+            port=None if port is None else int(port),
+            max_workers=None if max_workers is None else int(max_workers),
+        )
+
+
+def main(argv: list[str] | None = None):
+    """
+    Console-script entry point.
+
+    ``fts`` — the per-keystroke hot path — is dispatched directly; every other
+    subcommand goes through ``fire``, which is only imported here.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "fts":
+        kwargs = parse_fts_argv(argv[1:])
+        if kwargs is not None:
+            run_fts(**kwargs)
+            return
+
+    import fire
 
-def main():
-    fire.Fire(Command)
+    fire.Fire(Command, command=argv)
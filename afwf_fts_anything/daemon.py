@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in resident search daemon for the ``fts`` Script Filter.
+
+Alfred starts a new ``afwf-fts-anything fts`` process for every keystroke,
+and most of that time is spent importing dependencies, parsing the dataset
+setting and opening the index — not on the query itself.  The daemon is a
+long-running process that listens on a Unix domain socket and keeps, per
+dataset, the parsed :class:`.Setting` and an open :class:`.IndexReader`
+warm.  Each connection is served in its own thread; the readers come from
+one :class:`.HandlePool`, so concurrent queries share them safely.  ``cli fts`` then becomes a thin client: it forwards
+``(dataset_name, query, action)`` and prints the Script Filter JSON it
+gets back, falling back to the in-process search when the daemon is not
+running.
+
+Protocol: the client sends one JSON object terminated by ``\\n`` and the
+daemon answers with the Script Filter JSON, then closes the connection.
+An empty answer means the daemon failed, or the search did not succeed
+(e.g. the index is being built); the client then falls back and reports it
+itself, so answers of the daemon can always be cached.
+
+Only the standard library is imported at module level so the client side
+stays cheap to import.  Where there are no Unix domain sockets (Windows),
+the client always falls back and :func:`create_server` raises.
+"""
+
+import os
+import json
+import socket
+import threading
+import socketserver
+import typing as T
+from pathlib import Path
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .dataset import Dataset
+    from .handle_pool import HandlePool
+
+OP_FTS = "fts"
+OP_PING = "ping"
+OP_SHUTDOWN = "shutdown"
+
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+"""Whether the platform has Unix domain sockets, which the daemon needs."""
+
+
+# ------------------------------------------------------------------------------
+# Client
+# ------------------------------------------------------------------------------
+def send_request(
+    path_socket: Path,
+    payload: dict[str, T.Any],
+    timeout: float = 2.0,
+) -> str | None:
+    """
+    Send *payload* to the daemon listening on *path_socket* and return its
+    raw answer.
+
+    Returns ``None`` — never raises — when the daemon is not running, does
+    not answer in time, or answers with nothing, so callers can fall back
+    to doing the work themselves.
+    """
+    if not HAS_UNIX_SOCKETS:  # pragma: no cover
+        return None
+    if not path_socket.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path_socket))
+            sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        return None
+    answer = b"".join(chunks).decode("utf-8")
+    return answer or None
+
+
+def request_fts(
+    path_socket: Path,
+    dataset_name: str,
+    query: str,
+    action: str,
+    timeout: float = 2.0,
+) -> str | None:
+    """Ask the daemon for the Script Filter JSON of one ``fts`` call."""
+    return send_request(
+        path_socket,
+        {
+            "op": OP_FTS,
+            "dataset_name": dataset_name,
+            "query": query,
+            "action": action,
+        },
+        timeout=timeout,
+    )
+
+
+def is_running(path_socket: Path) -> bool:
+    """``True`` if a daemon answers on *path_socket*."""
+    return send_request(path_socket, {"op": OP_PING}) is not None
+
+
+def stop(path_socket: Path) -> bool:
+    """Ask the daemon on *path_socket* to shut down; ``True`` if it answered."""
+    return send_request(path_socket, {"op": OP_SHUTDOWN}) is not None
+
+
+# ------------------------------------------------------------------------------
+# Server
+# ------------------------------------------------------------------------------
+class FtsDaemon:
+    """
+    Request handler state shared by all connections: a cache of warm
+    :class:`.Dataset` objects keyed by name, whose index readers are taken
+    from one :class:`.HandlePool`.
+
+    A cached dataset is replaced when its setting file changes on disk; the
+    pool reopens a reader when the index is rebuilt or the setting changes
+    its fields or sort, and closes a reader only once no request uses it.
+    Edits and ``rebuild-index`` runs are picked up without restarting, while
+    requests already running on the old dataset or reader finish normally.
+
+    :param dir_datacatalog_root: root directory of the :class:`.DataCatalog`.
+    :param path_error_log: forwarded to :func:`.fts.fts`.
+    :param dir_cache: optional cache directory given to each :class:`.Dataset`.
+    """
+
+    def __init__(
+        self,
+        dir_datacatalog_root: Path,
+        path_error_log: Path | None = None,
+        dir_cache: Path | None = None,
+    ):
+        from .handle_pool import HandlePool
+
+        self.dir_datacatalog_root = dir_datacatalog_root
+        self.path_error_log = path_error_log
+        self.dir_cache = dir_cache
+        self.handle_pool: "HandlePool" = HandlePool()
+        self._datasets: dict[str, tuple[int, "Dataset"]] = {}
+        self._lock = threading.Lock()
+
+    def get_dataset(self, dataset_name: str) -> "Dataset":
+        """Return the warm :class:`.Dataset` for *dataset_name*."""
+        from .dataset import Dataset
+
+        dataset = Dataset(
+            name=dataset_name,
+            dir_root=self.dir_datacatalog_root / dataset_name,
+            dir_cache=self.dir_cache,
+            handle_pool=self.handle_pool,
+        )
+        try:
+            mtime_ns = dataset.path_setting.stat().st_mtime_ns
+        except FileNotFoundError:
+            # let fts() report the missing setting file; nothing to keep warm
+            return dataset
+        with self._lock:
+            cached = self._datasets.get(dataset_name)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
+            # a replaced dataset holds no reader; requests still using it
+            # keep working with the pool's
+            self._datasets[dataset_name] = (mtime_ns, dataset)
+        return dataset
+
+    def fts(
+        self,
+        dataset_name: str,
+        query: str,
+        action: str,
+    ) -> str:
+        """Run :func:`.fts.fts_script_filter` on the warm dataset and return
+        Script Filter JSON; ``""`` for a :class:`.FailedScriptFilter`.
+        """
+        from . import fts as fts_mod
+        from . import federated
+
+        if federated.is_federated(dataset_name):
+            names = federated.split_dataset_names(dataset_name)
+            sf = fts_mod.federated_script_filter(
+                dataset_names=names,
+                query=query,
+                dir_datacatalog_root=self.dir_datacatalog_root,
+                action=fts_mod.ActionEnum(action),
+                path_error_log=self.path_error_log,
+                dir_cache=self.dir_cache,
+                datasets={name: self.get_dataset(name) for name in names},
+            )
+        else:
+            sf = fts_mod.fts_script_filter(
+                dataset_name=dataset_name,
+                query=query,
+                dir_datacatalog_root=self.dir_datacatalog_root,
+                action=fts_mod.ActionEnum(action),
+                path_error_log=self.path_error_log,
+                dataset=self.get_dataset(dataset_name),
+                dir_cache=self.dir_cache,
+            )
+        if isinstance(sf, fts_mod.FailedScriptFilter):
+            return ""
+        return json.dumps(sf.to_script_filter(), ensure_ascii=False)
+
+    def close(self) -> None:
+        with self._lock:
+            self._datasets.clear()
+        self.handle_pool.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "DaemonServer"
+
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            payload = json.loads(line)
+            op = payload.get("op")
+            if op == OP_FTS:
+                answer = self.server.fts_daemon.fts(
+                    dataset_name=payload["dataset_name"],
+                    query=payload["query"],
+                    action=payload["action"],
+                )
+            elif op == OP_PING:
+                answer = "pong"
+            elif op == OP_SHUTDOWN:
+                answer = "bye"
+                # shutdown() blocks until serve_forever returns, so it cannot
+                # be called from the request thread itself
+                threading.Thread(target=self.server.shutdown).start()
+            else:
+                raise ValueError(f"unknown op: {op!r}")
+        except Exception:
+            # an empty answer tells the client to fall back to in-process;
+            # the in-process run then logs the error properly
+            return
+        self.wfile.write(answer.encode("utf-8"))
+
+
+# socketserver only defines UnixStreamServer where there are Unix sockets
+if HAS_UNIX_SOCKETS:
+
+    class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """Threaded Unix socket server bound to an :class:`FtsDaemon`."""
+
+        daemon_threads = True
+
+        def __init__(self, path_socket: Path, fts_daemon: FtsDaemon):
+            self.path_socket = path_socket
+            self.fts_daemon = fts_daemon
+            super().__init__(str(path_socket), _RequestHandler)
+
+        def server_close(self):
+            super().server_close()
+            self.fts_daemon.close()
+            try:
+                os.unlink(self.path_socket)
+            except FileNotFoundError:
+                pass
+
+
+def create_server(
+    path_socket: Path,
+    dir_datacatalog_root: Path,
+    path_error_log: Path | None = None,
+    dir_cache: Path | None = None,
+) -> "DaemonServer":
+    """
+    Bind a :class:`DaemonServer` to *path_socket*.
+
+    A leftover socket file from a crashed daemon is removed first; if another
+    daemon is still answering on it, or the platform has no Unix sockets,
+    :class:`RuntimeError` is raised.
+    """
+    if not HAS_UNIX_SOCKETS:  # pragma: no cover
+        raise RuntimeError("the daemon needs Unix domain sockets")
+    if path_socket.exists():
+        if is_running(path_socket):
+            raise RuntimeError(f"a daemon is already listening on '{path_socket}'")
+        path_socket.unlink()
+    path_socket.parent.mkdir(parents=True, exist_ok=True)
+    return DaemonServer(
+        path_socket=path_socket,
+        fts_daemon=FtsDaemon(
+            dir_datacatalog_root=dir_datacatalog_root,
+            path_error_log=path_error_log,
+            dir_cache=dir_cache,
+        ),
+    )
+
+
+def serve(
+    path_socket: Path,
+    dir_datacatalog_root: Path,
+    path_error_log: Path | None = None,
+    dir_cache: Path | None = None,
+) -> None:  # pragma: no cover
+    """Run the daemon in the foreground until it is asked to shut down."""
+    server = create_server(
+        path_socket=path_socket,
+        dir_datacatalog_root=dir_datacatalog_root,
+        path_error_log=path_error_log,
+        dir_cache=dir_cache,
+    )
+    with server:  # server_close() on exit removes the socket file
+        server.serve_forever()
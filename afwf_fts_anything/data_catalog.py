@@ -3,15 +3,28 @@
 """
 This module provides DataCatalog, a container that manages multiple Dataset
 instances rooted under a single directory, and the DatasetMeta / DatasetMetaStatusEnum
-helpers used to describe each discovered dataset's health.
+helpers used to describe each discovered dataset's health.  RebuildReport
+describes the outcome of rebuilding one dataset in :meth:`DataCatalog.rebuild_all`;
+:meth:`DataCatalog.search_many` searches several datasets at once.
 """
 
+import os
 import enum
-from dataclasses import dataclass
+import time
+import threading
+import multiprocessing
+import typing as T
+from dataclasses import dataclass, field
 from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed, wait
 
+from sayt2.api import SortKey
+
+from .exc import IndexBuildInProgressError
 from .dataset import Dataset
-from .setting import Setting
+from .handle_pool import HandlePool
+from . import catalog_manifest
+from . import federated
 
 
 class DatasetMetaStatusEnum(str, enum.Enum):
@@ -33,6 +46,8 @@ class DatasetMeta:
 
     name: str
     status: DatasetMetaStatusEnum
+    data_url: str | None = None
+    """The dataset's ``data_url``, when its setting is valid."""
 
     @property
     def is_valid(self) -> bool:
@@ -40,6 +55,53 @@ class DatasetMeta:
         return self.status == DatasetMetaStatusEnum.setting_valid
 
 
+@dataclass
+class RebuildReport:
+    """Outcome of rebuilding one dataset, returned by :meth:`DataCatalog.rebuild_all`."""
+
+    name: str
+    seconds: float = 0.0
+    """Wall time of the download and index update, in seconds."""
+    result: str | None = None
+    """The :class:`.UpdateResult` summary, e.g. ``"2 added, 0 updated, ..."``,
+    or ``"not modified"``."""
+    error: str | None = None
+    """``"{ExceptionType}: {message}"`` when the rebuild failed."""
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __str__(self) -> str:
+        if self.ok:
+            return f"{self.name}: {self.result} ({self.seconds:.2f}s)"
+        return f"{self.name}: FAILED {self.error} ({self.seconds:.2f}s)"
+
+
+def rebuild_dataset(
+    dir_root: Path,
+    name: str,
+    dir_cache: Path | None = None,
+) -> RebuildReport:
+    """
+    Re-download (when ``data_url`` is set) and update the index of one
+    dataset with :meth:`.Dataset.sync`; errors are captured in the report instead of raised.
+
+    Module-level so that :class:`~concurrent.futures.ProcessPoolExecutor`
+    workers can run it.
+    """
+    start = time.perf_counter()
+    report = RebuildReport(name=name)
+    try:
+        dataset = DataCatalog(dir_root=dir_root, dir_cache=dir_cache).get_dataset(name)
+        result = dataset.sync()
+        report.result = "not modified" if result is None else str(result)
+    except Exception as e:
+        report.error = f"{type(e).__name__}: {e}"
+    report.seconds = time.perf_counter() - start
+    return report
+
+
 @dataclass
 class DataCatalog:
     """
@@ -50,7 +112,7 @@ class DataCatalog:
         dir_root/
             {dataset_name_1}/
                 {dataset_name_1}-setting.json
-                {dataset_name_1}-data.json
+                {dataset_name_1}-data.json  (or -data.jsonl)
                 {dataset_name_1}-index/
                 icons/
             {dataset_name_2}/
@@ -59,13 +121,38 @@ class DataCatalog:
     Each immediate subdirectory of *dir_root* is treated as a potential dataset.
     A subdirectory is included in scan results only when a matching
     ``{name}-setting.json`` file is found inside it.
+
+    :param dir_cache: optional cache directory handed to every
+        :class:`.Dataset`; enables the compiled-setting cache for both the
+        datasets and :meth:`scan`, and the catalog manifest of :meth:`scan`.
+    :param handle_pool: optional :class:`.HandlePool` handed to every
+        :class:`.Dataset`, so searches of long-lived processes reuse open
+        indexes; :meth:`close` closes them.
     """
 
     dir_root: Path
+    dir_cache: Path | None = None
+    handle_pool: HandlePool | None = field(default=None, repr=False, compare=False)
 
     def get_dataset(self, name: str) -> Dataset:
         """Return a :class:`.Dataset` for the given *name* rooted at ``dir_root/{name}``."""
-        return Dataset(name=name, dir_root=self.dir_root / name)
+        return Dataset(
+            name=name,
+            dir_root=self.dir_root / name,
+            dir_cache=self.dir_cache,
+            handle_pool=self.handle_pool,
+        )
+
+    def close(self) -> None:
+        """Close the readers of :attr:`handle_pool`, if any."""
+        if self.handle_pool is not None:
+            self.handle_pool.close()
+
+    def __enter__(self) -> "DataCatalog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
     def scan(self) -> list[DatasetMeta]:
         """Scan *dir_root* one level deep and return a :class:`DatasetMeta` for each dataset.
@@ -74,24 +161,176 @@ class DataCatalog:
         - Subdirectories whose setting file cannot be parsed are included with
           status :attr:`~DatasetMetaStatusEnum.setting_invalid`.
         - Results are sorted by dataset name.
+
+        With :attr:`dir_cache`, only setting files that changed since the
+        last scan are parsed, see :mod:`.catalog_manifest`.
         """
+        if self.dir_cache is None:
+            path_manifest = None
+            old_entries = {}
+        else:
+            path_manifest = catalog_manifest.get_path_manifest(self.dir_cache, self.dir_root)
+            old_entries = catalog_manifest.load_manifest(path_manifest)
+        entries = {}
+
         results = []
         for subdir in sorted(self.dir_root.iterdir()):
             if not subdir.is_dir():
                 continue  # ignore plain files at the root level
 
             name = subdir.name
-            path_setting = subdir / f"{name}-setting.json"
-
-            if not path_setting.exists():
+            entry = catalog_manifest.check_setting(
+                subdir / f"{name}-setting.json",
+                self.dir_cache,
+                old_entries.get(name),
+            )
+            if entry is None:
                 continue  # not a dataset directory — skip silently
+            entries[name] = entry
 
-            try:
-                Setting.from_json_file(path_setting)
+            if entry.is_valid:
                 status = DatasetMetaStatusEnum.setting_valid
-            except Exception:
+            else:
                 status = DatasetMetaStatusEnum.setting_invalid
+            results.append(DatasetMeta(name=name, status=status, data_url=entry.data_url))
 
-            results.append(DatasetMeta(name=name, status=status))
-
+        if path_manifest is not None and entries != old_entries:
+            try:
+                catalog_manifest.dump_manifest(path_manifest, entries)
+            except OSError:  # pragma: no cover
+                pass  # a read-only cache dir must not break scanning
         return results
+
+    def rebuild_all(
+        self,
+        max_workers: int | None = None,
+        callback: T.Callable[[RebuildReport], T.Any] | None = None,
+    ) -> list[RebuildReport]:
+        """
+        Rebuild every dataset found by :meth:`scan`, several at a time.
+
+        Each valid dataset is downloaded, parsed and indexed by
+        :func:`rebuild_dataset` in its own worker process, so one failing
+        (or crashing) dataset does not stop the others.  Datasets with an
+        invalid setting file are reported as failed without being started.
+
+        :param max_workers: size of the process pool; defaults to the number
+            of CPUs, capped by the number of datasets.  With ``1`` the
+            datasets are rebuilt one after another in this process.
+        :param callback: called with each report as soon as it is done, e.g.
+            to print progress.
+        :returns: the reports, sorted by dataset name.
+        """
+        reports = []
+
+        def done(report: RebuildReport):
+            reports.append(report)
+            if callback is not None:
+                callback(report)
+
+        names = []
+        for meta in self.scan():
+            if meta.is_valid:
+                names.append(meta.name)
+            else:
+                done(RebuildReport(name=meta.name, error="invalid setting file"))
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = max(1, min(max_workers, len(names)))
+        if max_workers == 1:
+            for name in names:
+                done(rebuild_dataset(self.dir_root, name, self.dir_cache))
+        elif names:
+            # "spawn": workers must not inherit the index writer threads or
+            # open files of a forked parent
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                futures = {
+                    executor.submit(rebuild_dataset, self.dir_root, name, self.dir_cache): name
+                    for name in names
+                }
+                for future in as_completed(futures):
+                    try:
+                        report = future.result()
+                    except Exception as e:  # the worker process died
+                        report = RebuildReport(
+                            name=futures[future],
+                            error=f"{type(e).__name__}: {e}",
+                        )
+                    done(report)
+
+        reports.sort(key=lambda report: report.name)
+        return reports
+
+    def search_many(
+        self,
+        names: list[str],
+        query: str,
+        limit: int = 20,
+        timeout: float | None = None,
+        sort: list[SortKey] | None = None,
+        datasets: T.Mapping[str, Dataset] | None = None,
+    ) -> federated.FederatedResult:
+        """
+        Search the datasets *names* concurrently and merge their hits, see
+        :mod:`.federated`.
+
+        Each dataset is searched in its own thread for its best *limit* hits
+        (building its index first if needed).  A dataset whose index another
+        process is building is not waited for, but left out and listed in
+        :attr:`.FederatedResult.building`.  A dataset that raises, or has not
+        answered within *timeout* seconds of the start, is left out and
+        reported in :attr:`.FederatedResult.errors`.
+
+        :param limit: maximum number of hits overall.
+        :param timeout: seconds to wait for the slowest dataset; no limit by
+            default.
+        :param sort: order the merged hits by these fields instead of by
+            normalized relevance.
+        :param datasets: already opened :class:`.Dataset` objects to use
+            instead of :meth:`get_dataset`, e.g. kept warm by the daemon.
+            They are searched from worker threads while other callers may
+            use them too, so they should take their readers from a
+            :class:`.HandlePool` (as the daemon's do) rather than keep their
+            own with ``keep_index_open``.
+        """
+        result = federated.FederatedResult()
+        if not names:
+            return result
+
+        def search(name: str) -> list[federated.FederatedHit]:
+            dataset = (datasets or {}).get(name) or self.get_dataset(name)
+            if not dataset.path_setting.exists():
+                raise FileNotFoundError(f"setting file not found: '{dataset.path_setting}'")
+            dataset.ensure_index(blocking=False)
+            return federated.normalize_hits(name, dataset.search_hits(query, limit=limit))
+
+        def run(name: str, future: Future):
+            try:
+                future.set_result(search(name))
+            except BaseException as e:
+                future.set_exception(e)
+
+        # daemon threads, not a pool: a dataset that timed out must not keep
+        # the process alive once the answer is written
+        futures = {name: Future() for name in names}
+        for name, future in futures.items():
+            threading.Thread(target=run, args=(name, future), daemon=True).start()
+        wait(futures.values(), timeout=timeout)
+
+        hits_per_dataset = []
+        for name, future in futures.items():
+            if not future.done():
+                result.errors[name] = f"timed out after {timeout}s"
+            elif isinstance(future.exception(), IndexBuildInProgressError):
+                result.building.append(name)
+            elif future.exception() is not None:
+                e = future.exception()
+                result.errors[name] = f"{type(e).__name__}: {e}"
+            else:
+                hits_per_dataset.append(future.result())
+        result.hits = federated.merge_hits(hits_per_dataset, limit=limit, sort=sort)
+        return result
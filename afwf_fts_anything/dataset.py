@@ -6,17 +6,137 @@ search index and provides build/search operations.
 """
 
 import io
+import os
 import json
+import time
+import warnings
+import functools
+import shutil
+import threading
+import contextlib
 import typing as T
-import urllib.request
 from pathlib import Path
 from zipfile import ZipFile
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
 
 from sayt2.api import DataSet as Sayt2DataSet
+from sayt2.api import Hit, SortKey, T_Field, fields_schema_hash
+from sayt2.dataset import open_index, search_index, search_index_sorted
 
-from .setting import Setting
+from .exc import IndexBuildInProgressError
+from .setting import Setting, DataFormatEnum
+from .template import DisplayRow
+from .setting_cache import load_setting
+from .response_cache import ResponseCache
+from .json_stream import iter_json_array_file, iter_json_lines_file
+from . import incremental
+from . import index_update
+from . import index_generation
+from . import build_info
+from . import download
+from . import decompress
+from . import profiling
+from . import display_table
+from .handle_pool import HandlePool
+from .index_generation import read_generation
+
+_DATA_SUFFIXES = {
+    DataFormatEnum.json: (".json",),
+    DataFormatEnum.jsonl: (".jsonl", ".ndjson"),
+}
+
+
+class IndexReader:
+    """
+    A long-lived handle on an opened tantivy index.
+
+    :meth:`Dataset.search` normally opens the index through :class:`sayt2.DataSet`
+    and drops it again after every query.  A long-running process (e.g. the
+    :mod:`.daemon`) keeps one ``IndexReader`` per dataset instead, so each
+    query skips the index-open cost.
+
+    The reader remembers the identity of the index's ``meta.json`` at open
+    time; :meth:`is_stale` reports when the index has since been rebuilt so
+    the owner can reopen it.
+
+    :param dir_index: the tantivy index directory (contains ``meta.json``).
+    :param fields: field definitions used to build the schema and tokenizers.
+    :param sort: optional multi-field sort specification.
+    :param lease: the lease on the index generation the index belongs to
+        (see :mod:`.index_generation`); released by :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        dir_index: Path,
+        fields: list[T_Field],
+        sort: list[SortKey] | None = None,
+        lease: index_generation.Lease | None = None,
+    ):
+        self.dir_index = dir_index
+        self.fields = fields
+        self.sort = sort
+        self.lease = lease
+        # stamp first: if the index is rebuilt while we open it, the reader
+        # is reported stale and reopened on the next query
+        self._stamp = self._get_stamp()
+        if self._stamp is None:
+            raise FileNotFoundError(f"no index found at '{dir_index}'")
+        self._index = open_index(dir_index, fields)
+
+    @property
+    def path_meta(self) -> Path:
+        return self.dir_index / "meta.json"
+
+    def _get_stamp(self) -> tuple[int, int] | None:
+        try:
+            st = self.path_meta.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    @property
+    def generation(self) -> str | None:
+        """Name of the leased index generation, if any."""
+        return None if self.lease is None else self.lease.generation
+
+    def is_stale(self) -> bool:
+        """``True`` if the index on disk was rebuilt (or removed) since opening,
+        or a newer index generation was published.
+        """
+        if self.lease is not None and not self.lease.is_current():
+            return True
+        return self._get_stamp() != self._stamp
+
+    def close(self) -> None:
+        """Release the generation lease so the generation can be removed
+        once it is superseded.  Safe to call multiple times.
+        """
+        if self.lease is not None:
+            self.lease.release()
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        apply_sort: bool = True,
+    ) -> list[Hit]:
+        """Search the opened index, applying :attr:`sort` when configured.
+
+        With ``apply_sort=False`` the top *limit* hits by relevance are
+        returned, without the sort over-fetch.
+        """
+        if self.sort and apply_sort:
+            return search_index_sorted(
+                self._index,
+                self.fields,
+                query,
+                sort_keys=self.sort,
+                limit=limit,
+            )
+        return search_index(self._index, self.fields, query, limit=limit)
 
 
 @dataclass
@@ -28,13 +148,43 @@ class Dataset:
     resources under a shared convention:
 
     - ``{dir_root}/{name}-setting.json`` -- field schema and display config
-    - ``{dir_root}/{name}-data.json``    -- the records to index
-    - ``{dir_root}/{name}-index/``       -- sayt2 index directory (auto-created)
+    - ``{dir_root}/{name}-data.json``    -- the records to index, as a JSON
+      array, or ``{name}-data.jsonl`` with one record per line
+      (see :attr:`data_format`)
+    - ``{dir_root}/{name}-index/``       -- index generations (auto-created),
+      see :mod:`.index_generation`
     - ``{dir_root}/icons/{name}.png``    -- per-result icons (resolved on demand)
+
+    :param keep_index_open: if ``True``, :meth:`search` keeps an
+        :class:`IndexReader` open between calls instead of opening the index
+        for every query.  Meant for long-lived, single-threaded processes;
+        call :meth:`close` when done.
+    :param handle_pool: a :class:`.HandlePool` to take the index reader from
+        instead, shared with other datasets (see :class:`.DataCatalog`);
+        takes precedence over *keep_index_open*.  Use one to search a dataset
+        from several threads.
+    :param dir_cache: optional cache directory shared by all datasets; when
+        given, :meth:`get_setting` goes through the compiled-setting cache
+        (see :mod:`.setting_cache`), and incremental search persists its
+        candidates there (see :mod:`.incremental`).
     """
 
     name: str
     dir_root: Path
+    keep_index_open: bool = False
+    dir_cache: Path | None = None
+    handle_pool: HandlePool | None = field(default=None, repr=False, compare=False)
+
+    _reader: IndexReader | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _candidates: incremental.CandidateSet | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # guards _candidates, which concurrent searches read and replace
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
 
     # ------------------------------------------------------------------
     # Computed paths (cached so repeated access is free)
@@ -44,9 +194,69 @@ class Dataset:
     def path_setting(self) -> Path:
         return self.dir_root / f"{self.name}-setting.json"
 
+    @cached_property
+    def data_format(self) -> DataFormatEnum:
+        """Layout of the local data file.
+
+        :attr:`.Setting.data_format` when configured; otherwise detected:
+        ``json`` if ``{name}-data.json`` exists, ``jsonl`` if
+        ``{name}-data.jsonl`` exists (either possibly compressed, see
+        :attr:`data_compression`) or ``data_url`` names a ``.jsonl`` /
+        ``.ndjson`` file (optionally compressed), ``json`` by default.
+        """
+        setting = self.setting if self.path_setting.exists() else None
+        if setting is not None and setting.data_format is not None:
+            return setting.data_format
+        if self._find_data_file(DataFormatEnum.json) is not None:
+            return DataFormatEnum.json
+        if self._find_data_file(DataFormatEnum.jsonl) is not None:
+            return DataFormatEnum.jsonl
+        if setting is not None and setting.data_url is not None:
+            url_path = decompress.strip_compression_suffix(setting.data_url)
+            if url_path.endswith(_DATA_SUFFIXES[DataFormatEnum.jsonl]):
+                return DataFormatEnum.jsonl
+        return DataFormatEnum.json
+
+    @cached_property
+    def data_compression(self) -> decompress.CompressionEnum | None:
+        """Compression of the local data file at rest.
+
+        :attr:`.Setting.data_compression` when configured; otherwise that of
+        the existing data file, e.g. ``gz`` when the only one is
+        ``{name}-data.json.gz``; ``None`` (plain) by default.
+        """
+        setting = self.setting if self.path_setting.exists() else None
+        if setting is not None and setting.data_compression is not None:
+            return setting.data_compression
+        path = self._find_data_file(self.data_format)
+        if path is None:
+            return None
+        return decompress.detect_compression(path.name)
+
     @cached_property
     def path_data(self) -> Path:
-        return self.dir_root / f"{self.name}-data.json"
+        path = self.dir_root / f"{self.name}-data.{self.data_format.value}"
+        if self.data_compression is None:
+            return path
+        return path.with_name(f"{path.name}.{self.data_compression.value}")
+
+    def _iter_data_files(self, data_format: DataFormatEnum) -> T.Iterator[Path]:
+        """Yield the existing ``{name}-data.{format}`` files, plain first,
+        then compressed.
+        """
+        path = self.dir_root / f"{self.name}-data.{data_format.value}"
+        for suffix in ["", *(f".{c.value}" for c in decompress.STREAM_COMPRESSIONS)]:
+            path_data = path.with_name(f"{path.name}{suffix}")
+            if path_data.exists():
+                yield path_data
+
+    def _find_data_file(self, data_format: DataFormatEnum) -> Path | None:
+        return next(self._iter_data_files(data_format), None)
+
+    @cached_property
+    def path_download_info(self) -> Path:
+        """Validators of the last ``data_url`` download, see :mod:`.download`."""
+        return self.dir_root / f"{self.name}-download.json"
 
     @cached_property
     def dir_index(self) -> Path:
@@ -65,66 +275,314 @@ class Dataset:
         return self.dir_icons / name
 
     def get_setting(self) -> Setting:
-        """Load and return the :class:`.Setting` from disk (no cache)."""
-        return Setting.from_json_file(self.path_setting)
+        """Load and return the :class:`.Setting` from disk.
+
+        Not memoised on the instance (see :attr:`setting` for that), but served
+        from the compiled-setting cache when :attr:`dir_cache` is set.
+        """
+        return load_setting(self.path_setting, self.dir_cache)
 
     def get_data(self) -> list[dict]:
-        """Read records from the local data JSON file.
+        """Read records from the local data file.
 
         If the file does not exist, :meth:`download_data` is called first.
         """
-        if not self.path_data.exists():  # pragma: no cover
+        self._ensure_data_file()
+        if self.data_format is DataFormatEnum.jsonl:
+            return list(
+                iter_json_lines_file(self.path_data, compression=self.data_compression)
+            )
+        with decompress.open_stream(self.path_data, self.data_compression) as f:
+            return json.load(f)
+
+    def iter_data(self) -> T.Iterator[dict[str, T.Any]]:
+        """Yield records from the local data file one at a time.
+
+        Unlike :meth:`get_data`, the file is parsed incrementally (see
+        :mod:`.json_stream`), so memory use does not grow with the file size.
+        A ``jsonl`` file is parsed by :attr:`.Setting.data_parse_workers`
+        worker processes when that is set.
+        A compressed data file is decompressed on the fly.
+        If the file does not exist, :meth:`download_data` is called first.
+        """
+        self._ensure_data_file()
+        if self.data_format is DataFormatEnum.jsonl:
+            return iter_json_lines_file(
+                self.path_data,
+                workers=self.setting.data_parse_workers,
+                compression=self.data_compression,
+            )
+        return iter_json_array_file(self.path_data, compression=self.data_compression)
+
+    def _ensure_data_file(self) -> None:
+        """Make sure :attr:`path_data` exists.
+
+        A data file with another compression (e.g. plain, after
+        :attr:`.Setting.data_compression` was configured) is converted;
+        without any, :meth:`download_data` is called.
+        """
+        if self.path_data.exists():
+            return
+        path_src = self._find_data_file(self.data_format)
+        if path_src is None:
             self.download_data()
-        return json.loads(self.path_data.read_text())
+            return
+        path_tmp = self.path_data.with_name(f"{self.path_data.name}.{os.getpid()}.tmp")
+        try:
+            decompress.recompress_file(
+                path_src,
+                path_tmp,
+                compression_src=decompress.detect_compression(path_src.name),
+                compression_dst=self.data_compression,
+            )
+            os.replace(path_tmp, self.path_data)
+        finally:
+            path_tmp.unlink(missing_ok=True)
+        self._remove_other_data_files()
+
+    def _remove_other_data_files(self) -> None:
+        # copies of the data with another compression only waste disk space
+        for path in self._iter_data_files(self.data_format):
+            if path != self.path_data:
+                path.unlink(missing_ok=True)
 
     @cached_property
     def setting(self) -> Setting:
         """Parsed :class:`.Setting`, cached after the first call."""
-        return self.get_setting()
+        with profiling.phase("setting"):
+            return self.get_setting()
+
+    @property
+    def dir_generation(self) -> Path | None:
+        """Directory of the published index generation, ``None`` before the
+        first build.  Read from disk on every access.
+        """
+        return index_generation.get_current_dir(self.dir_index)
+
+    def _get_dir_tantivy(self, dir_generation: Path) -> Path:
+        # same layout as sayt2.DataSet: {dir_root}/{name}/index-{schema_hash}
+        return (
+            dir_generation
+            / self.name
+            / f"index-{fields_schema_hash(self.setting.fields)}"
+        )
+
+    def has_index(self) -> bool:
+        """``True`` if a published generation holds an index for the current
+        field schema.
+        """
+        dir_generation = self.dir_generation
+        if dir_generation is None:
+            return False
+        return (self._get_dir_tantivy(dir_generation) / "meta.json").exists()
+
+    def get_index_reader(self) -> IndexReader:
+        """Open an :class:`IndexReader` on the published index generation.
+
+        The reader leases the generation until :meth:`IndexReader.close`.
+        Raises :class:`FileNotFoundError` if the index has not been built yet.
+        """
+        lease = index_generation.lease_generation(self.dir_index)
+        if lease is None:
+            raise FileNotFoundError(f"no index found at '{self.dir_index}'")
+        try:
+            return IndexReader(
+                dir_index=self._get_dir_tantivy(lease.dir_generation),
+                fields=self.setting.fields,
+                sort=self.setting.sort,
+                lease=lease,
+            )
+        except BaseException:
+            lease.release()
+            raise
+
+    def close(self) -> None:
+        """Release the reader held because of :attr:`keep_index_open`.
 
-    def get_sayt2_dataset(self) -> Sayt2DataSet:
-        """Create a :class:`sayt2.DataSet` wired to this dataset's index and setting."""
+        Safe to call multiple times.
+        """
+        if self._reader is not None:
+            self._reader.close()
+        self._reader = None
+        with self._lock:
+            self._candidates = None
+
+    def get_sayt2_dataset(self, dir_generation: Path | None = None) -> Sayt2DataSet:
+        """Create a :class:`sayt2.DataSet` wired to one index generation and
+        this dataset's setting.
+
+        :param dir_generation: the generation directory; the published one
+            by default.  Raises :class:`FileNotFoundError` if there is none.
+        """
+        if dir_generation is None:
+            dir_generation = self.dir_generation
+            if dir_generation is None:
+                raise FileNotFoundError(f"no index found at '{self.dir_index}'")
         return Sayt2DataSet(
-            dir_root=self.dir_index,
+            dir_root=dir_generation,
             name=self.name,
             fields=self.setting.fields,
-            downloader=self.get_data,
+            downloader=functools.partial(self._iter_data_to_index, dir_generation),
             sort=self.setting.sort,
         )
 
+    def _iter_data_to_index(
+        self,
+        dir_generation: Path,
+        data: T.Iterable[dict[str, T.Any]] | None = None,
+    ) -> T.Iterator[dict[str, T.Any]]:
+        """Yield the records of a full index build, recording their hashes
+        in *dir_generation* when :attr:`.Setting.primary_key` is set, and
+        rendering their display table with :attr:`.Setting.prerender_display`.
+        """
+        if data is None:
+            data = self.iter_data()
+        setting = self.setting
+        if setting.primary_key is None:
+            yield from data
+            return
+        hashes: index_update.T_HASHES = {}
+        data = index_update.iter_hashed(
+            data,
+            primary_key=setting.primary_key,
+            key_type=setting.primary_key_type,
+            hashes=hashes,
+        )
+        if setting.prerender_display:
+            path_table = dir_generation / display_table.DISPLAY_TABLE_FILENAME
+            with display_table.DisplayTable(path_table) as table:
+                writer = display_table.DisplayTableWriter(table, setting)
+                yield from writer.tee(data)
+                writer.flush()
+                table.set_templates_hash(display_table.get_templates_hash(setting))
+        else:
+            yield from data
+        index_update.dump_hashes(
+            dir_generation / index_update.HASHES_FILENAME,
+            schema_hash=fields_schema_hash(setting.fields),
+            primary_key=setting.primary_key,
+            hashes=hashes,
+        )
+
     # ------------------------------------------------------------------
     # Download helpers (network-free parts are testable)
     # ------------------------------------------------------------------
 
     @staticmethod
-    def _extract_json_from_zip(zip_bytes: bytes) -> bytes:
-        """Return the raw bytes of the first ``.json`` file found in *zip_bytes*."""
+    def _extract_json_from_zip(
+        zip_bytes: bytes,
+        suffixes: tuple[str, ...] = (".json",),
+    ) -> bytes:
+        """Return the raw bytes of the first file in *zip_bytes* whose name
+        ends with one of *suffixes* (``.json`` by default).
+        """
         with ZipFile(io.BytesIO(zip_bytes)) as zf:
-            json_names = [n for n in zf.namelist() if n.endswith(".json")]
+            json_names = [n for n in zf.namelist() if n.endswith(suffixes)]
             return zf.read(json_names[0])
 
     def _save_data(self, raw_bytes: bytes, is_zip: bool) -> None:
-        """Write *raw_bytes* to :attr:`path_data`, decompressing if *is_zip* is True."""
-        data_bytes = self._extract_json_from_zip(raw_bytes) if is_zip else raw_bytes
-        self.path_data.write_bytes(data_bytes)
+        """Write *raw_bytes* to :attr:`path_data`, decompressing if *is_zip* is
+        True (and compressing as :attr:`data_compression`).
+        """
+        path_tmp = self.path_data.with_name(f"{self.path_data.name}.{os.getpid()}.download")
+        try:
+            path_tmp.write_bytes(raw_bytes)
+            self._save_data_file(
+                path_tmp,
+                compression=decompress.CompressionEnum.zip if is_zip else None,
+            )
+        finally:
+            path_tmp.unlink(missing_ok=True)
 
-    def _fetch_url(self, url: str) -> bytes:  # pragma: no cover
-        """Download *url* and return raw bytes via :mod:`urllib`."""
-        with urllib.request.urlopen(url) as resp:
-            return resp.read()
+    def _save_data_file(
+        self,
+        path_download: Path,
+        compression: decompress.CompressionEnum | None,
+    ) -> None:
+        """Move the downloaded file at *path_download* to :attr:`path_data`,
+        stream-decompressing it from *compression* and compressing it as
+        :attr:`data_compression` on the way when they differ (see
+        :mod:`.decompress`).
+        """
+        # replace atomically; a concurrent build may be reading the old file
+        if compression == self.data_compression:
+            os.replace(path_download, self.path_data)
+        else:
+            path_tmp = self.path_data.with_name(f"{self.path_data.name}.{os.getpid()}.tmp")
+            try:
+                decompress.recompress_file(
+                    path_download,
+                    path_tmp,
+                    compression_src=compression,
+                    compression_dst=self.data_compression,
+                    suffixes=_DATA_SUFFIXES[self.data_format],
+                )
+                os.replace(path_tmp, self.path_data)
+            finally:
+                path_tmp.unlink(missing_ok=True)
+        self._remove_other_data_files()
 
-    def download_data(self) -> None:  # pragma: no cover
+    def download_data(self) -> bool:
         """Download the dataset from :attr:`Setting.data_url` and save it locally.
 
+        The response is streamed to a temporary file that replaces
+        :attr:`path_data` atomically; a ``.zip``, ``.gz``, ``.bz2``, ``.xz``
+        or ``.zst`` download is stream-decompressed on the way, see
+        :mod:`.decompress`.  The request is conditional on the
+        ``ETag`` / ``Last-Modified`` of the previous download, see
+        :mod:`.download`.
+
         Raises :class:`ValueError` if ``data_url`` is not configured.
+
+        :returns: ``False`` if the server reported the data as not modified
+            and the local data file was kept, ``True`` otherwise.
         """
         url = self.setting.data_url
         if url is None:
             raise ValueError(
                 f"'data_url' is not defined in setting file '{self.path_setting}'."
             )
-        raw = self._fetch_url(url)
-        self._save_data(raw, is_zip=url.endswith(".zip"))
+        info = download.DownloadInfo.load(self.path_download_info)
+        if info is None or not info.is_valid_for(url, self.path_data):
+            info = download.DownloadInfo(url=url)  # unconditional request
+        path_download = self.path_data.with_name(
+            f"{self.path_data.name}.{os.getpid()}.download"
+        )
+        try:
+            new_info = download.fetch(
+                url,
+                path_download,
+                etag=info.etag,
+                last_modified=info.last_modified,
+            )
+            if new_info is None:
+                return False
+            self._save_data_file(
+                path_download,
+                compression=decompress.detect_compression(url),
+            )
+        finally:
+            path_download.unlink(missing_ok=True)
+        new_info.data_mtime_ns, new_info.data_size = build_info.stat_data(self.path_data)
+        new_info.dump(self.path_download_info)
+        return True
+
+    def sync(self) -> index_update.UpdateResult | None:
+        """Download :attr:`Setting.data_url` (if set) and :meth:`update_index`.
+
+        :returns: the counts of the update, or ``None`` when the server
+            reported the data as not modified and the published index was
+            built from the current data file, so nothing was reindexed.
+        """
+        if self.setting.data_url is not None and not self.download_data():
+            info = self.get_build_info()
+            if (
+                info is not None
+                and self.has_index()
+                and not info.is_data_changed(self.path_data)
+            ):
+                return None
+        return self.update_index()
 
     # ------------------------------------------------------------------
     # Index and search
@@ -132,23 +590,378 @@ class Dataset:
 
     def build_index(
         self,
-        data: list[dict[str, T.Any]] | None = None,
-        rebuild: bool = False,
+        data: T.Iterable[dict[str, T.Any]] | None = None,
+        rebuild: bool | None = None,
     ) -> int:
         """Build the sayt2 search index from *data*.
 
-        :param data: records to index; if ``None`` the configured downloader is used.
-        :param rebuild: if ``True``, evict the query cache before building so
-            subsequent searches always reflect the new index.
+        Records are handed to the index writer as they are read, so with the
+        default :meth:`iter_data` the whole data file is never held in memory.
+
+        The index is built into a new generation directory that is published
+        only once it is complete (see :mod:`.index_generation`): searches keep
+        using the previous index meanwhile, and builds of the same dataset
+        wait for each other.  The answer of the empty query is then rendered
+        into the generation (see :mod:`.browse_snapshot`), and the dataset's
+        cached ``fts`` responses are dropped when :attr:`dir_cache` is set
+        (see :mod:`.response_cache`).
+
+        With :attr:`.Setting.primary_key` configured, the content hash of
+        every record is saved for :meth:`update_index`; a duplicate or
+        mistyped primary key raises :class:`ValueError`.
+
+        :param data: records to index; if ``None`` they are streamed from the
+            local data file with :meth:`iter_data`.
+        :param rebuild: deprecated and ignored, passing it emits a
+            :class:`DeprecationWarning`.  Every call builds a new generation,
+            which always starts with an empty query cache; use
+            :meth:`ensure_index` to build only when there is no index yet.
         :returns: number of documents indexed.
         """
-        ds = self.get_sayt2_dataset()
-        if rebuild:
-            ds._cache.evict_all()
-        count = ds.build_index(data=data)
-        ds.close()
+        if rebuild is not None:
+            warnings.warn(
+                "the 'rebuild' argument of Dataset.build_index() is ignored "
+                "and will be removed; every call builds a new index",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+        with index_generation.get_build_lock(self.dir_index):
+            return self._build_generation(data)
+
+    def ensure_index(self, blocking: bool = True) -> bool:
+        """Build the index unless one exists for the current field schema.
+
+        Safe to call from concurrent processes: only the first one builds.
+
+        :param blocking: if ``True``, the others wait for that build and then
+            use its index; if ``False``, they raise
+            :class:`~afwf_fts_anything.exc.IndexBuildInProgressError` at once.
+        :returns: ``True`` if this call built the index.
+        """
+        if self.has_index():
+            return False
+        lock = index_generation.get_build_lock(self.dir_index)
+        if not lock.acquire(blocking=blocking):
+            raise IndexBuildInProgressError(
+                f"the index of dataset {self.name!r} is being built "
+                f"by another process"
+            )
+        try:
+            if self.has_index():
+                return False  # built while we were waiting for the lock
+            self._build_generation()
+        finally:
+            lock.release()
+        return True
+
+    def _prepare_data_file(
+        self,
+        data: T.Iterable[dict[str, T.Any]] | None,
+    ) -> tuple[int, int] | None:
+        # records from the data file: make sure it exists and stat it before
+        # it is read, see build_info.make_build_info
+        if data is not None:
+            return None
+        self._ensure_data_file()
+        return build_info.stat_data(self.path_data)
+
+    def _make_build_info(
+        self,
+        data: T.Iterable[dict[str, T.Any]] | None,
+        stat_before: tuple[int, int] | None,
+        refreshed_at: float | None,
+    ) -> build_info.BuildInfo:
+        setting = self.setting
+        return build_info.make_build_info(
+            path_data=self.path_data if data is None else None,
+            stat_before=stat_before,
+            refreshed_at=refreshed_at,
+            refresh_interval=setting.refresh_interval if setting.data_url is not None else None,
+        )
+
+    def _build_generation(
+        self,
+        data: T.Iterable[dict[str, T.Any]] | None = None,
+        refreshed_at: float | None = None,
+    ) -> int:
+        # the caller holds the build lock
+        stat_before = self._prepare_data_file(data)
+        dir_generation = index_generation.create_generation(self.dir_index)
+        try:
+            with self.get_sayt2_dataset(dir_generation) as ds:
+                count = ds.build_index(
+                    data=self._iter_data_to_index(dir_generation, data),
+                )
+            info = self._make_build_info(data, stat_before, refreshed_at)
+            info.dump(dir_generation)
+        except BaseException:
+            # best effort; anything left is removed by the next publish
+            shutil.rmtree(dir_generation, ignore_errors=True)
+            raise
+        self._publish(dir_generation)
         return count
 
+    def _publish(self, dir_generation: Path) -> None:
+        # the caller holds the build lock
+        index_generation.publish(self.dir_index, dir_generation)
+        if self.handle_pool is not None:
+            # release the lease on the superseded generation so it can go now
+            self.handle_pool.discard(self.dir_index)
+        index_generation.collect_garbage(self.dir_index)
+        try:
+            from .fts import write_browse_snapshots
+
+            write_browse_snapshots(self, dir_generation)
+        except Exception:
+            pass  # the first empty query is then searched and saves it
+        if self.dir_cache is not None:
+            with ResponseCache(self.dir_cache) as response_cache:
+                response_cache.evict(self.name)
+
+    def update_index(
+        self,
+        data: T.Iterable[dict[str, T.Any]] | None = None,
+    ) -> index_update.UpdateResult:
+        """Bring the existing index up to date with *data*, touching only the
+        records that were added, changed or removed since the last build.
+
+        Records are matched by :attr:`.Setting.primary_key` and compared by
+        the content hashes saved by the previous :meth:`build_index` /
+        :meth:`update_index`; the changes are written in one commit, see
+        :mod:`.index_update`.  Falls back to a full :meth:`build_index` when
+        no primary key is configured, or there are no hashes for the current
+        schema (first build, schema change, failed build).
+
+        The changes are applied to a hard-linked copy of the published
+        generation, which is then published like a full build; nothing is
+        published when nothing changed.
+
+        :param data: the complete new set of records; if ``None`` they are
+            streamed from the local data file with :meth:`iter_data`.
+        :returns: the number of added, updated, deleted and unchanged records.
+        """
+        with index_generation.get_build_lock(self.dir_index):
+            return self._update_generation(data)
+
+    def _update_generation(
+        self,
+        data: T.Iterable[dict[str, T.Any]] | None = None,
+        refreshed_at: float | None = None,
+    ) -> index_update.UpdateResult:
+        # the caller holds the build lock
+        setting = self.setting
+        schema_hash = fields_schema_hash(setting.fields)
+        dir_current = self.dir_generation
+        old_hashes = None
+        if (
+            setting.primary_key is not None
+            and dir_current is not None
+            and self.has_index()
+        ):
+            old_hashes = index_update.load_hashes(
+                dir_current / index_update.HASHES_FILENAME,
+                schema_hash=schema_hash,
+                primary_key=setting.primary_key,
+            )
+        if old_hashes is None:
+            count = self._build_generation(data, refreshed_at=refreshed_at)
+            return index_update.UpdateResult(added=count, full_rebuild=True)
+
+        stat_before = self._prepare_data_file(data)
+        records = self.iter_data() if data is None else data
+        dir_generation = index_generation.create_generation(self.dir_index)
+        try:
+            index_generation.link_tree(
+                self._get_dir_tantivy(dir_current),
+                self._get_dir_tantivy(dir_generation),
+            )
+            with contextlib.ExitStack() as stack:
+                table_update = None
+                if setting.prerender_display:
+                    table_update = stack.enter_context(
+                        display_table.TableUpdate(
+                            dir_current / display_table.DISPLAY_TABLE_FILENAME,
+                            dir_generation / display_table.DISPLAY_TABLE_FILENAME,
+                            setting=setting,
+                            old_hashes=old_hashes,
+                        )
+                    )
+                    records = table_update.tee(records)
+                ds = stack.enter_context(self.get_sayt2_dataset(dir_generation))
+                result, new_hashes = index_update.apply_updates(
+                    ds._open_index(),
+                    records,
+                    primary_key=setting.primary_key,
+                    key_type=setting.primary_key_type,
+                    old_hashes=old_hashes,
+                    memory_budget_bytes=ds.memory_budget_bytes,
+                )
+                if table_update is not None:
+                    table_update.finish(new_hashes)
+                if result.changed:
+                    index_update.dump_hashes(
+                        dir_generation / index_update.HASHES_FILENAME,
+                        schema_hash=schema_hash,
+                        primary_key=setting.primary_key,
+                        hashes=new_hashes,
+                    )
+                    # the copied index is complete; don't let a search
+                    # rebuild it from the downloader
+                    ds._cache.mark_fresh()
+            info = self._make_build_info(data, stat_before, refreshed_at)
+        except BaseException:
+            shutil.rmtree(dir_generation, ignore_errors=True)
+            raise
+        if result.changed:
+            info.dump(dir_generation)
+            self._publish(dir_generation)
+        else:
+            # same records; only remember what the index now corresponds to
+            info.dump(dir_current)
+            shutil.rmtree(dir_generation, ignore_errors=True)
+        return result
+
+    def get_build_info(self) -> build_info.BuildInfo | None:
+        """The :class:`.BuildInfo` of the published index generation, if any."""
+        dir_generation = self.dir_generation
+        if dir_generation is None:
+            return None
+        return build_info.BuildInfo.load(dir_generation)
+
+    def needs_refresh(self) -> bool:
+        """``True`` if the published index may be out of date: the data file
+        changed since it was indexed, or :attr:`.Setting.refresh_interval`
+        seconds passed since the data was downloaded from ``data_url``.
+
+        Cheap enough for every keystroke — one small file read and one
+        ``stat``.  ``False`` when there is no index yet (see
+        :meth:`ensure_index`).
+        """
+        dir_generation = self.dir_generation
+        if dir_generation is None:
+            return False
+        info = build_info.BuildInfo.load(dir_generation)
+        if info is None:
+            return True  # built by an older release; refresh once
+        if info.is_data_changed(self.path_data):
+            return True
+        setting = self.setting
+        return setting.data_url is not None and info.is_refresh_due(
+            setting.refresh_interval
+        )
+
+    def refresh(self, blocking: bool = False) -> index_update.UpdateResult | None:
+        """Bring the index up to date with the latest data, if needed.
+
+        Downloads ``data_url`` when :attr:`.Setting.refresh_interval` has
+        passed, then applies the data file with :meth:`update_index` unless
+        its content is what the index was built from.  Meant to run in the
+        background (see :mod:`.background`) while searches keep using the
+        published index.
+
+        :param blocking: wait for a build that is already running; by default
+            return ``None`` at once instead.
+        :returns: the counts of the update, or ``None`` if another build was
+            running.
+        """
+        lock = index_generation.get_build_lock(self.dir_index)
+        if not lock.acquire(blocking=blocking):
+            return None
+        try:
+            setting = self.setting
+            info = self.get_build_info()
+            refreshed_at = None if info is None else info.refreshed_at
+            if setting.data_url is not None and (
+                not self.path_data.exists()
+                or (
+                    setting.refresh_interval is not None
+                    and (info is None or info.is_refresh_due(setting.refresh_interval))
+                )
+            ):
+                self.download_data()
+                refreshed_at = time.time()
+
+            if info is not None and info.data_sha256 is not None and self.has_index():
+                stat = build_info.stat_data(self.path_data)
+                if stat is not None and (
+                    stat == (info.data_mtime_ns, info.data_size)
+                    or build_info.hash_file(self.path_data) == info.data_sha256
+                ):
+                    # same content as indexed; just remember the new state
+                    info.data_mtime_ns, info.data_size = stat
+                    info.refreshed_at = time.time() if refreshed_at is None else refreshed_at
+                    info.dump(self.dir_generation)
+                    return index_update.UpdateResult()
+            return self._update_generation(refreshed_at=refreshed_at)
+        finally:
+            lock.release()
+
+    def _get_kept_reader(self) -> IndexReader:
+        if self._reader is None or self._reader.is_stale():
+            # first query, or the index was rebuilt since we opened it
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            self._reader = self.get_index_reader()
+        return self._reader
+
+    @contextlib.contextmanager
+    def _use_reader(self) -> T.Iterator[IndexReader]:
+        # an open reader for the with block: from the handle pool, the kept
+        # one, or a fresh one closed afterwards
+        if self.handle_pool is not None:
+            with self.handle_pool.reader(self) as reader:
+                yield reader
+        elif self.keep_index_open:
+            yield self._get_kept_reader()
+        else:
+            reader = self.get_index_reader()
+            try:
+                yield reader
+            finally:
+                reader.close()
+
+    def _search_hits(
+        self,
+        query: str,
+        limit: int,
+    ) -> list[Hit]:
+        if self.keep_index_open and self.handle_pool is None:
+            with profiling.phase("open_index"):
+                reader = self._get_kept_reader()
+            with profiling.phase("query"):
+                return reader.search(query, limit=limit)
+        with profiling.phase("index_check"):
+            has_index = self.has_index()
+        if not has_index:
+            with profiling.phase("index_build"):
+                self.ensure_index()
+        if self.handle_pool is not None:
+            with contextlib.ExitStack() as stack:
+                with profiling.phase("open_index"):
+                    reader = stack.enter_context(self.handle_pool.reader(self))
+                with profiling.phase("query"):
+                    return reader.search(query, limit=limit)
+        with contextlib.ExitStack() as stack:
+            with profiling.phase("open_index"):
+                lease = stack.enter_context(
+                    index_generation.lease_generation(self.dir_index)
+                )
+                ds = stack.enter_context(self.get_sayt2_dataset(lease.dir_generation))
+            with profiling.phase("query"):
+                return ds.search(query, limit=limit).hits
+
+    def search_hits(
+        self,
+        query: str,
+        limit: int = 20,
+    ) -> list[Hit]:
+        """Like :meth:`search`, but return :class:`sayt2.api.Hit` objects
+        with their relevance scores.  :attr:`.Setting.incremental_search` is
+        not applied.
+        """
+        return self._search_hits(query, limit=limit)
+
     def search(
         self,
         query: str,
@@ -156,10 +969,212 @@ class Dataset:
     ) -> list[dict[str, T.Any]]:
         """Search the index and return matching documents as plain dicts.
 
+        When :attr:`.Setting.incremental_search` is enabled, plain queries
+        narrow the result and are refined from the previous query's
+        candidates where possible, see :meth:`search_incremental`.
+
         :param query: Lucene-syntax query string.
         :param limit: maximum number of results to return.
         :returns: list of ``hit.source`` dicts ordered by relevance / sort key.
         """
-        with self.get_sayt2_dataset() as ds:
-            result = ds.search(query, limit=limit)
-        return [hit.source for hit in result.hits]
+        if self.setting.incremental_search:
+            return self.search_incremental(query, limit=limit)
+        return [hit.source for hit in self._search_hits(query, limit=limit)]
+
+    def search_many(
+        self,
+        queries: T.Sequence[str],
+        limit: int = 20,
+        max_workers: int | None = None,
+        return_exceptions: bool = False,
+    ) -> list[list[dict[str, T.Any]] | Exception]:
+        """Run many independent queries on one open index, building it first
+        if needed.
+
+        The index is opened once for all of them (or taken from
+        :attr:`handle_pool`).  :attr:`.Setting.incremental_search` is not
+        applied, the queries are unrelated.
+
+        :param queries: Lucene-syntax query strings.
+        :param limit: maximum number of results per query.
+        :param max_workers: search in a pool of this many threads; one query
+            after another in the calling thread by default.
+        :param return_exceptions: if ``True``, a failing query (e.g. invalid
+            syntax) yields its exception in place of its results; otherwise
+            it is raised.
+        :returns: the ``hit.source`` dicts of each query, in query order.
+        """
+        if not queries:
+            return []
+        self.ensure_index()
+
+        def search(query: str) -> list[dict[str, T.Any]] | Exception:
+            try:
+                return [hit.source for hit in reader.search(query, limit=limit)]
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        with self._use_reader() as reader:
+            if max_workers is None or max_workers <= 1:
+                return [search(query) for query in queries]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                return list(executor.map(search, queries))
+
+    def get_display_rows(self, docs: list[dict[str, T.Any]]) -> list[DisplayRow]:
+        """Return the display columns of *docs*, search hits of this dataset,
+        rendered with :meth:`.Setting.render_batch`.
+
+        With :attr:`.Setting.prerender_display` the rows are looked up in the
+        display table of the published generation instead, see
+        :mod:`.display_table`.  A table rendered with other templates is
+        re-rendered first (:meth:`render_display_table`) unless a build is
+        running; hits without a row are rendered from their stored fields.
+        """
+        setting = self.setting
+        if not setting.prerender_display:
+            return setting.render_batch(docs)
+        keys = [doc.get(setting.primary_key) for doc in docs]
+        rows = self._lookup_display_rows(keys)
+        if rows is None:
+            try:
+                self.render_display_table(blocking=False)
+            except Exception:
+                pass  # answer from the stored fields below
+            rows = self._lookup_display_rows(keys) or {}
+        return [
+            rows[key] if key in rows else self._render_stored(doc)
+            for key, doc in zip(keys, docs)
+        ]
+
+    def _lookup_display_rows(self, keys: list[T.Any]) -> dict[T.Any, DisplayRow] | None:
+        dir_generation = self.dir_generation
+        if dir_generation is None:
+            return None
+        return display_table.lookup(
+            dir_generation / display_table.DISPLAY_TABLE_FILENAME,
+            self.setting,
+            keys,
+        )
+
+    def _render_stored(self, doc: dict[str, T.Any]) -> DisplayRow:
+        # templates may reference fields the index does not store
+        try:
+            return self.setting.render_batch([doc])[0]
+        except (KeyError, IndexError, AttributeError):
+            return DisplayRow(
+                title=str(doc.get(self.setting.primary_key)),
+                subtitle=None,
+                arg=None,
+                autocomplete=None,
+                icon=None,
+            )
+
+    def render_display_table(self, blocking: bool = True) -> int:
+        """Render the display table of the published index generation again
+        from the data file, if it was rendered with other templates than the
+        current ones.  The index itself is left as is.
+
+        :param blocking: wait for a running build; if ``False``, raise
+            :class:`~afwf_fts_anything.exc.IndexBuildInProgressError` instead.
+        :returns: the number of rows rendered, ``0`` if the table was current.
+        """
+        lock = index_generation.get_build_lock(self.dir_index)
+        if not lock.acquire(blocking=blocking):
+            raise IndexBuildInProgressError(
+                f"the index of dataset {self.name!r} is being built "
+                f"by another process"
+            )
+        try:
+            dir_generation = self.dir_generation
+            if dir_generation is None:
+                raise FileNotFoundError(f"no index found at '{self.dir_index}'")
+            path_table = dir_generation / display_table.DISPLAY_TABLE_FILENAME
+            if display_table.is_current(path_table, self.setting):
+                return 0
+            return display_table.write_table(path_table, self.setting, self.iter_data())
+        finally:
+            lock.release()
+
+    @cached_property
+    def path_candidates(self) -> Path | None:
+        """Where the last incremental :class:`.CandidateSet` is persisted, if
+        :attr:`dir_cache` is set.
+        """
+        if self.dir_cache is None:
+            return None
+        return incremental.get_path_candidates(self.dir_cache, self.dir_index)
+
+    def _get_candidates_stamp(self) -> str | None:
+        generation = read_generation(self.dir_index)
+        if generation is None:
+            return None
+        return f"{generation}-{fields_schema_hash(self.setting.fields)}"
+
+    def search_incremental(
+        self,
+        query: str,
+        limit: int = 20,
+    ) -> list[dict[str, T.Any]]:
+        """Search with the narrowing semantics of :mod:`.incremental`.
+
+        If *query* extends the query of the last complete candidate set (held
+        in memory, or read from :attr:`path_candidates`), those candidates are
+        filtered; otherwise the index is searched for the top
+        :data:`.incremental.CANDIDATE_LIMIT` candidates by relevance, which
+        are then ordered by :attr:`.Setting.sort`.  Without a ``sort``,
+        candidates are ranked by relevance to the query they were found
+        with, so every query is searched instead of refined.  Queries that
+        are not plain are searched normally.
+        """
+        setting = self.setting
+        terms = incremental.parse_terms(query, setting.incremental_min_gram)
+        stamp = None if terms is None else self._get_candidates_stamp()
+        if stamp is None:
+            # not a plain query, or an index without generation token
+            return [hit.source for hit in self._search_hits(query, limit=limit)]
+
+        # refined candidates keep the order of the query they were found
+        # with; only a sort makes that the order of this query, too
+        can_refine = bool(setting.sort)
+        with self._lock:
+            candidates = self._candidates if can_refine else None
+        if candidates is None and can_refine and self.path_candidates is not None:
+            candidates = incremental.load_candidates(self.path_candidates)
+        if candidates is not None and candidates.can_refine(query, stamp):
+            refined = candidates.refine(query, terms)
+        else:
+            if not self.has_index():
+                # no index for the current schema yet; the normal path builds it
+                return [hit.source for hit in self._search_hits(query, limit=limit)]
+            with self._use_reader() as reader:
+                # top hits by relevance; every document containing all the
+                # words matches all their ngrams, so it ranks near the top
+                hits = reader.search(
+                    query,
+                    limit=incremental.CANDIDATE_LIMIT + 1,
+                    apply_sort=False,
+                )
+            refined = incremental.CandidateSet.from_docs(
+                query=query,
+                stamp=stamp,
+                docs=incremental.sort_docs([hit.source for hit in hits], setting.sort),
+                terms=terms,
+                field_names=setting.incremental_fields,
+            )
+            if len(hits) > incremental.CANDIDATE_LIMIT or not can_refine:
+                # the candidate list is truncated or unsorted; don't refine from it
+                with self._lock:
+                    self._candidates = None
+                return refined.docs[:limit]
+
+        with self._lock:
+            self._candidates = refined
+        if refined is not candidates:
+            if self.path_candidates is not None:
+                try:
+                    incremental.dump_candidates(self.path_candidates, refined)
+                except OSError:  # pragma: no cover
+                    pass  # a read-only cache dir must not break searching
+        return refined.docs[:limit]
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming (de)compression of data files.
+
+A ``data_url`` may point at a compressed data file; the compression is told
+by the URL's suffix (see :func:`detect_compression`).  :func:`decompress_file`
+unpacks the downloaded archive into the data file chunk by chunk, so neither
+the archive nor the data is ever held in memory as a whole:
+
+- ``.zip`` — the first member with a data file suffix is extracted,
+- ``.gz``, ``.bz2``, ``.xz`` — standard library codecs,
+- ``.zst`` — needs the optional ``zstandard`` package
+  (``pip install "afwf_fts_anything[zstd]"``), or Python 3.14+.
+
+The same stream codecs can keep the local data file compressed at rest
+(:attr:`.Setting.data_compression`): :func:`open_stream` reads or writes
+such a file as a plain byte stream, which is what the record parsers in
+:mod:`.json_stream` consume.
+"""
+
+import io
+import enum
+import shutil
+import contextlib
+import typing as T
+import urllib.parse
+from pathlib import Path
+from zipfile import ZipFile
+
+CHUNK_SIZE = 1024 * 1024
+"""Bytes decompressed per write to disk."""
+
+
+class CompressionEnum(str, enum.Enum):
+    """Compressed formats accepted for ``data_url``, by file suffix."""
+
+    zip = "zip"
+    gz = "gz"
+    bz2 = "bz2"
+    xz = "xz"
+    zst = "zst"
+
+
+STREAM_COMPRESSIONS = (
+    CompressionEnum.gz,
+    CompressionEnum.bz2,
+    CompressionEnum.xz,
+    CompressionEnum.zst,
+)
+"""Compressions of a single stream, usable for a data file at rest."""
+
+
+def detect_compression(url: str) -> CompressionEnum | None:
+    """Return the compression of the file *url* names, or ``None`` if it is
+    not compressed.  Query strings and fragments are ignored.
+    """
+    path = urllib.parse.urlparse(url).path
+    for compression in CompressionEnum:
+        if path.endswith(f".{compression.value}"):
+            return compression
+    return None
+
+
+def strip_compression_suffix(url: str) -> str:
+    """Return the path of *url* without its compression suffix, e.g.
+    ``/movie-data.jsonl`` for ``https://host/movie-data.jsonl.gz?x=1``.
+    """
+    path = urllib.parse.urlparse(url).path
+    compression = detect_compression(url)
+    if compression is None:
+        return path
+    return path.removesuffix(f".{compression.value}")
+
+
+def _import_zstd():
+    try:
+        import zstandard
+
+        return zstandard
+    except ImportError:
+        pass
+    try:
+        from compression import zstd  # Python 3.14+
+
+        return zstd
+    except ImportError:
+        raise ImportError(
+            "reading or writing a '.zst' data file requires the 'zstandard' "
+            'package, install it with: pip install "afwf_fts_anything[zstd]"'
+        ) from None
+
+
+def _open_zstd(path: Path, mode: str) -> T.BinaryIO:
+    zstd = _import_zstd()
+    if zstd.__name__ != "zstandard":
+        return zstd.open(path, mode)
+    f = path.open(mode)
+    try:
+        if mode == "rb":
+            # buffered, so it can be iterated line by line like the others
+            return io.BufferedReader(
+                zstd.ZstdDecompressor().stream_reader(f, closefd=True)
+            )
+        return zstd.ZstdCompressor().stream_writer(f, closefd=True)
+    except BaseException:
+        f.close()
+        raise
+
+
+def open_stream(
+    path: Path,
+    compression: CompressionEnum | None,
+    mode: str = "rb",
+) -> T.BinaryIO:
+    """
+    Open the file at *path*, compressed with one of
+    :data:`STREAM_COMPRESSIONS` (or not at all if ``None``), as a binary
+    stream of its uncompressed bytes.
+
+    :param mode: ``"rb"`` or ``"wb"``.
+    """
+    if compression is None:
+        return path.open(mode)
+    if compression is CompressionEnum.gz:
+        import gzip
+
+        return gzip.open(path, mode)
+    if compression is CompressionEnum.bz2:
+        import bz2
+
+        return bz2.open(path, mode)
+    if compression is CompressionEnum.xz:
+        import lzma
+
+        return lzma.open(path, mode)
+    if compression is CompressionEnum.zst:
+        return _open_zstd(path, mode)
+    raise ValueError(f"{compression.value!r} is not a stream compression")
+
+
+@contextlib.contextmanager
+def open_decompressed(
+    path: Path,
+    compression: CompressionEnum | None,
+    suffixes: tuple[str, ...] = (".json",),
+) -> T.Iterator[T.BinaryIO]:
+    """
+    Open the compressed file at *path* for reading its decompressed bytes.
+
+    :param suffixes: for ``zip``, the first member whose name ends with one
+        of these is opened.
+    """
+    if compression is not CompressionEnum.zip:
+        with open_stream(path, compression) as f:
+            yield f
+        return
+    with ZipFile(path) as zf:
+        names = [n for n in zf.namelist() if n.endswith(suffixes)]
+        if not names:
+            raise ValueError(
+                f"no member ending with {' / '.join(suffixes)} in zip file '{path}'"
+            )
+        with zf.open(names[0]) as f:
+            yield f
+
+
+def recompress_file(
+    path_src: Path,
+    path_dst: Path,
+    compression_src: CompressionEnum | None,
+    compression_dst: CompressionEnum | None,
+    suffixes: tuple[str, ...] = (".json",),
+) -> None:
+    """
+    Copy *path_src* to *path_dst*, decompressing it from *compression_src*
+    (see :func:`open_decompressed`) and compressing it to *compression_dst*
+    (one of :data:`STREAM_COMPRESSIONS`, or ``None`` for plain), chunk by
+    chunk with constant memory.
+    """
+    with open_decompressed(path_src, compression_src, suffixes) as f_in:
+        with open_stream(path_dst, compression_dst, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, CHUNK_SIZE)
+
+
+def decompress_file(
+    path_src: Path,
+    path_dst: Path,
+    compression: CompressionEnum,
+    suffixes: tuple[str, ...] = (".json",),
+) -> None:
+    """Decompress *path_src* into *path_dst* with constant memory, see
+    :func:`open_decompressed`.
+    """
+    recompress_file(path_src, path_dst, compression, None, suffixes)
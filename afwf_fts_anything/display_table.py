@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+
+"""
+Display columns rendered at index build time.
+
+With :attr:`.Setting.prerender_display`, every index build renders the five
+Alfred display columns (title, subtitle, arg, autocomplete, icon) of every
+record once and stores them in a side table next to the index, keyed by the
+record's :attr:`.Setting.primary_key`.  A search then only looks the rows of
+its hits up by key instead of rendering them, and the templates may reference
+fields that are not stored in the index at all.
+
+The table is a SQLite file, ``display.sqlite``, inside the index generation
+directory (see :mod:`.index_generation`), so it is published, leased and
+removed together with the index it belongs to.  It records a hash of the
+templates it was rendered with (:func:`get_templates_hash`): when the
+templates in the setting change, :meth:`.Dataset.render_display_table`
+renders a new table from the data file and swaps it in, without touching the
+index.  :meth:`.Dataset.update_index` copies the table of the previous
+generation and only renders the added and changed records.
+"""
+
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import typing as T
+from pathlib import Path
+
+from .template import DisplayRow
+from .index_update import hash_record
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .setting import Setting
+
+DISPLAY_TABLE_FILENAME = "display.sqlite"
+"""Name of the display table inside an index generation directory."""
+
+DISPLAY_TABLE_VERSION = 1
+"""Bump when the layout of the display table changes."""
+
+CHUNK_SIZE = 1000
+"""Records rendered and written per batch."""
+
+T_KEY = str | int
+
+
+def get_templates_hash(setting: "Setting") -> str:
+    """Hash of the display templates of *setting*, and of the table layout."""
+    payload = json.dumps(
+        [
+            DISPLAY_TABLE_VERSION,
+            setting.title_field,
+            setting.subtitle_field,
+            setting.arg_field,
+            setting.autocomplete_field,
+            setting.icon_field,
+        ]
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class DisplayTable:
+    """
+    A display table file.
+
+    :param path: the SQLite file; created with an empty table if missing,
+        unless *readonly*.
+    :param readonly: open an existing table for lookups only.
+    """
+
+    def __init__(self, path: Path, readonly: bool = False):
+        self.path = path
+        if readonly:
+            self.conn = sqlite3.connect(f"{path.absolute().as_uri()}?mode=ro", uri=True)
+            return
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS display (
+                key PRIMARY KEY,
+                title, subtitle, arg, autocomplete, icon
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "DisplayTable":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def templates_hash(self) -> str | None:
+        """:func:`get_templates_hash` of the templates the rows were rendered
+        with; ``None`` until the table is complete.
+        """
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE name = 'templates_hash'"
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def set_templates_hash(self, templates_hash: str | None) -> None:
+        with self.conn:
+            if templates_hash is None:
+                self.conn.execute("DELETE FROM meta WHERE name = 'templates_hash'")
+            else:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('templates_hash', ?)",
+                    (templates_hash,),
+                )
+
+    def write_rows(self, keys: list[T_KEY], rows: list[DisplayRow]) -> None:
+        """Insert or replace the rows of *keys*."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO display VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, *row) for key, row in zip(keys, rows)],
+            )
+
+    def delete_rows(self, keys: T.Iterable[T_KEY]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM display WHERE key = ?",
+                [(key,) for key in keys],
+            )
+
+    def get_rows(self, keys: list[T_KEY]) -> dict[T_KEY, DisplayRow]:
+        """Return the rows of those *keys* that are in the table."""
+        rows = {}
+        # stay well below SQLite's limit on host parameters
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            cursor = self.conn.execute(
+                "SELECT * FROM display WHERE key IN "
+                f"({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            for key, *values in cursor:
+                rows[key] = DisplayRow._make(values)
+        return rows
+
+
+class DisplayTableWriter:
+    """
+    Renders records into a :class:`DisplayTable` in batches of
+    :data:`CHUNK_SIZE`.
+
+    :param table: the table to write to.
+    :param setting: provides the templates and the primary key.
+    """
+
+    def __init__(self, table: DisplayTable, setting: "Setting"):
+        self.table = table
+        self.setting = setting
+        self._buffer: list[dict[str, T.Any]] = []
+
+    def add(self, record: dict[str, T.Any]) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        primary_key = self.setting.primary_key
+        keys = [record[primary_key] for record in self._buffer]
+        self.table.write_rows(keys, self.setting.render_batch(self._buffer))
+        self._buffer = []
+
+    def tee(
+        self,
+        records: T.Iterable[dict[str, T.Any]],
+        select: T.Callable[[dict[str, T.Any]], bool] | None = None,
+    ) -> T.Iterator[dict[str, T.Any]]:
+        """Pass *records* through, rendering those *select* returns ``True``
+        for (all by default).  Call :meth:`flush` once they are consumed.
+        """
+        for record in records:
+            if select is None or select(record):
+                self.add(record)
+            yield record
+
+
+def write_table(
+    path: Path,
+    setting: "Setting",
+    records: T.Iterable[dict[str, T.Any]],
+) -> int:
+    """
+    Render *records* into a new display table at *path*, replacing any table
+    there atomically.  Returns the number of rows.
+    """
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    path_tmp.unlink(missing_ok=True)
+    count = 0
+    try:
+        with DisplayTable(path_tmp) as table:
+            writer = DisplayTableWriter(table, setting)
+            for _ in writer.tee(records):
+                count += 1
+            writer.flush()
+            table.set_templates_hash(get_templates_hash(setting))
+        os.replace(path_tmp, path)
+    except BaseException:
+        path_tmp.unlink(missing_ok=True)
+        raise
+    return count
+
+
+def copy_table(path_src: Path, path_dst: Path, setting: "Setting") -> bool:
+    """
+    Copy the display table at *path_src* to *path_dst* if it was rendered
+    with the templates of *setting*.  Returns ``False`` (and copies nothing)
+    otherwise.
+    """
+    if not is_current(path_src, setting):
+        return False
+    shutil.copyfile(path_src, path_dst)
+    return True
+
+
+def is_current(path: Path, setting: "Setting") -> bool:
+    """``True`` if a complete table rendered with the templates of *setting*
+    exists at *path*.
+    """
+    try:
+        with DisplayTable(path, readonly=True) as table:
+            return table.templates_hash == get_templates_hash(setting)
+    except sqlite3.Error:
+        return False
+
+
+def lookup(
+    path: Path,
+    setting: "Setting",
+    keys: list[T_KEY],
+) -> dict[T_KEY, DisplayRow] | None:
+    """
+    Return the rows of those *keys* that are in the display table at *path*,
+    or ``None`` if there is no complete table rendered with the templates of
+    *setting*.
+    """
+    try:
+        with DisplayTable(path, readonly=True) as table:
+            if table.templates_hash != get_templates_hash(setting):
+                return None
+            return table.get_rows(keys)
+    except sqlite3.Error:
+        return None
+
+
+class TableUpdate:
+    """
+    The display table of an index generation made by
+    :meth:`.Dataset.update_index`.
+
+    Starts from a copy of the previous generation's table when it is
+    current, so only added and changed records are rendered; otherwise every
+    record is.  Usage::
+
+        with TableUpdate(path_src, path_dst, setting, old_hashes) as update:
+            records = update.tee(records)
+            ...  # apply the records to the index, get new_hashes
+            update.finish(new_hashes)
+
+    :param path_src: the table of the previous generation.
+    :param path_dst: the table to write.
+    :param setting: provides the templates and the primary key.
+    :param old_hashes: the record hashes of the previous generation, see
+        :mod:`.index_update`.
+    """
+
+    def __init__(
+        self,
+        path_src: Path,
+        path_dst: Path,
+        setting: "Setting",
+        old_hashes: dict[T_KEY, bytes],
+    ):
+        self.setting = setting
+        self.old_hashes = old_hashes
+        self.is_full = not copy_table(path_src, path_dst, setting)
+        self.table = DisplayTable(path_dst)
+        if self.is_full:
+            self.table.set_templates_hash(None)
+        self.writer = DisplayTableWriter(self.table, setting)
+
+    def _is_changed(self, record: dict[str, T.Any]) -> bool:
+        key = record[self.setting.primary_key]
+        return self.old_hashes.get(key) != hash_record(record)
+
+    def tee(self, records: T.Iterable[dict[str, T.Any]]) -> T.Iterator[dict[str, T.Any]]:
+        """Pass *records* through, rendering the added and changed ones."""
+        return self.writer.tee(records, None if self.is_full else self._is_changed)
+
+    def finish(self, new_hashes: dict[T_KEY, bytes]) -> None:
+        """Write the pending rows and drop those of deleted records."""
+        self.writer.flush()
+        if not self.is_full:
+            self.table.delete_rows(self.old_hashes.keys() - new_hashes.keys())
+        self.table.set_templates_hash(get_templates_hash(self.setting))
+
+    def close(self) -> None:
+        self.table.close()
+
+    def __enter__(self) -> "TableUpdate":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+Conditional, streaming downloads of a dataset's ``data_url``.
+
+:func:`fetch` streams the response body to a file in chunks, so a large data
+file is never held in memory.  The ``ETag`` and ``Last-Modified`` headers of
+the last download are remembered in a :class:`DownloadInfo` next to the data
+file (``{name}-download.json``) and sent back as ``If-None-Match`` /
+``If-Modified-Since``; when the server answers ``304 Not Modified`` nothing
+is transferred and the data file — and so the index — is left alone.
+
+The validators are only used while the data file is the one they were
+received with (same ``mtime`` and size), so a hand-edited data file is
+always replaced by a fresh download.
+"""
+
+import os
+import json
+import shutil
+import dataclasses
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+"""Bytes read from the response per write to disk."""
+
+TIMEOUT = 60
+"""Seconds to wait for the server before the download fails."""
+
+
+@dataclasses.dataclass
+class DownloadInfo:
+    """
+    :param url: the URL the data file was downloaded from.
+    :param etag: its ``ETag`` response header, if any.
+    :param last_modified: its ``Last-Modified`` response header, if any.
+    :param data_mtime_ns: ``st_mtime_ns`` of the data file after it was saved.
+    :param data_size: size of that data file in bytes.
+    """
+
+    url: str
+    etag: str | None = None
+    last_modified: str | None = None
+    data_mtime_ns: int | None = None
+    data_size: int | None = None
+
+    @classmethod
+    def load(cls, path: Path) -> "DownloadInfo | None":
+        """Read the download info at *path*; ``None`` if missing or unreadable."""
+        try:
+            return cls(**json.loads(path.read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def dump(self, path: Path) -> None:
+        """Write the download info to *path* atomically."""
+        path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        path_tmp.write_text(json.dumps(dataclasses.asdict(self)))
+        os.replace(path_tmp, path)
+
+    def is_valid_for(self, url: str, path_data: Path) -> bool:
+        """``True`` if the validators still describe *path_data* as
+        downloaded from *url*.
+        """
+        if self.url != url:
+            return False
+        try:
+            st = path_data.stat()
+        except FileNotFoundError:
+            return False
+        return (st.st_mtime_ns, st.st_size) == (self.data_mtime_ns, self.data_size)
+
+
+def fetch(
+    url: str,
+    path: Path,
+    etag: str | None = None,
+    last_modified: str | None = None,
+    timeout: float = TIMEOUT,
+) -> DownloadInfo | None:
+    """
+    Download *url* into the file at *path*, chunk by chunk.
+
+    :param etag: sent as ``If-None-Match``.
+    :param last_modified: sent as ``If-Modified-Since``.
+    :returns: the new validators, or ``None`` if the server answered
+        ``304 Not Modified`` (then *path* is not created).
+    """
+    headers = {}
+    if etag is not None:
+        headers["If-None-Match"] = etag
+    if last_modified is not None:
+        headers["If-Modified-Since"] = last_modified
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None
+        raise
+    with response, path.open("wb") as f:
+        shutil.copyfileobj(response, f, CHUNK_SIZE)
+        return DownloadInfo(
+            url=url,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
@@ -10,3 +10,7 @@ class GetDataError(Exception):
 
 class BuildIndexError(Exception):
     pass
+
+
+class IndexBuildInProgressError(BuildIndexError):
+    pass
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+Search several datasets at once and merge their hits into one list.
+
+:meth:`.DataCatalog.search_many` queries each dataset in its own thread and
+hands the per-dataset hits to :func:`merge_hits`.  BM25 scores of different
+indexes are not comparable, so every dataset's scores are first divided by
+its best score (:func:`normalize_hits`): the top hit of each dataset scores
+``1.0``, and hits of equal normalized score are interleaved by their rank in
+their own dataset.  Alternatively, the hits are ordered by a sort key shared
+by the datasets, the same way :attr:`.Setting.sort` orders one dataset.
+
+On the command line, several datasets are named as one comma-separated
+``--dataset-name a,b,c``.
+"""
+
+import typing as T
+from dataclasses import dataclass, field
+
+from sayt2.api import Hit, SortKey
+
+DATASET_NAME_SEPARATOR = ","
+"""Separates dataset names in a federated ``--dataset-name``."""
+
+
+def split_dataset_names(dataset_name: str) -> list[str]:
+    """``"a, b,a"`` -> ``["a", "b"]``: stripped, without blanks or duplicates."""
+    names = []
+    for name in dataset_name.split(DATASET_NAME_SEPARATOR):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def is_federated(dataset_name: str) -> bool:
+    """``True`` if *dataset_name* names more than one dataset."""
+    return DATASET_NAME_SEPARATOR in dataset_name
+
+
+@dataclass(frozen=True)
+class FederatedHit:
+    """One hit of a federated search, tagged with its source dataset."""
+
+    dataset: str
+    source: dict[str, T.Any]
+    score: float
+    """Relevance score normalized within the dataset, in ``[0, 1]``."""
+    rank: int
+    """0-based position of the hit in its own dataset's result."""
+
+
+@dataclass
+class FederatedResult:
+    """Returned by :meth:`.DataCatalog.search_many`."""
+
+    hits: list[FederatedHit] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+    """Datasets that failed or timed out, mapped to a short description."""
+    building: list[str] = field(default_factory=list)
+    """Datasets left out because another process is building their index."""
+
+
+def normalize_hits(dataset: str, hits: list[Hit]) -> list[FederatedHit]:
+    """Tag *hits* with *dataset* and divide their scores by the best one."""
+    best = max((hit.score for hit in hits), default=0.0)
+    return [
+        FederatedHit(
+            dataset=dataset,
+            source=hit.source,
+            score=hit.score / best if best > 0 else 1.0,
+            rank=rank,
+        )
+        for rank, hit in enumerate(hits)
+    ]
+
+
+def merge_hits(
+    hits_per_dataset: list[list[FederatedHit]],
+    limit: int,
+    sort: list[SortKey] | None = None,
+) -> list[FederatedHit]:
+    """
+    Merge the hits of several datasets and keep the best *limit*.
+
+    Without *sort*, hits are ordered by normalized score, then by rank in
+    their dataset, then by the order of the datasets.  With *sort*, by those
+    fields (hits missing a field come last), ties keeping the score order.
+    """
+    # stable sorts: the dataset order breaks the remaining ties
+    merged = sorted(
+        (hit for hits in hits_per_dataset for hit in hits),
+        key=lambda hit: (-hit.score, hit.rank),
+    )
+    for key in reversed(sort or []):
+        present = [hit for hit in merged if hit.source.get(key.name) is not None]
+        missing = [hit for hit in merged if hit.source.get(key.name) is None]
+        present.sort(key=lambda hit: hit.source[key.name], reverse=key.descending)
+        merged = present + missing
+    return merged[:limit]
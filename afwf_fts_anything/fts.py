@@ -3,18 +3,34 @@
 """
 Pure-logic implementation of the full-text-search Alfred action.
 
-:func:`fts` is dependency-injected (no global ``path_enum`` references) so it
-can be unit-tested in isolation.  ``cli.py`` is responsible for wiring real
-paths and sending feedback to Alfred.
+:func:`fts` / :func:`fts_script_filter` are dependency-injected (no global
+``path_enum`` references) so they can be unit-tested in isolation.
+``cli.py`` is responsible for wiring real paths and sending feedback to
+Alfred.
 """
 
 import enum
+import typing as T
 from pathlib import Path
 
 import afwf.api as afwf
 
+from .exc import IndexBuildInProgressError
+from . import background
+from . import browse_snapshot
+from . import federated
+from . import profiling
+from .response_cache import get_setting_hash
+from .template import DisplayRow
+from .dataset import Dataset
 from .data_catalog import DataCatalog
 
+RERUN_INTERVAL = 0.5
+"""Seconds after which Alfred re-runs the Script Filter while an index is built."""
+
+FEDERATED_TIMEOUT = 5.0
+"""Seconds a federated search waits for the slowest dataset."""
+
 
 class ActionEnum(str, enum.Enum):
     """Alfred action triggered when the user presses Enter on a search result."""
@@ -26,17 +42,233 @@ class ActionEnum(str, enum.Enum):
     """Pass *arg* to :meth:`afwf.Item.open_file` — suitable for file-path args."""
 
 
-def fts(
+class FailedScriptFilter(afwf.ScriptFilter):
+    """
+    The answer of a search that did not succeed — a missing setting, an
+    index that is being built or failed to build, a failed search — as
+    items for Alfred.  Unlike a normal answer it is never cached, so the
+    next keystroke tries again.
+    """
+
+
+def _make_items(
+    dataset: Dataset,
+    doc_list: list[dict[str, T.Any]],
+    action: ActionEnum,
+) -> list[afwf.Item]:
+    """Render *doc_list* with the display templates of *dataset*."""
+    with profiling.phase("render"):
+        rows = dataset.get_display_rows(doc_list)
+    with profiling.phase("items"):
+        return [_make_item(dataset, row, action) for row in rows]
+
+
+def _make_item(
+    dataset: Dataset,
+    row: DisplayRow,
+    action: ActionEnum,
+) -> afwf.Item:
+    arg = row.arg
+    item = afwf.Item(
+        title=row.title,
+        subtitle=row.subtitle,
+        arg=arg,
+        autocomplete=row.autocomplete,
+    )
+    if arg is not None:
+        if action is ActionEnum.open_url:
+            item.open_url(url=arg)
+        elif action is ActionEnum.open_file:
+            item.open_file(arg)
+        else:
+            raise TypeError(f"Unsupported action: {action!r}")
+    icon = row.icon
+    if icon is not None:
+        if icon.startswith("/"):
+            # absolute path — use as-is
+            item.set_icon(icon)
+        else:
+            # relative filename — resolve against the dataset's icons directory
+            item.set_icon(str(dataset.dir_root / "icons" / icon))
+    return item
+
+
+def _no_result_item(query: str) -> afwf.Item:
+    # non-empty query produced no hits — show a placeholder instead of blank results
+    return afwf.Item(
+        title=f"No result found for query: {query!r}",
+        subtitle="hit 'Tab' to enter a new query",
+        autocomplete=" ",
+        icon=afwf.Icon(path=afwf.IconFileEnum.error),
+    )
+
+
+def _build_in_progress_item(dataset_name: str) -> afwf.Item:
+    # another process is building the index; Alfred re-runs until it is ready
+    return afwf.Item(
+        title=f"Indexing dataset {dataset_name!r} in progress …",
+        subtitle="results show up here as soon as the index is ready",
+        valid=False,
+        icon=afwf.Icon(path=afwf.IconFileEnum.refresh),
+    )
+
+
+def _error_log_item(path_error_log: Path) -> afwf.Item:
+    # empty query (first open) — the error-log shortcut at the bottom
+    log_item = afwf.Item(
+        title="Open error log",
+        subtitle=str(path_error_log),
+        icon=afwf.Icon(path=afwf.IconFileEnum.error),
+    )
+    log_item.open_file(str(path_error_log))
+    return log_item
+
+
+def _save_browse_snapshot(
+    dir_generation: Path,
+    setting_hash: str,
+    action: ActionEnum,
+    items: list[afwf.Item],
+) -> None:
+    # items: the answer of the empty query, before the error log item
+    browse_snapshot.write_snapshot(
+        browse_snapshot.get_path_snapshot(dir_generation, action.value),
+        setting_hash=setting_hash,
+        script_filter=afwf.ScriptFilter(items=items).to_script_filter(),
+        error_log_item=_error_log_item(
+            Path(browse_snapshot.ERROR_LOG_PLACEHOLDER)
+        ).to_script_filter(),
+    )
+
+
+def write_browse_snapshots(dataset: Dataset, dir_generation: Path) -> None:
+    """
+    Render the answer of the empty query into the :mod:`.browse_snapshot`
+    files of *dir_generation*, the published index generation of *dataset*,
+    for every action.  Called by :class:`.Dataset` when it publishes one.
+    """
+    setting_hash = get_setting_hash(dataset.path_setting)
+    if setting_hash is None:
+        return
+    doc_list = dataset.search("*")
+    for action in ActionEnum:
+        items = _make_items(dataset, doc_list, action)
+        _save_browse_snapshot(dir_generation, setting_hash, action, items)
+
+
+def federated_script_filter(
+    dataset_names: list[str],
+    query: str,
+    dir_datacatalog_root: Path,
+    action: ActionEnum = ActionEnum.open_url,
+    path_error_log: Path | None = None,
+    dir_cache: Path | None = None,
+    datasets: T.Mapping[str, Dataset] | None = None,
+    timeout: float | None = FEDERATED_TIMEOUT,
+) -> afwf.ScriptFilter:
+    """
+    :func:`fts_script_filter` over several datasets at once, see
+    :meth:`.DataCatalog.search_many`.
+
+    Each item is rendered with the display templates of its own dataset, its
+    subtitle is prefixed with ``[{dataset name}]`` and its ``dataset``
+    variable is set.  Hits are merged by normalized relevance, or by the
+    datasets' ``sort`` when they all share the same one.  A dataset that
+    fails or times out is reported as an extra item after the results, and
+    the answer is then a :class:`FailedScriptFilter`.  So is a dataset whose
+    index another process is building: it gets an "Indexing in progress" item
+    and ``rerun`` is set, like in :func:`fts_script_filter`.
+
+    :param datasets: warm :class:`.Dataset` objects by name (the daemon's,
+        which share its :class:`.HandlePool`).
+    :param timeout: seconds to wait for the slowest dataset.
+    """
+    catalog = DataCatalog(dir_root=dir_datacatalog_root, dir_cache=dir_cache)
+    datasets = {
+        name: (datasets or {}).get(name) or catalog.get_dataset(name)
+        for name in dataset_names
+    }
+
+    if query == "?":
+        items = []
+        for name, dataset in datasets.items():
+            item = afwf.Item(
+                title=f"Open {name!r} dataset folder location",
+                subtitle="hit 'Enter' to open folder location",
+                icon=afwf.Icon(path=afwf.IconFileEnum.question),
+            )
+            item.reveal_file_in_finder(str(dataset.path_setting))
+            items.append(item)
+        return afwf.ScriptFilter(items=items)
+
+    sorts = []
+    for dataset in datasets.values():
+        try:
+            sorts.append(dataset.setting.sort)
+        except Exception:
+            pass  # reported by search_many
+    shared_sort = sorts[0] if sorts and all(sort == sorts[0] for sort in sorts) else None
+
+    result = catalog.search_many(
+        dataset_names,
+        query or "*",
+        timeout=timeout,
+        sort=shared_sort,
+        datasets=datasets,
+    )
+
+    # render each dataset's hits together, then restore the merged order
+    positions: dict[str, list[int]] = {}
+    for i, hit in enumerate(result.hits):
+        positions.setdefault(hit.dataset, []).append(i)
+    items: list[afwf.Item | None] = [None] * len(result.hits)
+    for name, indexes in positions.items():
+        doc_list = [result.hits[i].source for i in indexes]
+        for i, item in zip(indexes, _make_items(datasets[name], doc_list, action)):
+            item.subtitle = f"[{name}] {item.subtitle or ''}".rstrip()
+            item.variables["dataset"] = name
+            items[i] = item
+
+    if not items and query and not result.errors and not result.building:
+        items.append(_no_result_item(query))
+    for name in result.building:
+        items.append(_build_in_progress_item(name))
+    for name, error in result.errors.items():
+        items.append(
+            afwf.Item(
+                title=f"Search failed for dataset {name!r}",
+                subtitle=error,
+                valid=False,
+                icon=afwf.Icon(path=afwf.IconFileEnum.error),
+            )
+        )
+    if not query and path_error_log is not None:
+        items.append(_error_log_item(path_error_log))
+    if result.building:
+        return FailedScriptFilter(items=items, rerun=RERUN_INTERVAL)
+    if result.errors:
+        return FailedScriptFilter(items=items)
+    return afwf.ScriptFilter(items=items)
+
+
+def fts_script_filter(
     dataset_name: str,
     query: str,
     dir_datacatalog_root: Path,
     action: ActionEnum = ActionEnum.open_url,
     path_error_log: Path | None = None,
-) -> list[afwf.Item]:
+    dataset: Dataset | None = None,
+    dir_cache: Path | None = None,
+) -> afwf.ScriptFilter:
     """
     Core full-text-search logic for the ``fts`` Alfred Script Filter.
 
-    :param dataset_name: name of the dataset to search.
+    Returns the complete :class:`afwf.ScriptFilter`; :func:`fts` returns just
+    its items.
+
+    :param dataset_name: name of the dataset to search; several
+        comma-separated names are searched together with
+        :func:`federated_script_filter`.
     :param query: user's raw query string (already normalised by the caller —
         never a ``bool``).
     :param dir_datacatalog_root: root directory of the :class:`.DataCatalog`;
@@ -45,21 +277,50 @@ def fts(
         :attr:`ActionEnum.open_url`.
     :param path_error_log: when provided and *query* is empty, an
         "Open error log" item is appended so the user can access it from Alfred.
+    :param dataset: an already-resolved :class:`.Dataset` to use instead of
+        looking *dataset_name* up under *dir_datacatalog_root*.  Long-lived
+        callers (the :mod:`.daemon`) pass their warm instance here so the
+        parsed setting and open index reader are reused across calls.
+    :param dir_cache: optional cache directory, forwarded to the
+        :class:`.DataCatalog` (compiled-setting cache).
 
     **Branches**
 
     - ``query == "?"`` — reveal the dataset's setting file in Finder; returns
       immediately without touching the index.
+    - No index yet and another process is building it — a single
+      "Indexing in progress" item, with ``rerun`` set to
+      :data:`RERUN_INTERVAL` so Alfred asks again until the index is ready.
     - Otherwise — build the index on first run if absent, then search.
-      An empty query is translated to ``"*"`` (tantivy all-documents wildcard).
+      When the index is stale (see :meth:`.Dataset.needs_refresh`), a
+      background refresh is started and the current index answers.
+      An empty query is translated to ``"*"`` (tantivy all-documents wildcard),
+      and its answer saved as the generation's :mod:`.browse_snapshot` unless
+      a current one exists.
       Falls back to a "No result found" item when the index returns no hits for
       a non-empty query.  Appends the error-log item when *query* is empty and
       *path_error_log* is given.
+
+    A missing setting, an index that cannot be built (yet) and a failed search
+    are answered with a :class:`FailedScriptFilter`.
     """
-    catalog = DataCatalog(dir_root=dir_datacatalog_root)
-    dataset = catalog.get_dataset(dataset_name)
+    if dataset is None and federated.is_federated(dataset_name):
+        return federated_script_filter(
+            dataset_names=federated.split_dataset_names(dataset_name),
+            query=query,
+            dir_datacatalog_root=dir_datacatalog_root,
+            action=action,
+            path_error_log=path_error_log,
+            dir_cache=dir_cache,
+        )
+
+    with profiling.phase("setting"):
+        if dataset is None:
+            catalog = DataCatalog(dir_root=dir_datacatalog_root, dir_cache=dir_cache)
+            dataset = catalog.get_dataset(dataset_name)
+        setting_exists = dataset.path_setting.exists()
 
-    if not dataset.path_setting.exists():
+    if not setting_exists:
         item = afwf.Item(
             title=f"Setting file not found for dataset {dataset_name!r}",
             subtitle=str(dataset.path_setting),
@@ -67,7 +328,7 @@ def fts(
             icon=afwf.Icon(path=afwf.IconFileEnum.error),
         )
         item.open_file(str(dataset.path_setting))
-        return [item]
+        return FailedScriptFilter(items=[item])
 
     if query == "?":
         # special "?" query: reveal the dataset's setting file in Finder instead of searching
@@ -77,12 +338,19 @@ def fts(
             icon=afwf.Icon(path=afwf.IconFileEnum.question),
         )
         item.reveal_file_in_finder(str(dataset.path_setting))
-        return [item]
+        return afwf.ScriptFilter(items=[item])
 
-    # normal search path: build the index on first run if it doesn't exist yet
-    if not dataset.dir_index.exists():
+    # normal search path: build the index on first run if it doesn't exist yet;
+    # while one process builds it, the others (more keystrokes) don't wait
+    with profiling.phase("index_check"):
+        has_index = dataset.has_index()
+    if not has_index:
         try:
-            dataset.build_index()
+            with profiling.phase("index_build"):
+                dataset.ensure_index(blocking=False)
+        except IndexBuildInProgressError:
+            item = _build_in_progress_item(dataset_name)
+            return FailedScriptFilter(items=[item], rerun=RERUN_INTERVAL)
         except Exception as e:
             item = afwf.Item(
                 title=f"Failed to build index for dataset {dataset_name!r}: {type(e).__name__}",
@@ -91,8 +359,22 @@ def fts(
                 icon=afwf.Icon(path=afwf.IconFileEnum.error),
             )
             item.open_file(str(dataset.path_setting))
-            return [item]
+            return FailedScriptFilter(items=[item])
+    else:
+        # stale-while-revalidate: answer from the published index right away
+        # and let a detached process bring it up to date
+        try:
+            with profiling.phase("index_check"):
+                needs_refresh = dataset.needs_refresh()
+            if needs_refresh:
+                with profiling.phase("refresh"):
+                    background.spawn_refresh(dataset, path_log=path_error_log)
+        except Exception:  # pragma: no cover
+            pass  # a failed freshness check must not break searching
 
+    # resolved before searching: a snapshot is never saved into a newer
+    # generation than the one its items come from
+    dir_generation = None if query else dataset.dir_generation
     try:
         doc_list = dataset.search(query or "*")  # empty query → "*" to return all docs
     except Exception as e:
@@ -103,53 +385,49 @@ def fts(
             icon=afwf.Icon(path=afwf.IconFileEnum.error),
         )
         item.open_file(str(dataset.path_setting))
-        return [item]
-    setting = dataset.setting
-    items = []
-    for doc in doc_list:
-        arg = setting.format_arg(doc)
-        item = afwf.Item(
-            title=setting.format_title(doc),
-            subtitle=setting.format_subtitle(doc),
-            arg=arg,
-            autocomplete=setting.format_autocomplete(doc),
-        )
-        if arg is not None:
-            if action is ActionEnum.open_url:
-                item.open_url(url=arg)
-            elif action is ActionEnum.open_file:
-                item.open_file(arg)
-            else:
-                raise TypeError(f"Unsupported action: {action!r}")
-        icon = setting.format_icon(doc)
-        if icon is not None:
-            if icon.startswith("/"):
-                # absolute path — use as-is
-                item.set_icon(icon)
-            else:
-                # relative filename — resolve against the dataset's icons directory
-                item.set_icon(str(dataset.dir_root / "icons" / icon))
-        items.append(item)
+        return FailedScriptFilter(items=[item])
+    items = _make_items(dataset, doc_list, action)
+
+    if dir_generation is not None:
+        # the browse snapshot is missing or was rendered with another setting
+        # (otherwise the CLI would have answered from it); save this answer
+        try:
+            setting_hash = get_setting_hash(dataset.path_setting)
+            path_snapshot = browse_snapshot.get_path_snapshot(dir_generation, action.value)
+            if setting_hash is not None and (
+                browse_snapshot.load_snapshot(path_snapshot, setting_hash) is None
+            ):
+                _save_browse_snapshot(dir_generation, setting_hash, action, items)
+        except OSError:  # pragma: no cover
+            pass  # e.g. the generation was removed meanwhile
 
     if not items and query:
-        # non-empty query produced no hits — show a placeholder instead of blank results
-        items.append(
-            afwf.Item(
-                title=f"No result found for query: {query!r}",
-                subtitle="hit 'Tab' to enter a new query",
-                autocomplete=" ",
-                icon=afwf.Icon(path=afwf.IconFileEnum.error),
-            )
-        )
+        items.append(_no_result_item(query))
 
     if not query and path_error_log is not None:
-        # empty query (first open) — append the error-log shortcut at the bottom
-        log_item = afwf.Item(
-            title="Open error log",
-            subtitle=str(path_error_log),
-            icon=afwf.Icon(path=afwf.IconFileEnum.error),
-        )
-        log_item.open_file(str(path_error_log))
-        items.append(log_item)
+        items.append(_error_log_item(path_error_log))
+
+    return afwf.ScriptFilter(items=items)
+
 
-    return items
+def fts(
+    dataset_name: str,
+    query: str,
+    dir_datacatalog_root: Path,
+    action: ActionEnum = ActionEnum.open_url,
+    path_error_log: Path | None = None,
+    dataset: Dataset | None = None,
+    dir_cache: Path | None = None,
+) -> list[afwf.Item]:
+    """
+    The items of :func:`fts_script_filter`; see there for the parameters.
+    """
+    return fts_script_filter(
+        dataset_name=dataset_name,
+        query=query,
+        dir_datacatalog_root=dir_datacatalog_root,
+        action=action,
+        path_error_log=path_error_log,
+        dataset=dataset,
+        dir_cache=dir_cache,
+    ).items
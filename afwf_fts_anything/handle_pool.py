@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""
+A shared pool of long-lived index readers, for processes that search many
+datasets many times, e.g. a service embedding :mod:`afwf_fts_anything.api`.
+
+Without a pool, every :meth:`.Dataset.search` opens the index and drops it
+again.  A :class:`HandlePool` handed to a :class:`.DataCatalog` (or to a
+:class:`.Dataset`) keeps one :class:`.IndexReader` per dataset open instead:
+
+- it is thread-safe; any number of threads can search the same reader;
+- it bounds the open readers by count (*max_open*) and by the size of their
+  indexes on disk (*max_bytes*), closing the least recently used ones;
+- a reader whose index generation was superseded (see
+  :mod:`.index_generation`), or whose setting changed its fields or sort, is
+  reopened on its next use, so new builds are picked up without a restart.
+
+A reader is only closed — releasing the lease on its generation — once no
+thread uses it any more, so a search never loses its index halfway.
+"""
+
+import os
+import threading
+import contextlib
+import typing as T
+from pathlib import Path
+from collections import OrderedDict
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .dataset import Dataset, IndexReader
+
+DEFAULT_MAX_OPEN = 16
+"""Default maximum number of open readers."""
+
+
+def get_index_size(dir_index: Path) -> int:
+    """Total size of the files of a tantivy index directory, in bytes."""
+    size = 0
+    with os.scandir(dir_index) as it:
+        for entry in it:
+            if entry.is_file():
+                size += entry.stat().st_size
+    return size
+
+
+class _Entry:
+    # one open reader and the threads using it
+    def __init__(self, reader: "IndexReader", size: int):
+        self.reader = reader
+        self.size = size
+        self.users = 0
+        self.retired = False
+
+
+class HandlePool:
+    """
+    Least-recently-used pool of open :class:`.IndexReader` objects, keyed by
+    the dataset's index directory.
+
+    :param max_open: maximum number of open readers.
+    :param max_bytes: maximum total size of the open indexes on disk, in
+        bytes; no limit by default.  The most recently used reader is kept
+        even when it alone is larger.
+    """
+
+    def __init__(
+        self,
+        max_open: int = DEFAULT_MAX_OPEN,
+        max_bytes: int | None = None,
+    ):
+        if max_open < 1:
+            raise ValueError(f"max_open must be at least 1, got {max_open}")
+        self.max_open = max_open
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Path, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def open_bytes(self) -> int:
+        """Total size of the open indexes on disk, in bytes."""
+        with self._lock:
+            return sum(entry.size for entry in self._entries.values())
+
+    @contextlib.contextmanager
+    def reader(self, dataset: "Dataset") -> T.Iterator["IndexReader"]:
+        """
+        Use the reader of *dataset* for the ``with`` block, opening it first
+        if it is not in the pool or out of date.
+
+        Raises :class:`FileNotFoundError` if the index has not been built.
+        """
+        entry = self._checkout(dataset)
+        try:
+            yield entry.reader
+        finally:
+            self._checkin(entry)
+
+    def _is_usable(self, entry: _Entry, dataset: "Dataset") -> bool:
+        reader = entry.reader
+        setting = dataset.setting
+        return (
+            reader.fields == setting.fields
+            and reader.sort == setting.sort
+            and not reader.is_stale()
+        )
+
+    def _checkout(self, dataset: "Dataset") -> _Entry:
+        key = dataset.dir_index
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_usable(entry, dataset):
+                    self._entries.move_to_end(key)
+                    entry.users += 1
+                    return entry
+                self._retire(self._entries.pop(key))
+
+        # open outside the lock: it is the slow part, and other datasets
+        # must not wait for it
+        reader = dataset.get_index_reader()
+        try:
+            entry = _Entry(reader, size=get_index_size(reader.dir_index))
+        except BaseException:
+            reader.close()
+            raise
+        entry.users = 1
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                # opened by another thread meanwhile; ours is as recent
+                self._retire(old)
+            self._entries[key] = entry
+            self._evict()
+        return entry
+
+    def _checkin(self, entry: _Entry) -> None:
+        with self._lock:
+            entry.users -= 1
+            if entry.retired and entry.users == 0:
+                entry.reader.close()
+
+    def _retire(self, entry: _Entry) -> None:
+        # the caller holds the lock and removed the entry from the pool
+        entry.retired = True
+        if entry.users == 0:
+            entry.reader.close()
+
+    def _evict(self) -> None:
+        # the caller holds the lock
+        total = sum(entry.size for entry in self._entries.values())
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_open
+            or (self.max_bytes is not None and total > self.max_bytes)
+        ):
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.size
+            self._retire(entry)
+
+    def discard(self, dir_index: Path) -> None:
+        """Close the reader of the dataset with index directory *dir_index*,
+        as soon as no thread uses it.
+        """
+        with self._lock:
+            entry = self._entries.pop(dir_index, None)
+            if entry is not None:
+                self._retire(entry)
+
+    def close(self) -> None:
+        """Close every reader, as soon as no thread uses it.  The pool stays
+        usable and opens readers again on demand.
+        """
+        with self._lock:
+            while self._entries:
+                _, entry = self._entries.popitem(last=False)
+                self._retire(entry)
+
+    def __enter__(self) -> "HandlePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental (search-as-you-type) refinement of candidate sets.
+
+Alfred calls ``fts`` with ``"ma"``, ``"mat"``, ``"matr"`` ... in quick
+succession.  With :attr:`.Setting.incremental_search` enabled, a *plain*
+query — whitespace separated words, each at least
+:attr:`.Setting.incremental_min_gram` characters long — narrows the result:
+a document matches when **every** word occurs, case-insensitively, in one of
+the :attr:`.Setting.incremental_fields` (lowercase ngram fields).
+
+Because those fields are ngram-indexed, every such document is also a
+tantivy hit, so the complete result of a query is a superset of the result of
+any extension of it.  :class:`.Dataset` keeps the complete, ranked candidate
+list of the last query as a :class:`CandidateSet` (in memory, and in
+``{dir_cache}/incremental/`` for one-shot CLI processes).  When the next query
+extends it, the candidates are filtered with plain substring checks instead
+of searching the index again.  Refined results keep the ranking of the query
+the candidates came from, so candidates are only refined with ``sort``
+configured; without it, every query is searched and ranked by relevance to
+itself, still with the narrowing semantics.
+
+Queries with tantivy syntax or short words are searched normally.  A query
+with more than :data:`CANDIDATE_LIMIT` candidates, or after the index was
+rebuilt, is searched in full and not refined from.
+"""
+
+import os
+import re
+import pickle
+import hashlib
+import threading
+import typing as T
+from pathlib import Path
+from dataclasses import dataclass
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from sayt2.api import SortKey
+
+CANDIDATE_LIMIT = 2_000
+"""Largest candidate list that is kept for refinement."""
+
+_p_word = re.compile(r"\w+")
+_operators = {"AND", "OR", "NOT"}
+
+
+def parse_terms(query: str, min_gram: int) -> list[str] | None:
+    """
+    Return the lowercased words of a plain *query*, or ``None`` when the
+    query is not eligible for incremental search.
+
+    A query is plain when it has at least one word, every word consists of
+    word characters only (no tantivy query syntax), is not a boolean
+    operator, and is at least *min_gram* characters long.
+    """
+    words = query.split()
+    if not words:
+        return None
+    for word in words:
+        if (
+            len(word) < min_gram
+            or word in _operators
+            or _p_word.fullmatch(word) is None
+        ):
+            return None
+    return [word.lower() for word in words]
+
+
+def make_haystack(doc: dict[str, T.Any], field_names: T.Sequence[str]) -> str:
+    """Lowercased text of *field_names* in *doc* that words are matched against."""
+    return "\n".join(str(doc.get(name, "")).lower() for name in field_names)
+
+
+def match(haystack: str, terms: T.Sequence[str]) -> bool:
+    """``True`` when every term occurs in *haystack*."""
+    for term in terms:
+        if term not in haystack:
+            return False
+    return True
+
+
+def sort_docs(
+    docs: list[dict[str, T.Any]],
+    sort: T.Sequence["SortKey"] | None,
+) -> list[dict[str, T.Any]]:
+    """
+    Order *docs* by the *sort* keys the way ``sayt2`` does: one stable sort
+    pass per key, least significant first, missing values as ``0``.
+    """
+    if not sort:
+        return docs
+    docs = list(docs)
+    for sort_key in reversed(sort):
+        docs.sort(
+            key=lambda doc, _name=sort_key.name: doc.get(_name, 0),
+            reverse=sort_key.descending,
+        )
+    return docs
+
+
+@dataclass
+class CandidateSet:
+    """
+    The complete, ranked result of one plain query.
+
+    :param query: the query that produced the candidates.
+    :param stamp: identifies the index and schema the candidates came from;
+        a candidate set is only refined under the same stamp.
+    :param docs: matching documents, in rank order.
+    :param haystacks: :func:`make_haystack` of each document.
+    """
+
+    query: str
+    stamp: str
+    docs: list[dict[str, T.Any]]
+    haystacks: list[str]
+
+    @classmethod
+    def from_docs(
+        cls,
+        query: str,
+        stamp: str,
+        docs: T.Iterable[dict[str, T.Any]],
+        terms: T.Sequence[str],
+        field_names: T.Sequence[str],
+    ) -> "CandidateSet":
+        """Keep the documents of *docs* that match *terms*."""
+        kept_docs = []
+        haystacks = []
+        for doc in docs:
+            haystack = make_haystack(doc, field_names)
+            if match(haystack, terms):
+                kept_docs.append(doc)
+                haystacks.append(haystack)
+        return cls(query=query, stamp=stamp, docs=kept_docs, haystacks=haystacks)
+
+    def can_refine(self, query: str, stamp: str) -> bool:
+        """``True`` when *query* extends :attr:`query` on the same index."""
+        return stamp == self.stamp and query.startswith(self.query)
+
+    def refine(self, query: str, terms: T.Sequence[str]) -> "CandidateSet":
+        """Return the candidates of *query*, a query that extends :attr:`query`."""
+        if query == self.query:
+            return self
+        docs = []
+        haystacks = []
+        for doc, haystack in zip(self.docs, self.haystacks):
+            if match(haystack, terms):
+                docs.append(doc)
+                haystacks.append(haystack)
+        return CandidateSet(query=query, stamp=self.stamp, docs=docs, haystacks=haystacks)
+
+
+def get_path_candidates(dir_cache: Path, dir_index: Path) -> Path:
+    """Return the file that persists the last :class:`CandidateSet` of an index."""
+    key = hashlib.sha256(str(dir_index.absolute()).encode("utf-8")).hexdigest()
+    return dir_cache / "incremental" / f"{key[:16]}.pickle"
+
+
+def load_candidates(path: Path) -> CandidateSet | None:
+    """Read a persisted :class:`CandidateSet`; ``None`` if missing or unreadable."""
+    try:
+        candidates = pickle.loads(path.read_bytes())
+    except Exception:
+        return None
+    if not isinstance(candidates, CandidateSet):
+        return None
+    return candidates
+
+
+def dump_candidates(path: Path, candidates: CandidateSet) -> None:
+    """Persist *candidates* atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    path_tmp.write_bytes(pickle.dumps(candidates, protocol=pickle.HIGHEST_PROTOCOL))
+    os.replace(path_tmp, path)
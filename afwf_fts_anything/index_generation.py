@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""
+Immutable index generations published by an atomic pointer flip.
+
+Every build or update of a dataset's index writes a new *generation*
+directory, and searches only ever open the generation that ``current``
+points to::
+
+    {name}-index/
+        current -> gen-...      # the published generation
+        build.lock              # serializes builds of this dataset
+        refresh.requested       # throttles background refreshes
+        gen-.../                # one complete sayt2 dataset root
+            .lease              # shared-locked by every reader of it
+            build-info.json     # what it was built from, see build_info
+            {name}/index-{schema_hash}/
+            {name}/cache/
+            record-hashes.pickle
+            display.sqlite      # see display_table
+            browse-{action}.json  # see browse_snapshot
+
+A generation is filled in completely, then :func:`publish` swaps the
+``current`` symlink with one :func:`os.replace`, so a search sees either the
+old or the new index — never a missing or half-built one.  Symlinks need
+extra privileges on Windows, so there ``current`` is a small file holding
+the generation name instead, replaced the same way.  Readers hold a
+shared lock on the generation's ``.lease`` file (:func:`lease_generation`)
+for as long as they use it; :func:`collect_garbage` removes every other
+generation it can lock exclusively, i.e. that nobody reads any more.
+
+The name of the current generation doubles as the token that invalidates
+cached answers (see :mod:`.response_cache` and :mod:`.incremental`).  Only
+the standard library is imported, so the CLI fast path can read it cheaply.
+"""
+
+import os
+import time
+import shutil
+from pathlib import Path
+
+from .locks import FileLock
+
+CURRENT_LINK = "current"
+"""Name of the symlink to the published generation inside ``{name}-index/``."""
+
+USE_SYMLINK = os.name != "nt"
+"""Publish with a symlink; with ``False``, ``current`` is a pointer file."""
+
+PUBLISH_RETRIES = 10
+"""Attempts to replace the pointer file while a reader has it open (Windows)."""
+
+BUILD_LOCK_FILENAME = "build.lock"
+"""Name of the lock file that serializes builds inside ``{name}-index/``."""
+
+REFRESH_REQUEST_FILENAME = "refresh.requested"
+"""Name of the file whose mtime records the last background refresh request."""
+
+LEASE_FILENAME = ".lease"
+"""Name of the lock file readers share-lock inside a generation."""
+
+GENERATION_PREFIX = "gen-"
+
+
+def read_generation(dir_index: Path) -> str | None:
+    """Return the name of the published generation, or ``None`` if there is none."""
+    path_link = dir_index / CURRENT_LINK
+    try:
+        if USE_SYMLINK:
+            return os.readlink(path_link)
+        return path_link.read_text(encoding="utf-8") or None
+    except OSError:
+        return None
+
+
+def get_current_dir(dir_index: Path) -> Path | None:
+    """Return the directory of the published generation, or ``None``."""
+    generation = read_generation(dir_index)
+    if generation is None:
+        return None
+    return dir_index / generation
+
+
+def get_build_lock(dir_index: Path) -> FileLock:
+    """Return the (not yet acquired) lock that serializes builds of *dir_index*."""
+    dir_index.mkdir(parents=True, exist_ok=True)
+    return FileLock(dir_index / BUILD_LOCK_FILENAME)
+
+
+def create_generation(dir_index: Path) -> Path:
+    """Create and return a new, empty, unpublished generation directory."""
+    dir_index.mkdir(parents=True, exist_ok=True)
+    dir_generation = dir_index / (
+        f"{GENERATION_PREFIX}{os.getpid()}-{os.urandom(8).hex()}"
+    )
+    dir_generation.mkdir()
+    (dir_generation / LEASE_FILENAME).touch()
+    return dir_generation
+
+
+def link_tree(dir_src: Path, dir_dst: Path) -> None:
+    """
+    Copy the files of *dir_src* to *dir_dst* as hard links.
+
+    tantivy never modifies a segment file and replaces ``meta.json``
+    atomically, so an index copied this way can be updated without touching
+    the original.  Its writer lock files are not copied.
+    """
+    dir_dst.mkdir(parents=True, exist_ok=True)
+    for path in dir_src.iterdir():
+        if path.name.startswith(".tantivy-") and path.name.endswith(".lock"):
+            continue
+        if path.is_dir():
+            link_tree(path, dir_dst / path.name)
+            continue
+        try:
+            os.link(path, dir_dst / path.name)
+        except OSError:  # pragma: no cover
+            # e.g. a file system without hard links
+            shutil.copy2(path, dir_dst / path.name)
+
+
+def publish(dir_index: Path, dir_generation: Path) -> None:
+    """Atomically point ``current`` at *dir_generation*."""
+    path_link = dir_index / CURRENT_LINK
+    path_tmp = dir_index / f"{CURRENT_LINK}.{os.getpid()}.tmp"
+    path_tmp.unlink(missing_ok=True)
+    if USE_SYMLINK:
+        os.symlink(dir_generation.name, path_tmp)
+        os.replace(path_tmp, path_link)
+        return
+    path_tmp.write_text(dir_generation.name, encoding="utf-8")
+    for attempt in range(PUBLISH_RETRIES):
+        try:
+            os.replace(path_tmp, path_link)
+            return
+        except PermissionError:
+            # Windows refuses to replace a file another process has open
+            if attempt == PUBLISH_RETRIES - 1:
+                raise
+            time.sleep(0.01 * (attempt + 1))
+
+
+def collect_garbage(dir_index: Path) -> list[str]:
+    """
+    Remove every entry of *dir_index* except ``current``, the build lock, the
+    refresh request and the generations that are published or leased;
+    returns the removed names.
+
+    Call with the build lock held, so an unpublished generation that is
+    still being built is not removed.  Files left by releases before
+    generations existed are removed too.
+    """
+    current = read_generation(dir_index)
+    keep = {CURRENT_LINK, BUILD_LOCK_FILENAME, REFRESH_REQUEST_FILENAME, current}
+    removed = []
+    for path in sorted(dir_index.iterdir()):
+        if path.name in keep:
+            continue
+        if path.is_symlink() or not path.is_dir():
+            path.unlink(missing_ok=True)
+            removed.append(path.name)
+            continue
+        if path.name.startswith(GENERATION_PREFIX):
+            lease = FileLock(path / LEASE_FILENAME)
+            if not lease.acquire(blocking=False):
+                continue  # still read by someone
+            try:
+                shutil.rmtree(path, ignore_errors=True)
+            finally:
+                lease.release()
+            # Windows keeps the open lease file, and with it the directory
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+        removed.append(path.name)
+    return removed
+
+
+class Lease:
+    """
+    A shared lock on the ``.lease`` file of a generation; while it is held,
+    :func:`collect_garbage` leaves the generation alone.
+    """
+
+    def __init__(self, dir_generation: Path, lock: FileLock):
+        self.dir_generation = dir_generation
+        self._lock = lock
+
+    @property
+    def generation(self) -> str:
+        return self.dir_generation.name
+
+    def is_current(self) -> bool:
+        """``True`` while the leased generation is the published one."""
+        return read_generation(self.dir_generation.parent) == self.generation
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def __enter__(self) -> "Lease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def lease_generation(dir_index: Path, retries: int = 10) -> Lease | None:
+    """
+    Lease the published generation; ``None`` if nothing was published yet.
+
+    Never blocks: if the generation is being removed, the (by then replaced)
+    ``current`` link is read again.
+    """
+    for _ in range(retries):
+        dir_generation = get_current_dir(dir_index)
+        if dir_generation is None:
+            return None
+        path_lease = dir_generation / LEASE_FILENAME
+        lock = FileLock(path_lease, create=False)
+        try:
+            acquired = lock.acquire(shared=True, blocking=False)
+        except FileNotFoundError:
+            continue  # removed in the meantime
+        if acquired and path_lease.exists():
+            return Lease(dir_generation, lock)
+        lock.release()
+    raise RuntimeError(f"failed to lease an index generation in '{dir_index}'")
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+"""
+Apply a new version of a dataset's records to an existing index as a diff.
+
+When :attr:`.Setting.primary_key` is configured, every index build also
+records a content hash per record, keyed by its primary key, in
+``{name}-index/record-hashes.pickle``.  :func:`apply_updates` then streams a
+new data file against those hashes and only touches what changed:
+
+- a new primary key is **added**,
+- a known key with a different hash is **updated** (deleted, then re-added),
+- a key missing from the new data is **deleted**,
+
+all in a single tantivy commit.  Documents are deleted by the primary key
+term, which requires an exact-match field: a ``stored`` or ``keyword`` field
+holding strings, or an indexed ``i64`` / ``u64`` ``numeric`` field.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import typing as T
+from pathlib import Path
+from dataclasses import dataclass
+
+import tantivy
+
+HASHES_FILENAME = "record-hashes.pickle"
+"""Name of the record hash file inside ``{name}-index/``."""
+
+HASHES_VERSION = 1
+"""Bump when the layout of the record hash file changes."""
+
+T_KEY = str | int
+T_HASHES = dict[T_KEY, bytes]
+
+
+@dataclass
+class UpdateResult:
+    """Counts reported by :meth:`.Dataset.update_index`."""
+
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    full_rebuild: bool = False
+    """``True`` when no usable record hashes existed and the whole index was built."""
+
+    @property
+    def changed(self) -> int:
+        return self.added + self.updated + self.deleted
+
+    def __str__(self) -> str:
+        if self.full_rebuild:
+            return f"full rebuild: {self.added} indexed"
+        return (
+            f"{self.added} added, {self.updated} updated, "
+            f"{self.deleted} deleted, {self.unchanged} unchanged"
+        )
+
+
+def hash_record(record: dict[str, T.Any]) -> bytes:
+    """Content hash of one record, independent of key order."""
+    payload = json.dumps(
+        record,
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+def get_key(
+    record: dict[str, T.Any],
+    primary_key: str,
+    key_type: type,
+) -> T_KEY:
+    """Return the primary key of *record*, checking it has the expected type."""
+    try:
+        key = record[primary_key]
+    except KeyError:
+        raise ValueError(
+            f"record has no primary key field {primary_key!r}: {record!r}"
+        ) from None
+    if type(key) is not key_type:
+        raise ValueError(
+            f"primary key {primary_key!r} must be a {key_type.__name__}, "
+            f"got {key!r} in record {record!r}"
+        )
+    return key
+
+
+def iter_hashed(
+    records: T.Iterable[dict[str, T.Any]],
+    primary_key: str,
+    key_type: type,
+    hashes: T_HASHES,
+) -> T.Iterator[dict[str, T.Any]]:
+    """
+    Pass *records* through while filling *hashes* with their content hashes.
+
+    Raises :class:`ValueError` on a duplicate primary key.
+    """
+    for record in records:
+        key = get_key(record, primary_key, key_type)
+        if key in hashes:
+            raise ValueError(f"duplicate primary key {primary_key!r}: {key!r}")
+        hashes[key] = hash_record(record)
+        yield record
+
+
+def load_hashes(
+    path: Path,
+    schema_hash: str,
+    primary_key: str,
+) -> T_HASHES | None:
+    """
+    Read the record hashes at *path*; ``None`` if missing, unreadable, or
+    written for another schema or primary key.
+    """
+    try:
+        entry = pickle.loads(path.read_bytes())
+    except Exception:
+        return None
+    if (
+        not isinstance(entry, dict)
+        or entry.get("version") != HASHES_VERSION
+        or entry.get("schema_hash") != schema_hash
+        or entry.get("primary_key") != primary_key
+    ):
+        return None
+    return entry["hashes"]
+
+
+def dump_hashes(
+    path: Path,
+    schema_hash: str,
+    primary_key: str,
+    hashes: T_HASHES,
+) -> None:
+    """Write the record hashes to *path* atomically."""
+    entry = {
+        "version": HASHES_VERSION,
+        "schema_hash": schema_hash,
+        "primary_key": primary_key,
+        "hashes": hashes,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    path_tmp.write_bytes(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+    os.replace(path_tmp, path)
+
+
+def apply_updates(
+    index: tantivy.Index,
+    records: T.Iterable[dict[str, T.Any]],
+    primary_key: str,
+    key_type: type,
+    old_hashes: T_HASHES,
+    memory_budget_bytes: int = 128_000_000,
+) -> tuple[UpdateResult, T_HASHES]:
+    """
+    Diff *records* against *old_hashes* and write the changes to *index*.
+
+    Nothing is committed if an error is raised (e.g. a duplicate or
+    mistyped primary key).
+
+    :returns: the counts and the record hashes of the new data.
+    """
+    result = UpdateResult()
+    remaining = dict(old_hashes)
+    new_hashes: T_HASHES = {}
+    writer = index.writer(heap_size=memory_budget_bytes)
+    try:
+        for record in iter_hashed(records, primary_key, key_type, new_hashes):
+            key = record[primary_key]
+            old_digest = remaining.pop(key, None)
+            if old_digest is None:
+                result.added += 1
+            elif old_digest != new_hashes[key]:
+                writer.delete_documents_by_term(primary_key, key)
+                result.updated += 1
+            else:
+                result.unchanged += 1
+                continue
+            writer.add_document(tantivy.Document(**record))
+        for key in remaining:
+            writer.delete_documents_by_term(primary_key, key)
+        result.deleted = len(remaining)
+        if result.changed:
+            writer.commit()
+            writer.wait_merging_threads()
+        else:
+            writer.rollback()
+    except BaseException:
+        writer.rollback()
+        raise
+    index.reload()
+    return result, new_hashes
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+"""
+Stream records out of data files without loading the whole file.
+
+Two layouts are supported: a single top-level JSON array
+(:func:`iter_json_array`) and JSON Lines / NDJSON, one record per line
+(:func:`iter_json_lines`).
+
+``json.loads(path.read_text())`` holds the full text *and* every parsed record
+in memory at once.  :func:`iter_json_array` reads the file in fixed-size
+chunks and yields one element at a time, decoding each with the C-accelerated
+:meth:`json.JSONDecoder.raw_decode`; consumed text is dropped as it goes, so
+memory is bounded by the chunk size and the largest single record.
+"""
+
+import io
+import json
+import typing as T
+from pathlib import Path
+
+from .decompress import CompressionEnum, open_stream
+
+CHUNK_SIZE = 1024 * 1024
+"""Number of characters read from the file at a time."""
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]"
+
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """A sliding text window over a file object."""
+
+    def __init__(self, f: T.TextIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.offset = 0  # number of characters dropped before ``text``
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """Append the next chunk; ``False`` at end of file."""
+        if self.eof:
+            return False
+        # grow with the pending text so a huge record costs linear time
+        chunk = self.f.read(max(self.chunk_size, len(self.text) - self.pos))
+        if not chunk:
+            # positions into ``text`` held by the caller stay valid
+            self.eof = True
+            return False
+        if self.pos:
+            # drop what was consumed so memory stays bounded
+            self.offset += self.pos
+            self.text = self.text[self.pos :]
+            self.pos = 0
+        self.text += chunk
+        return True
+
+    def next_char(self) -> str:
+        """Skip whitespace and return the next character (``""`` at EOF)."""
+        while True:
+            text = self.text
+            n = len(text)
+            pos = self.pos
+            while pos < n and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < n:
+                return text[pos]
+            if not self.read_more():
+                return ""
+
+    def error(self, msg: str) -> ValueError:
+        return ValueError(f"{msg} at character {self.offset + self.pos}")
+
+
+def iter_json_array(
+    f: T.TextIO,
+    chunk_size: int = CHUNK_SIZE,
+) -> T.Iterator[T.Any]:
+    """
+    Yield the elements of the JSON array in the text file object *f*.
+
+    :param f: file object opened in text mode.
+    :param chunk_size: number of characters to read at a time.
+
+    Raises :class:`ValueError` if the content is not a single JSON array.
+    """
+    buf = _Buffer(f, chunk_size)
+    if buf.next_char() != "[":
+        raise buf.error("expected '[' at the start of a JSON array")
+    buf.pos += 1
+
+    ch = buf.next_char()
+    if ch == "]":
+        buf.pos += 1
+    else:
+        while True:
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buf.text, buf.pos)
+                except json.JSONDecodeError as e:
+                    # most likely the record continues in the next chunk
+                    if buf.read_more():
+                        continue
+                    raise buf.error(f"invalid JSON ({e.msg})") from None
+                if (
+                    end == len(buf.text) or buf.text[end] not in _DELIMITERS
+                ) and buf.read_more():
+                    # a number may continue in the next chunk ("1" of "1.5")
+                    continue
+                break
+            buf.pos = end
+            yield value
+
+            ch = buf.next_char()
+            buf.pos += 1
+            if ch == ",":
+                if buf.next_char() == "]":
+                    raise buf.error("trailing comma in JSON array")
+                continue
+            if ch == "]":
+                break
+            buf.pos -= 1
+            raise buf.error("expected ',' or ']' in JSON array")
+
+    if buf.next_char() != "":
+        raise buf.error("extra data after JSON array")
+
+
+def iter_json_array_file(
+    path: Path,
+    chunk_size: int = CHUNK_SIZE,
+    compression: CompressionEnum | None = None,
+) -> T.Iterator[T.Any]:
+    """:func:`iter_json_array` over the UTF-8 file at *path*, decompressed
+    on the fly when *compression* is given (see :func:`.open_stream`).
+    """
+    with io.TextIOWrapper(open_stream(path, compression), encoding="utf-8") as f:
+        yield from iter_json_array(f, chunk_size=chunk_size)
+
+
+# ------------------------------------------------------------------------------
+# JSON Lines
+# ------------------------------------------------------------------------------
+LINES_BLOCK_SIZE = 1024 * 1024
+"""Approximate number of bytes of lines handed to a worker process at a time."""
+
+
+def _parse_line(line: bytes | str, lineno: int) -> T.Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON on line {lineno}: {e}") from None
+
+
+def iter_json_lines(f: T.IO) -> T.Iterator[T.Any]:
+    """
+    Yield one JSON value per non-blank line of the file object *f*
+    (JSON Lines / NDJSON).
+
+    Raises :class:`ValueError` naming the line number of an invalid line.
+    """
+    for lineno, line in enumerate(f, start=1):
+        if line.strip():
+            yield _parse_line(line, lineno)
+
+
+def _parse_block(block: tuple[int, list[bytes]]) -> list[T.Any]:
+    first_lineno, lines = block
+    return [
+        _parse_line(line, lineno)
+        for lineno, line in enumerate(lines, start=first_lineno)
+        if line.strip()
+    ]
+
+
+def _iter_blocks(
+    f: T.BinaryIO,
+    block_size: int,
+) -> T.Iterator[tuple[int, list[bytes]]]:
+    lines = []
+    size = 0
+    first_lineno = 1
+    for lineno, line in enumerate(f, start=1):
+        lines.append(line)
+        size += len(line)
+        if size >= block_size:
+            yield first_lineno, lines
+            lines = []
+            size = 0
+            first_lineno = lineno + 1
+    if lines:
+        yield first_lineno, lines
+
+
+def iter_json_lines_file(
+    path: Path,
+    workers: int = 0,
+    block_size: int = LINES_BLOCK_SIZE,
+    compression: CompressionEnum | None = None,
+) -> T.Iterator[T.Any]:
+    """
+    :func:`iter_json_lines` over the UTF-8 file at *path*, decompressed on
+    the fly when *compression* is given (see :func:`.open_stream`).
+
+    :param workers: with ``2`` or more, blocks of about *block_size* bytes of
+        lines are parsed by that many worker processes while the file is
+        read; records are still yielded in file order, and at most
+        ``2 * workers`` blocks are in flight at a time.
+    :param block_size: approximate size of one block of lines, in bytes.
+    """
+    if workers < 2:
+        with open_stream(path, compression) as f:
+            yield from iter_json_lines(f)
+        return
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    with (
+        open_stream(path, compression) as f,
+        ProcessPoolExecutor(max_workers=workers) as pool,
+    ):
+        pending = deque()
+        for block in _iter_blocks(f, block_size):
+            pending.append(pool.submit(_parse_block, block))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+Advisory file locks shared between processes.
+
+:class:`FileLock` wraps :func:`fcntl.flock` on a lock file.  It serializes
+index builds of a dataset and lets readers *lease* an index generation, see
+:mod:`.index_generation`.  The operating system releases a lock when its
+holder exits, so a crashed build or search never leaves a stale lock behind.
+
+Windows has no ``flock``; there, :func:`msvcrt.locking` locks byte ranges of
+the lock file instead.  A shared lock is one byte out of :data:`READER_SLOTS`
+reader slots, and an exclusive lock is all of them, so it waits for every
+reader and every reader waits for it.
+"""
+
+import os
+import time
+from pathlib import Path
+
+READER_SLOTS = 256
+"""Number of shared holders a lock file can have at a time on Windows."""
+
+POLL_INTERVAL = 0.05
+"""Seconds between attempts of a blocking lock on Windows."""
+
+if os.name == "nt":  # pragma: no cover
+    import msvcrt
+
+    def _lock_range(fd: int, offset: int, length: int) -> bool:
+        os.lseek(fd, offset, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, length)
+        except OSError:
+            return False
+        return True
+
+    def _try_lock(fd: int, shared: bool) -> tuple[int, int] | None:
+        if not shared:
+            return (0, READER_SLOTS) if _lock_range(fd, 0, READER_SLOTS) else None
+        # start at a random slot, so readers rarely try the same ones
+        start = int.from_bytes(os.urandom(2), "little")
+        for i in range(READER_SLOTS):
+            slot = (start + i) % READER_SLOTS
+            if _lock_range(fd, slot, 1):
+                return (slot, 1)
+        return None
+
+    def _lock(fd: int, shared: bool, blocking: bool) -> tuple[int, int] | None:
+        while True:
+            locked_range = _try_lock(fd, shared)
+            if locked_range is not None or not blocking:
+                return locked_range
+            time.sleep(POLL_INTERVAL)
+
+    def _unlock(fd: int, locked_range: tuple[int, int]) -> None:
+        offset, length = locked_range
+        os.lseek(fd, offset, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, length)
+
+else:
+    import fcntl
+
+    def _lock(fd: int, shared: bool, blocking: bool) -> tuple[int, int] | None:
+        operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, operation)
+        except BlockingIOError:
+            return None
+        return (0, 0)
+
+    def _unlock(fd: int, locked_range: tuple[int, int]) -> None:
+        pass  # closing the file drops the lock
+
+
+class FileLock:
+    """
+    An exclusive or shared lock on the file at *path*.
+
+    Locks belong to the open file, so two :class:`FileLock` objects on the
+    same path exclude each other even within one process.
+
+    :param path: the lock file.
+    :param create: create the file if it does not exist; with ``False``,
+        :meth:`acquire` raises :class:`FileNotFoundError` for a missing file.
+    """
+
+    def __init__(self, path: Path, create: bool = True):
+        self.path = path
+        self.create = create
+        self._fd: int | None = None
+        self._range: tuple[int, int] = (0, 0)
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, shared: bool = False, blocking: bool = True) -> bool:
+        """
+        Take the lock; ``False`` if *blocking* is off and it is held elsewhere.
+
+        :param shared: take a shared lock, which only excludes exclusive ones.
+        """
+        if self._fd is not None:
+            raise RuntimeError(f"lock '{self.path}' is already acquired")
+        flags = os.O_RDWR | (os.O_CREAT if self.create else 0)
+        fd = os.open(self.path, flags, 0o644)
+        try:
+            locked_range = _lock(fd, shared, blocking)
+        except BaseException:
+            os.close(fd)
+            raise
+        if locked_range is None:
+            os.close(fd)
+            return False
+        self._fd, self._range = fd, locked_range
+        return True
+
+    def release(self) -> None:
+        """Drop the lock; safe to call when it is not held."""
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                _unlock(fd, self._range)
+            finally:
+                os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def __del__(self):
+        self.release()
@@ -75,6 +75,10 @@ class PathEnum:
     def path_error_log(self):
         return self.dir_project_home / "error.log"
 
+    @cached_property
+    def path_daemon_socket(self):
+        return self.dir_project_home / "daemon.sock"
+
 
 path_enum = PathEnum()
 """
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in per-phase timing of ``fts`` invocations, to chase slow keystrokes on
+real machines.
+
+Enabled by the ``AFWF_FTS_PROFILE=1`` environment variable or the ``--profile``
+flag of ``afwf-fts-anything fts``.  While enabled, the code on the ``fts``
+path wraps its steps in :func:`phase`, and the elapsed time of each phase is
+recorded:
+
+- ``snapshot`` — reading the empty-query answer, see :mod:`.browse_snapshot`,
+- ``response_cache`` — key and lookup in :mod:`.response_cache`,
+- ``daemon`` — the round trip to the resident daemon,
+- ``import`` — importing the search dependencies,
+- ``setting`` — resolving the dataset and parsing its setting,
+- ``index_check`` — checking that the index exists and is fresh,
+- ``index_build`` — building the index on first run,
+- ``refresh`` — starting a background refresh of a stale index,
+- ``open_index`` — opening (or leasing) the index,
+- ``query`` — running the query,
+- ``render`` — rendering the display templates,
+- ``items`` — building the ``afwf.Item`` objects,
+- ``output`` — serializing and writing the Script Filter JSON.
+
+Each invocation appends one JSON line to
+``{dir_cache}/profile/fts-timings.jsonl``, which is rotated to
+``fts-timings.jsonl.1`` when it grows past :data:`MAX_LOG_BYTES`.
+
+``AFWF_FTS_PROFILE_TOP=N`` (or ``--profile=N``) additionally runs the
+invocation under :mod:`cProfile` and keeps the captures of the slowest *N*
+invocations seen so far in ``{dir_cache}/profile/cprofile/``, named by their
+duration so ``ls`` lists them fastest first.
+
+When disabled, :func:`phase` returns a shared no-op context manager.
+"""
+
+import os
+import json
+import time
+import threading
+import contextlib
+import typing as T
+from pathlib import Path
+
+ENV_PROFILE = "AFWF_FTS_PROFILE"
+ENV_PROFILE_TOP = "AFWF_FTS_PROFILE_TOP"
+
+MAX_LOG_BYTES = 1024 * 1024
+"""Size after which the timing log is rotated."""
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class PhaseTimer:
+    """
+    Accumulates the wall time of named phases of one invocation.
+
+    Phases may nest; the time of a nested phase is counted for it only, not
+    for the enclosing one, so the phases add up to at most the total.  Only
+    phases of the thread that created the timer are recorded.
+    """
+
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self._stack: list[str] = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> T.Iterator[None]:
+        start = time.perf_counter()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            if self._stack:
+                parent = self._stack[-1]
+                self.phases[parent] = self.phases.get(parent, 0.0) - elapsed
+
+    def elapsed(self) -> float:
+        """Seconds since the timer started."""
+        return time.perf_counter() - self.start
+
+
+_timer: PhaseTimer | None = None
+
+
+def phase(name: str) -> T.ContextManager[None]:
+    """Time the ``with`` block as phase *name* of the current invocation, if
+    profiling is enabled.
+    """
+    timer = _timer
+    if timer is None or timer.thread_id != threading.get_ident():
+        return _NULL_CONTEXT
+    return timer.phase(name)
+
+
+def get_top_n(profile: str | None = None) -> int | None:
+    """
+    Return ``None`` when profiling is disabled, else how many cProfile
+    captures to keep (``0`` for timings only).
+
+    :param profile: value of the ``--profile`` flag: ``None`` when absent,
+        ``""`` when given without a value, or a number.
+    """
+    if profile is None:
+        profile = os.environ.get(ENV_PROFILE)
+        if profile is None or profile.strip().lower() in ("", "0", "false", "no"):
+            return None
+        profile = ""
+    if profile.strip().isdigit():
+        return int(profile)
+    top = os.environ.get(ENV_PROFILE_TOP, "").strip()
+    return int(top) if top.isdigit() else 0
+
+
+def get_path_timings(dir_cache: Path) -> Path:
+    return dir_cache / "profile" / "fts-timings.jsonl"
+
+
+def get_dir_cprofile(dir_cache: Path) -> Path:
+    return dir_cache / "profile" / "cprofile"
+
+
+def append_record(path: Path, record: dict[str, T.Any]) -> None:
+    """Append *record* as one JSON line to *path*, rotating it first when it
+    is larger than :data:`MAX_LOG_BYTES`.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if path.stat().st_size > MAX_LOG_BYTES:
+            os.replace(path, path.with_name(path.name + ".1"))
+    except FileNotFoundError:
+        pass
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    # one write of a short line in append mode: concurrent processes don't interleave
+    with path.open("a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def keep_slowest(dir_cprofile: Path, profiler, seconds: float, top_n: int) -> Path | None:
+    """
+    Save the capture of *profiler* if it is among the *top_n* (at least 1)
+    slowest in *dir_cprofile*, and delete the captures that are no longer.
+    Returns the saved file, if any.
+    """
+    dir_cprofile.mkdir(parents=True, exist_ok=True)
+    # zero-padded duration first: sorting by name sorts by duration
+    name = f"{seconds * 1000:012.3f}ms-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.prof"
+    existing = sorted(p.name for p in dir_cprofile.glob("*.prof"))
+    if len(existing) >= top_n and name < existing[-top_n]:
+        return None
+    path = dir_cprofile / name
+    profiler.dump_stats(str(path))
+    for stale in sorted(existing + [name])[:-top_n]:
+        with contextlib.suppress(FileNotFoundError):
+            (dir_cprofile / stale).unlink()
+    return path
+
+
+@contextlib.contextmanager
+def profile_invocation(
+    dir_cache: Path,
+    top_n: int,
+    **fields: T.Any,
+) -> T.Iterator[dict[str, T.Any]]:
+    """
+    Enable :func:`phase` timing for the ``with`` block, then append its
+    record to the timing log.  Yields the record, so the block can add
+    fields to it.
+
+    :param top_n: keep cProfile captures of the slowest *top_n* invocations;
+        ``0`` to only record timings.
+    :param fields: extra fields of the record, such as the dataset name.
+    """
+    global _timer
+
+    record = dict(ts=round(time.time(), 3), **fields)
+    timer = PhaseTimer()
+    profiler = None
+    if top_n > 0:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    _timer = timer
+    try:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    finally:
+        _timer = None
+        seconds = timer.elapsed()
+        record["total_ms"] = round(seconds * 1000, 3)
+        record["phases"] = {
+            name: round(elapsed * 1000, 3) for name, elapsed in timer.phases.items()
+        }
+        try:
+            append_record(get_path_timings(dir_cache), record)
+            if profiler is not None:
+                keep_slowest(get_dir_cprofile(dir_cache), profiler, seconds, top_n)
+        except OSError:  # pragma: no cover
+            pass  # profiling must never break a search
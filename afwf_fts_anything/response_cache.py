@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+On-disk cache of serialized ``fts`` Script Filter responses.
+
+Alfred re-runs ``fts`` for every keystroke, and typing sequences repeat a lot
+(backspace, retyping the same query).  This module stores the final Script
+Filter JSON per ``(dataset, normalized query, action, index generation,
+setting hash)`` in a size-bounded, least-recently-used :class:`diskcache.Cache`
+under ``{dir_cache}/response/``, so a repeated query is answered with one
+cache read — no index open, no :class:`afwf.Item` construction.
+
+Invalidation is automatic:
+
+- Every index build or update publishes a new *index generation* (see
+  :mod:`.index_generation`), so entries of the previous index are never
+  looked up again, and :class:`.Dataset` evicts the dataset's entries right
+  away.
+- Without a published generation nothing is read from or written to the
+  cache until the index is built.
+- Editing the setting file changes its SHA-256 and therefore the key.
+
+Only the standard library is imported at module level.  A lookup reads the
+diskcache database with :mod:`sqlite3` directly (see :meth:`ResponseCache.get`),
+so answering ``fts`` from the cache never imports :mod:`diskcache`; storing
+and evicting import it on first use.
+"""
+
+import time
+import hashlib
+import typing as T
+from pathlib import Path
+
+from .index_generation import read_generation
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    import diskcache
+
+DEFAULT_SIZE_LIMIT = 64 * 1024 * 1024
+"""Default upper bound of the response cache size on disk, in bytes."""
+
+# the parts of diskcache's storage format read by ResponseCache.get
+_DB_NAME = "cache.db"
+_MODE_RAW = 1  # value stored in the row
+_MODE_TEXT = 3  # value stored in a UTF-8 file next to the database
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a user query: surrounding whitespace removed and inner
+    whitespace runs collapsed to one space.
+
+    ``fts`` searches with the normalized query, so ``"god  father "`` and
+    ``"god father"`` share one cache entry and one answer.
+    """
+    return " ".join(query.split())
+
+
+def get_setting_hash(path_setting: Path) -> str | None:
+    """SHA-256 of the setting file content, or ``None`` if it is missing."""
+    try:
+        content = path_setting.read_bytes()
+    except FileNotFoundError:
+        return None
+    return hashlib.sha256(content).hexdigest()
+
+
+def make_key(
+    dir_dataset: Path,
+    dataset_name: str,
+    query: str,
+    action: str,
+) -> str | None:
+    """
+    Build the cache key of one ``fts`` call.
+
+    Follows the :class:`.Dataset` layout (``{dir_dataset}/{name}-setting.json``
+    and ``{dir_dataset}/{name}-index/``) without importing it.  Returns
+    ``None`` — meaning "do not cache" — when the setting file or the index
+    generation is missing.
+
+    :param query: the already :func:`normalized <normalize_query>` query.
+    """
+    generation = read_generation(dir_dataset / f"{dataset_name}-index")
+    if generation is None:
+        return None
+    setting_hash = get_setting_hash(dir_dataset / f"{dataset_name}-setting.json")
+    if setting_hash is None:
+        return None
+    return "\x00".join([dataset_name, query, action, generation, setting_hash])
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU store of Script Filter JSON strings.
+
+    Every entry is tagged with its dataset name so :meth:`evict` can drop all
+    answers of one dataset at once.
+
+    :param dir_cache: the workflow cache directory; entries live in
+        ``{dir_cache}/response/``.
+    :param size_limit: maximum size on disk in bytes; least recently used
+        entries are evicted beyond it.
+    """
+
+    def __init__(
+        self,
+        dir_cache: Path,
+        size_limit: int = DEFAULT_SIZE_LIMIT,
+    ):
+        self.dir_cache = dir_cache
+        self.size_limit = size_limit
+        self._cache: "diskcache.Cache | None" = None
+
+    @property
+    def dir_response(self) -> Path:
+        return self.dir_cache / "response"
+
+    @property
+    def cache(self) -> "diskcache.Cache":
+        if self._cache is None:
+            import diskcache
+
+            self._cache = diskcache.Cache(
+                str(self.dir_response),
+                size_limit=self.size_limit,
+                eviction_policy="least-recently-used",
+                tag_index=True,
+            )
+        return self._cache
+
+    def get(self, key: str) -> str | None:
+        """
+        Return the cached response for *key*, or ``None`` on a miss.
+
+        Until the :class:`diskcache.Cache` is opened, this is
+        ``Cache.get`` with the least-recently-used policy done in plain
+        :mod:`sqlite3`: the row is read and its access time updated, which
+        costs a fraction of importing :mod:`diskcache`.  An unreadable
+        database counts as a miss.
+        """
+        if self._cache is not None:
+            return self._cache.get(key)
+        path_db = self.dir_response / _DB_NAME
+        if not path_db.exists():
+            return None
+
+        import sqlite3
+
+        try:
+            con = sqlite3.connect(
+                f"{path_db.as_uri()}?mode=rw",
+                uri=True,
+                timeout=1,
+                isolation_level=None,
+            )
+        except sqlite3.Error:  # pragma: no cover
+            return None
+        try:
+            row = con.execute(
+                "SELECT rowid, mode, filename, value FROM Cache"
+                " WHERE key = ? AND raw = 1"
+                " AND (expire_time IS NULL OR expire_time > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            rowid, mode, filename, value = row
+            if mode == _MODE_RAW and isinstance(value, str):
+                response = value
+            elif mode == _MODE_TEXT:
+                response = (self.dir_response / filename).read_text(encoding="utf-8")
+            else:  # pragma: no cover
+                return None  # not written by set()
+            try:
+                con.execute(
+                    "UPDATE Cache SET access_time = ? WHERE rowid = ?",
+                    (time.time(), rowid),
+                )
+            except sqlite3.OperationalError:  # pragma: no cover
+                pass  # database busy; the entry just ages a little early
+        except (sqlite3.Error, OSError):
+            return None
+        finally:
+            con.close()
+        return response
+
+    def set(self, key: str, dataset_name: str, response: str) -> None:
+        """Store *response* under *key*, tagged with *dataset_name*."""
+        self.cache.set(key, response, tag=dataset_name)
+
+    def evict(self, dataset_name: str) -> int:
+        """Drop every response of *dataset_name*; returns the number removed."""
+        if not self.dir_response.exists():
+            # nothing was ever cached; don't create the cache just to empty it
+            return 0
+        return self.cache.evict(dataset_name)
+
+    def close(self) -> None:
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
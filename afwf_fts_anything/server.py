@@ -0,0 +1,395 @@
+# -*- coding: utf-8 -*-
+
+"""
+Local JSON-over-HTTP search server for the data catalog, for tools other
+than Alfred — editor plugins, shell completions — that want to search the
+same datasets from one warm process instead of each starting a cold one.
+
+``afwf-fts-anything serve`` runs it on ``127.0.0.1`` (see :func:`serve`).
+Every endpoint answers ``GET`` with JSON:
+
+- ``/search?dataset=movie&q=god+father&limit=20`` — the hits of one dataset,
+  ``{"dataset": ..., "query": ..., "hits": [...], "took_ms": ...}``; an empty
+  or missing ``q`` returns the first documents, like ``fts``.
+- ``/datasets`` — the datasets of :meth:`.DataCatalog.scan`.
+- ``/health`` — uptime, open indexes and the latency of every endpoint over
+  its last :data:`LATENCY_WINDOW` requests (p50 / p95 / p99).
+
+Errors are ``{"error": ...}`` with status 400 (bad parameter or query), 404
+(unknown path or dataset), 405 (not ``GET``) or 500.  Every response carries
+its handling time in a ``Server-Timing: total;dur=...`` header.
+
+The server is a small HTTP/1.1 implementation on :mod:`asyncio` streams, with
+keep-alive: a client can send any number of requests over one connection,
+which is closed after :data:`KEEP_ALIVE_TIMEOUT` idle seconds.  Searches
+run in a thread pool, so requests are answered concurrently, on
+:class:`.Dataset` objects kept per dataset and index readers shared through
+a :class:`.HandlePool`; a rebuilt index or an edited setting is picked up by
+the next request.
+"""
+
+import json
+import time
+import asyncio
+import threading
+import ipaddress
+import contextlib
+import typing as T
+from pathlib import Path
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from .handle_pool import HandlePool, DEFAULT_MAX_OPEN
+from .data_catalog import DataCatalog
+from .dataset import Dataset
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8736
+DEFAULT_MAX_WORKERS = 8
+"""Threads answering search requests."""
+
+KEEP_ALIVE_TIMEOUT = 15.0
+"""Seconds an idle keep-alive connection is kept open."""
+
+LATENCY_WINDOW = 1000
+"""Requests per endpoint the latency percentiles of ``/health`` cover."""
+
+MAX_LIMIT = 1000
+"""Largest ``limit`` of ``/search``."""
+
+MAX_HEADER_LINES = 100
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    """Answered as ``{"error": message}`` with *status*."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    # nearest rank
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LatencyStats:
+    """Request count, error count and recent latencies of one endpoint."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.count = 0
+        self.errors = 0
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float, status: int) -> None:
+        self.count += 1
+        if status >= 400:
+            self.errors += 1
+        self.samples.append(seconds)
+
+    def summary(self) -> dict[str, T.Any]:
+        summary = {"count": self.count, "errors": self.errors}
+        if self.samples:
+            ms = sorted(seconds * 1000 for seconds in self.samples)
+            for name, q in [("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)]:
+                summary[name] = round(_percentile(ms, q), 3)
+        return summary
+
+
+def check_host(host: str) -> None:
+    """Raise :class:`ValueError` unless *host* is a loopback address: the
+    server has no authentication.
+    """
+    if host == "localhost":
+        return
+    try:
+        is_loopback = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        is_loopback = False
+    if not is_loopback:
+        raise ValueError(f"refusing to listen on non-loopback host {host!r}")
+
+
+class SearchServer:
+    """
+    The request handlers and the state they share.
+
+    :param dir_datacatalog_root: root directory of the :class:`.DataCatalog`.
+    :param dir_cache: optional cache directory given to each :class:`.Dataset`.
+    :param max_workers: threads answering search requests.
+    :param max_open: maximum number of open indexes, see :class:`.HandlePool`.
+    """
+
+    def __init__(
+        self,
+        dir_datacatalog_root: Path,
+        dir_cache: Path | None = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_open: int = DEFAULT_MAX_OPEN,
+    ):
+        self.catalog = DataCatalog(
+            dir_root=dir_datacatalog_root,
+            dir_cache=dir_cache,
+            handle_pool=HandlePool(max_open=max_open),
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="afwf-fts-serve",
+        )
+        self.started_at = time.time()
+        self.stats: dict[str, LatencyStats] = {}
+        self._datasets: dict[str, tuple[int, Dataset]] = {}
+        self._lock = threading.Lock()
+        self._connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._routes: dict[str, T.Callable[[dict[str, list[str]]], dict[str, T.Any]]] = {
+            "/search": self.search,
+            "/datasets": self.datasets,
+            "/health": self.health,
+        }
+
+    # ------------------------------------------------------------------
+    # Endpoints; called in the thread pool
+    # ------------------------------------------------------------------
+
+    def get_dataset(self, name: str) -> Dataset:
+        """Return the warm :class:`.Dataset` *name*, replaced when its setting
+        file changes.  Raises :class:`HttpError` 404 if there is none.
+        """
+        if not name or name.startswith(".") or "/" in name or "\\" in name:
+            raise HttpError(404, f"dataset not found: {name!r}")
+        dataset = self.catalog.get_dataset(name)
+        try:
+            mtime_ns = dataset.path_setting.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise HttpError(404, f"dataset not found: {name!r}")
+        with self._lock:
+            cached = self._datasets.get(name)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
+            self._datasets[name] = (mtime_ns, dataset)
+        return dataset
+
+    def search(self, params: dict[str, list[str]]) -> dict[str, T.Any]:
+        start = time.perf_counter()
+        name = params.get("dataset", [""])[0]
+        if not name:
+            raise HttpError(400, "missing parameter: dataset")
+        query = " ".join(params.get("q", [""])[0].split())
+        limit_param = params.get("limit", ["20"])[0]
+        try:
+            limit = int(limit_param)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_LIMIT:
+            raise HttpError(400, f"limit must be an integer from 1 to {MAX_LIMIT}")
+        dataset = self.get_dataset(name)
+        dataset.setting  # a malformed setting is a server error, not a bad query
+        try:
+            hits = dataset.search_hits(query or "*", limit=limit)
+        except ValueError as e:
+            raise HttpError(400, f"invalid query: {e}")
+        return {
+            "dataset": name,
+            "query": query,
+            "hits": [hit.source for hit in hits],
+            "took_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def datasets(self, params: dict[str, list[str]]) -> dict[str, T.Any]:
+        return {
+            "datasets": [
+                {
+                    "name": meta.name,
+                    "status": meta.status.value,
+                    "data_url": meta.data_url,
+                }
+                for meta in self.catalog.scan()
+            ]
+        }
+
+    def health(self, params: dict[str, list[str]]) -> dict[str, T.Any]:
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "open_indexes": len(self.catalog.handle_pool),
+            "endpoints": {
+                path: stats.summary() for path, stats in sorted(self.stats.items())
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def dispatch(self, method: str, target: str) -> tuple[int, dict[str, T.Any]]:
+        """Answer one request; returns the status and the JSON body."""
+        url = urlsplit(target)
+        handler = self._routes.get(url.path)
+        try:
+            if handler is None:
+                raise HttpError(404, f"not found: {url.path}")
+            if method != "GET":
+                raise HttpError(405, f"method not allowed: {method}")
+            params = parse_qs(url.query)
+            if handler == self.health:
+                return 200, handler(params)
+            loop = asyncio.get_running_loop()
+            return 200, await loop.run_in_executor(self.executor, handler, params)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    def _record(self, path: str, seconds: float, status: int) -> None:
+        # only known paths, so scanning clients cannot grow the dict
+        key = path if path in self._routes else "other"
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = LatencyStats()
+        stats.record(seconds, status)
+
+    async def handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Answer the requests of one connection until it is closed."""
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(
+                        reader.readline(), timeout=KEEP_ALIVE_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                start = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._write_response(writer, 400, {"error": "bad request"}, start, False)
+                    break
+                # GET requests have no body; skip one if sent anyway
+                length = headers.get("content-length", "0")
+                if length.isdigit() and int(length) > 0:
+                    await reader.readexactly(int(length))
+
+                connection = headers.get("connection", "").lower()
+                if version == "HTTP/1.1":
+                    keep_alive = connection != "close"
+                else:
+                    keep_alive = connection == "keep-alive"
+
+                status, body = await self.dispatch(method, target)
+                self._record(urlsplit(target).path, time.perf_counter() - start, status)
+                await self._write_response(writer, status, body, start, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _write_response(
+        self,
+        writer: asyncio.StreamWriter,
+        status: int,
+        body: dict[str, T.Any],
+        start: float,
+        keep_alive: bool,
+    ) -> None:
+        # default=str: datetime values of stored fields
+        content = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        head = (
+            f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(content)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"Server-Timing: total;dur={elapsed_ms:.3f}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + content)
+        await writer.drain()
+
+    async def start(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+    ) -> asyncio.Server:
+        """Start listening on *host*, which must be a loopback address, and
+        *port* (``0`` for any free one).
+        """
+        check_host(host)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def shutdown(self, server: asyncio.Server) -> None:
+        """Stop *server*, returned by :meth:`start`, from accepting
+        connections and close the open ones, idle keep-alive ones included.
+        """
+        server.close()
+        tasks = list(self._connections)
+        for writer in self._connections.values():
+            # the handler reads the end of the stream and returns
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await server.wait_closed()
+
+    def close(self) -> None:
+        """Stop the search threads and close the open indexes."""
+        self.executor.shutdown(wait=True)
+        self.catalog.close()
+
+
+def serve(
+    dir_datacatalog_root: Path,
+    dir_cache: Path | None = None,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> None:  # pragma: no cover
+    """Run the server in the foreground until interrupted."""
+    search_server = SearchServer(
+        dir_datacatalog_root=dir_datacatalog_root,
+        dir_cache=dir_cache,
+        max_workers=max_workers,
+    )
+
+    async def main():
+        server = await search_server.start(host, port)
+        address = server.sockets[0].getsockname()
+        print(f"serving on http://{address[0]}:{address[1]}", flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await search_server.shutdown(server)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        search_server.close()
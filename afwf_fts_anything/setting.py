@@ -6,11 +6,14 @@ on top of sayt2 field types.
 """
 
 import re
+import enum
 from pathlib import Path
+from functools import cached_property
 
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, Field, model_validator
 from sayt2.api import (
     T_Field,
+    StoredField,
     NgramField,
     TextField,
     KeywordField,
@@ -22,10 +25,22 @@ from sayt2.api import (
 
 from .exc import MalformedSettingError
 from .json_comment import strip_comments
+from .decompress import CompressionEnum, STREAM_COMPRESSIONS
+from .template import CompiledTemplate, FieldGetter, BatchRenderer, DisplayRow, T_RENDERER
 
 _p = re.compile(r"\{([A-Za-z0-9_]+)\}")
 
 
+class DataFormatEnum(str, enum.Enum):
+    """Layout of a dataset's local data file."""
+
+    json = "json"
+    """``{name}-data.json`` holding one JSON array of records."""
+
+    jsonl = "jsonl"
+    """``{name}-data.jsonl`` holding one JSON record per line (JSON Lines / NDJSON)."""
+
+
 class Setting(BaseModel):
     """
     Defines how you want to index your dataset.
@@ -39,6 +54,35 @@ class Setting(BaseModel):
     :param autocomplete_field: template string for ``WorkflowItem.autocomplete``.
     :param icon_field: template string for ``WorkflowItem.icon``.
     :param data_url: optional URL to download the dataset JSON from.
+    :param refresh_interval: with ``data_url``, re-download the data in the
+        background once the last download is this many seconds old, see
+        :meth:`.Dataset.refresh`.  ``None`` only downloads a missing file.
+    :param data_format: layout of the local data file; when ``None`` it is
+        detected from the data file name (see :attr:`.Dataset.data_format`).
+    :param data_compression: keep the local data file compressed with
+        ``gz``, ``bz2``, ``xz`` or ``zst``, as ``{name}-data.json.gz`` etc.
+        When ``None``, a compressed data file is still read if it is the only
+        one there (see :attr:`.Dataset.data_compression`).
+    :param data_parse_workers: number of worker processes that parse a
+        ``jsonl`` data file while the index is built; ``0`` parses in-process.
+    :param incremental_search: narrow the result on every extra keystroke and
+        refine the previous candidates instead of searching the whole index
+        again, see :mod:`.incremental`.  Requires at least one stored
+        ``ngram`` field with ``lowercase=True`` and ``prefix_only=False``.
+    :param primary_key: name of the field that uniquely identifies a record.
+        When set, ``rebuild-index`` applies only the added, changed and
+        removed records to the existing index, see :mod:`.index_update`.
+        Must be a ``stored`` or ``keyword`` field holding strings, or an
+        ``indexed`` ``i64`` / ``u64`` ``numeric`` field.
+    :param prerender_display: render the display templates of every record
+        when the index is built and store them in a side table, so searches
+        only look them up, see :mod:`.display_table`.  Requires a stored
+        :attr:`primary_key`; the templates may then reference fields that are
+        not stored.
+
+    The derived field lists (:attr:`fields_mapper`, :attr:`store_fields`, ...)
+    are computed once per instance and travel with it when pickled, which is
+    what :mod:`.setting_cache` relies on.
     """
 
     fields: list[T_Field]
@@ -49,12 +93,24 @@ class Setting(BaseModel):
     autocomplete_field: str | None = None
     icon_field: str | None = None
     data_url: str | None = None
+    refresh_interval: int | None = Field(default=None, gt=0)
+    data_format: DataFormatEnum | None = None
+    data_compression: CompressionEnum | None = None
+    data_parse_workers: int = Field(default=0, ge=0)
+    incremental_search: bool = False
+    primary_key: str | None = None
+    prerender_display: bool = False
 
     @model_validator(mode="after")
     def _validate(self) -> "Setting":
         """Run all post-init validation checks after the model is constructed."""
         self._check_fields_name()
         self._check_title_field()
+        self._check_display_templates()
+        self._check_incremental_search()
+        self._check_primary_key()
+        self._check_prerender_display()
+        self._check_data_compression()
         return self
 
     def _check_fields_name(self):
@@ -70,7 +126,8 @@ class Setting(BaseModel):
 
         When ``title_field`` is ``None``, a stored field named ``"title"`` must exist.
         When ``title_field`` is a template string, every ``{key}`` placeholder must
-        reference a field that exists and has ``stored=True``.
+        reference a field that exists and has ``stored=True``.  With
+        :attr:`prerender_display` the fields need not be stored.
         """
         if self.title_field is None:
             if "title" not in self.field_names:
@@ -79,7 +136,7 @@ class Setting(BaseModel):
                     f"you have to have a field called 'title' in your data fields, "
                     f"here's your data fields: {self.field_names}"
                 )
-            if not self.fields_mapper["title"].stored:
+            if not self.fields_mapper["title"].stored and not self.prerender_display:
                 raise MalformedSettingError("the title field is not a stored field!")
         else:
             for key in _p.findall(self.title_field):
@@ -89,29 +146,156 @@ class Setting(BaseModel):
                         f"contains a field name {key!r}, "
                         f"but it is not defined in your fields: {self.field_names}"
                     )
-                if not self.fields_mapper[key].stored:
+                if not self.fields_mapper[key].stored and not self.prerender_display:
                     raise MalformedSettingError(
                         f"your title_field = {self.title_field!r} "
                         f"contains a field name {key!r}, "
                         f"but this field is not stored: {self.fields_mapper[key]}"
                     )
 
-    @property
+    def _check_display_templates(self):
+        """Raise :class:`.MalformedSettingError` if a subtitle / arg / autocomplete /
+        icon template references a field that does not exist or is not stored.
+
+        Search hits only carry stored fields, so such a template could never
+        render.  With :attr:`prerender_display` the templates are rendered
+        from the records instead, and any defined field will do.
+        """
+        names = self.field_names if self.prerender_display else self.store_fields
+        for attr in ("subtitle_field", "arg_field", "autocomplete_field", "icon_field"):
+            template = getattr(self, attr)
+            if template is None:
+                continue
+            for key in CompiledTemplate(template).field_names:
+                if key not in names:
+                    kind = "a defined" if self.prerender_display else "a stored"
+                    raise MalformedSettingError(
+                        f"your {attr} = {template!r} "
+                        f"contains a field name {key!r}, "
+                        f"but it is not {kind} field: {names}"
+                    )
+
+    def _check_incremental_search(self):
+        """Raise :class:`.MalformedSettingError` if ``incremental_search`` is
+        enabled without a field it can match words against.
+        """
+        if self.incremental_search and not self.incremental_fields:
+            raise MalformedSettingError(
+                "incremental_search requires at least one stored ngram field "
+                "with lowercase=true and prefix_only=false, "
+                f"here's your data fields: {self.field_names}"
+            )
+
+    def _check_data_compression(self):
+        """Raise :class:`.MalformedSettingError` if ``data_compression`` is
+        not a single-stream compression.
+        """
+        if (
+            self.data_compression is not None
+            and self.data_compression not in STREAM_COMPRESSIONS
+        ):
+            raise MalformedSettingError(
+                f"data_compression = {self.data_compression.value!r} is not supported, "
+                f"use one of {[c.value for c in STREAM_COMPRESSIONS]}"
+            )
+
+    def _check_primary_key(self):
+        """Raise :class:`.MalformedSettingError` if ``primary_key`` is not a
+        field that documents can be looked up by exactly.
+        """
+        if self.primary_key is None:
+            return
+        if self.primary_key not in self.fields_mapper:
+            raise MalformedSettingError(
+                f"primary_key = {self.primary_key!r} "
+                f"is not defined in your fields: {self.field_names}"
+            )
+        if self.primary_key_type is None:
+            raise MalformedSettingError(
+                f"primary_key = {self.primary_key!r} must be a stored or keyword "
+                f"field, or an indexed i64 / u64 numeric field, "
+                f"got: {self.fields_mapper[self.primary_key]}"
+            )
+
+    def _check_prerender_display(self):
+        """Raise :class:`.MalformedSettingError` if ``prerender_display`` is
+        enabled without a stored primary key to look the rows up by.
+        """
+        if not self.prerender_display:
+            return
+        if self.primary_key is None:
+            raise MalformedSettingError(
+                "prerender_display requires a primary_key to look up "
+                "the display columns of search hits"
+            )
+        if not self.fields_mapper[self.primary_key].stored:
+            raise MalformedSettingError(
+                f"with prerender_display, primary_key = {self.primary_key!r} "
+                f"must be a stored field"
+            )
+
+    @cached_property
+    def primary_key_type(self) -> type | None:
+        """Python type of the :attr:`primary_key` values: ``str`` for a
+        ``stored`` / ``keyword`` field, ``int`` for an indexed integer
+        ``numeric`` field, ``None`` when not configured or not usable.
+        """
+        f = self.fields_mapper.get(self.primary_key)
+        if isinstance(f, (StoredField, KeywordField)):
+            return str
+        if isinstance(f, NumericField) and f.indexed and f.kind in ("i64", "u64"):
+            return int
+        return None
+
+    @cached_property
+    def renderers(self) -> tuple[T_RENDERER, ...]:
+        """Compiled renderers for the title, subtitle, arg, autocomplete and icon
+        columns, in :class:`.DisplayRow` order.
+
+        A column without a template falls back to the document key of the same
+        name (e.g. ``data["subtitle"]``).
+        """
+        return tuple(
+            FieldGetter(name) if template is None else CompiledTemplate(template)
+            for name, template in (
+                ("title", self.title_field),
+                ("subtitle", self.subtitle_field),
+                ("arg", self.arg_field),
+                ("autocomplete", self.autocomplete_field),
+                ("icon", self.icon_field),
+            )
+        )
+
+    @cached_property
+    def batch_renderer(self) -> BatchRenderer:
+        """:class:`.BatchRenderer` over :attr:`renderers`, used by :meth:`render_batch`."""
+        return BatchRenderer(self.renderers)
+
+    def render_batch(self, docs: list[dict[str, object]]) -> list[DisplayRow]:
+        """Render all five display columns for every document in *docs*.
+
+        Equivalent to calling :meth:`format_title`, :meth:`format_subtitle`,
+        :meth:`format_arg`, :meth:`format_autocomplete` and :meth:`format_icon`
+        on each document, in a single pass over the page.
+        """
+        return self.batch_renderer.render(docs)
+
+    @cached_property
     def field_names(self) -> list[str]:
         """Return an ordered list of all field names."""
         return [f.name for f in self.fields]
 
-    @property
+    @cached_property
     def fields_mapper(self) -> dict[str, T_Field]:
         """Return a mapping of field name to field object."""
         return {f.name: f for f in self.fields}
 
-    @property
+    @cached_property
     def store_fields(self) -> list[str]:
         """Names of all fields with ``stored=True``."""
         return [f.name for f in self.fields if f.stored]
 
-    @property
+    @cached_property
     def searchable_fields(self) -> list[str]:
         """Names of all indexed/searchable fields."""
         return [
@@ -123,7 +307,7 @@ class Setting(BaseModel):
             )
         ]
 
-    @property
+    @cached_property
     def sortable_fields(self) -> list[str]:
         """Names of all fast-sortable fields (NumericField or DatetimeField with ``fast=True``)."""
         return [
@@ -132,45 +316,55 @@ class Setting(BaseModel):
             if isinstance(f, (NumericField, DatetimeField)) and f.fast
         ]
 
+    @cached_property
+    def incremental_fields(self) -> list[str]:
+        """Names of the fields that incremental search matches words against:
+        stored, lowercased, non-prefix-only ngram fields.
+        """
+        return [
+            f.name
+            for f in self.fields
+            if isinstance(f, NgramField)
+            and f.stored
+            and f.lowercase
+            and not f.prefix_only
+        ]
+
+    @cached_property
+    def incremental_min_gram(self) -> int:
+        """Shortest word length that incremental search can match: the largest
+        ``min_gram`` of :attr:`incremental_fields`.
+        """
+        return max(
+            (self.fields_mapper[name].min_gram for name in self.incremental_fields),
+            default=1,
+        )
+
     @classmethod
     def from_json_file(cls, path: str | Path) -> "Setting":  # pragma: no cover
         """Load a :class:`Setting` from a JSON file at *path*."""
         return cls.model_validate_json(strip_comments(Path(path).read_text()))
 
-    def format_title(self, data: dict[str, object]) -> str:  # pragma: no cover
+    def format_title(self, data: dict[str, object]) -> str:
         """Return the Alfred title string for *data*.
 
         If ``title_field`` is ``None``, returns ``data["title"]``.
         Otherwise renders ``title_field`` as a :meth:`str.format_map` template.
         """
-        if self.title_field is None:
-            return data.get("title")
-        return self.title_field.format_map(data)
+        return self.renderers[0].render(data)
 
-    def format_subtitle(
-        self, data: dict[str, object]
-    ) -> str | None:  # pragma: no cover
+    def format_subtitle(self, data: dict[str, object]) -> str | None:
         """Return the Alfred subtitle string for *data*, or ``None`` if not configured."""
-        if self.subtitle_field is None:
-            return data.get("subtitle")
-        return self.subtitle_field.format_map(data)
+        return self.renderers[1].render(data)
 
-    def format_arg(self, data: dict[str, object]) -> str | None:  # pragma: no cover
+    def format_arg(self, data: dict[str, object]) -> str | None:
         """Return the Alfred arg string for *data*, or ``None`` if not configured."""
-        if self.arg_field is None:
-            return data.get("arg")
-        return self.arg_field.format_map(data)
+        return self.renderers[2].render(data)
 
-    def format_autocomplete(
-        self, data: dict[str, object]
-    ) -> str | None:  # pragma: no cover
+    def format_autocomplete(self, data: dict[str, object]) -> str | None:
         """Return the Alfred autocomplete string for *data*, or ``None`` if not configured."""
-        if self.autocomplete_field is None:
-            return data.get("autocomplete")
-        return self.autocomplete_field.format_map(data)
+        return self.renderers[3].render(data)
 
-    def format_icon(self, data: dict[str, object]) -> str | None:  # pragma: no cover
+    def format_icon(self, data: dict[str, object]) -> str | None:
         """Return the Alfred icon path for *data*, or ``None`` if not configured."""
-        if self.icon_field is None:
-            return data.get("icon")
-        return self.icon_field.format_map(data)
+        return self.renderers[4].render(data)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+On-disk cache of validated :class:`.Setting` objects.
+
+:meth:`.Setting.from_json_file` strips comments with a pure-Python scanner and
+runs full pydantic validation of every field on every process start.  This
+module stores the validated object — with its derived field lists and
+compiled display templates already computed — as a pickle in
+``{dir_cache}/setting/``, one file per setting path.
+
+An entry is reused when the setting file's ``mtime`` and size are unchanged
+(no read of the JSON at all), or, when only the ``mtime`` moved, when the
+SHA-256 of the content still matches.  Any other change re-parses the file
+and rewrites the entry, so edits are picked up automatically.
+
+Each cache file starts with a small header of plain values, pickled ahead of
+the entry: :data:`CACHE_VERSION` and the versions of this package, pydantic
+and sayt2.  The pickled :class:`.Setting` is only unpickled when the header
+matches, so upgrading any of them turns old entries into misses instead of
+objects built against other classes.
+"""
+
+import os
+import pickle
+import hashlib
+import functools
+import threading
+import importlib.metadata
+from pathlib import Path
+
+import pydantic
+
+from ._version import __version__
+from .setting import Setting
+from .json_comment import strip_comments
+
+CACHE_VERSION = 9
+"""Bump when the pickled entry layout or :class:`.Setting` changes shape."""
+
+
+def get_path_cache(dir_cache: Path, path_setting: Path) -> Path:
+    """Return the cache file for *path_setting* under *dir_cache*."""
+    key = hashlib.sha256(str(path_setting.absolute()).encode("utf-8")).hexdigest()
+    return dir_cache / "setting" / f"{key[:16]}.pickle"
+
+
+def _warm_up(setting: Setting) -> Setting:
+    """Compute the cached derived properties so they are stored in the pickle."""
+    _ = setting.fields_mapper
+    _ = setting.store_fields
+    _ = setting.searchable_fields
+    _ = setting.sortable_fields
+    _ = setting.incremental_fields
+    _ = setting.incremental_min_gram
+    _ = setting.primary_key_type
+    _ = setting.batch_renderer
+    return setting
+
+
+@functools.cache
+def get_header() -> tuple:
+    """Return the header an entry must carry to be reused by this process."""
+    try:
+        sayt2_version = importlib.metadata.version("sayt2")
+    except importlib.metadata.PackageNotFoundError:  # pragma: no cover
+        sayt2_version = None
+    return (CACHE_VERSION, __version__, pydantic.VERSION, sayt2_version)
+
+
+def _read_entry(path_cache: Path) -> dict | None:
+    try:
+        with path_cache.open("rb") as f:
+            if pickle.load(f) != get_header():
+                return None
+            entry = pickle.load(f)
+    except Exception:
+        # missing, truncated, or referencing classes that no longer load
+        return None
+    if not isinstance(entry, dict):
+        return None
+    return entry
+
+
+def _write_entry(path_cache: Path, entry: dict) -> None:
+    path_cache.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path_cache.with_name(f"{path_cache.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with path_tmp.open("wb") as f:
+        pickle.dump(get_header(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    # atomic so concurrent Alfred processes never read a half-written entry
+    os.replace(path_tmp, path_cache)
+
+
+def load_setting(
+    path_setting: Path,
+    dir_cache: Path | None = None,
+) -> Setting:
+    """
+    Load the :class:`.Setting` at *path_setting*, going through the compiled
+    cache in *dir_cache* when it is given.
+
+    Raises the same errors as :meth:`.Setting.from_json_file` when the file is
+    missing or invalid; invalid settings are never cached.
+    """
+    if dir_cache is None:
+        return Setting.from_json_file(path_setting)
+
+    st = path_setting.stat()
+    path_cache = get_path_cache(dir_cache, path_setting)
+    entry = _read_entry(path_cache)
+    if (
+        entry is not None
+        and entry["mtime_ns"] == st.st_mtime_ns
+        and entry["size"] == st.st_size
+    ):
+        return entry["setting"]
+
+    content = path_setting.read_bytes()
+    content_hash = hashlib.sha256(content).hexdigest()
+    if entry is not None and entry["sha256"] == content_hash:
+        # touched but not edited — keep the compiled object, refresh the stat
+        setting = entry["setting"]
+    else:
+        setting = Setting.model_validate_json(strip_comments(content.decode("utf-8")))
+        _warm_up(setting)
+
+    try:
+        _write_entry(
+            path_cache,
+            {
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                "sha256": content_hash,
+                "setting": setting,
+            },
+        )
+    except OSError:  # pragma: no cover
+        pass  # a read-only cache dir must not break loading the setting
+    return setting
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+Display templates compiled once and rendered many times.
+
+:class:`.Setting` holds ``str.format_map`` templates such as
+``"{title} ({genres}) rate {rating}"``.  Re-parsing the template for every
+hit is wasted work, so each template is parsed once into its literal
+segments and referenced field names, then rendered with a single
+``%``-format against an :func:`operator.itemgetter` lookup.
+
+Templates that use anything beyond plain ``{name}`` placeholders (format
+specs, conversions, attribute or index access) keep working: they are
+rendered with :meth:`str.format_map` as before.
+
+Everything here is picklable so compiled templates can be stored in the
+:mod:`.setting_cache`.
+"""
+
+import re
+import string
+import operator
+import typing as T
+
+_formatter = string.Formatter()
+
+# ``{movie.title}`` / ``{genres[0]}``: the root key ends at the first "." or "["
+_root_key = re.compile(r"[^.\[]*").match
+
+
+def parse_field_names(template: str) -> list[str]:
+    """
+    Return the data keys referenced by *template*, in order of appearance.
+
+    ``{movie.title}`` and ``{genres[0]}`` both reference their root key
+    (``movie`` / ``genres``).
+    """
+    names = []
+    for _, field_name, _, _ in _formatter.parse(template):
+        if field_name is None:
+            continue
+        names.append(_root_key(field_name).group())
+    return names
+
+
+class CompiledTemplate:
+    """
+    A ``str.format_map`` template parsed once.
+
+    Calling :meth:`render` is equivalent to ``template.format_map(data)``,
+    including raising :class:`KeyError` for a missing key.
+
+    :param template: the template string.
+    """
+
+    __slots__ = ("template", "field_names", "keys", "fmt", "is_simple", "_getter", "_single")
+
+    def __init__(self, template: str):
+        self.template = template
+        self.field_names = parse_field_names(template)
+
+        literals = []
+        keys = []
+        is_complex = False
+        for literal, field_name, format_spec, conversion in _formatter.parse(template):
+            literals.append(literal.replace("%", "%%"))
+            if field_name is None:
+                continue
+            if format_spec or conversion or not field_name.isidentifier():
+                is_complex = True
+            literals.append("%s")
+            keys.append(field_name)
+
+        self.is_simple = not is_complex
+        """``True`` when every placeholder is a plain ``{name}``."""
+        self.keys = tuple(keys)
+        """Document keys looked up, in placeholder order (may repeat)."""
+        self.fmt = "".join(literals)
+        """The template as a ``%``-format string taking :attr:`keys` values."""
+        self._single = len(keys) == 1
+        self._getter = operator.itemgetter(*keys) if keys else None
+
+    def render(self, data: dict[str, T.Any]) -> str:
+        """Render the template for one document."""
+        if not self.is_simple:
+            return self.template.format_map(data)
+        if self._getter is None:
+            return self.template
+        if self._single:
+            return self.fmt % (self._getter(data),)
+        return self.fmt % self._getter(data)
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"{self.__class__.__name__}({self.template!r})"
+
+
+class FieldGetter:
+    """
+    Renderer used when a template is not configured: returns ``data.get(key)``.
+
+    :param key: the document key to return.
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def render(self, data: dict[str, T.Any]) -> T.Any:
+        return data.get(self.key)
+
+    def __repr__(self) -> str:  # pragma: no cover
+        return f"{self.__class__.__name__}({self.key!r})"
+
+
+T_RENDERER = CompiledTemplate | FieldGetter
+
+
+class DisplayRow(T.NamedTuple):
+    """The five Alfred display columns rendered for one document."""
+
+    title: str | None
+    subtitle: str | None
+    arg: str | None
+    autocomplete: str | None
+    icon: str | None
+
+
+_SEP = "\x1f"  # ASCII unit separator
+
+
+class BatchRenderer:
+    """
+    Renders a list of documents into :class:`DisplayRow` objects.
+
+    All simple templates among the columns are fused into one ``%``-format
+    joined by a separator and fed by one :func:`operator.itemgetter`, so each
+    document costs one lookup call, one format and one split no matter how
+    many columns there are.  Should a value happen to contain the separator,
+    the split yields the wrong number of parts and that document is rendered
+    column by column instead, so the output is always identical to calling
+    each renderer's :meth:`~CompiledTemplate.render`.
+
+    :param renderers: one renderer per :class:`DisplayRow` column.
+    """
+
+    __slots__ = ("renderers", "_simple", "_fmt", "_getter")
+
+    def __init__(self, renderers: T.Sequence[T_RENDERER]):
+        self.renderers = tuple(renderers)
+        # positions of the columns handled by the fused format
+        self._simple = tuple(
+            i
+            for i, r in enumerate(self.renderers)
+            if isinstance(r, CompiledTemplate) and r.is_simple
+        )
+        keys = [key for i in self._simple for key in self.renderers[i].keys]
+        fmt = _SEP.join(self.renderers[i].fmt for i in self._simple)
+        if len(keys) == 1:
+            # itemgetter with one key returns a bare value, not a tuple; fetch
+            # it twice and swallow the second copy with a zero-width "%.0s"
+            keys.append(keys[0])
+            fmt += "%.0s"
+        self._fmt = fmt
+        self._getter = operator.itemgetter(*keys) if keys else None
+
+    def _render_fused(self, data: dict[str, T.Any]) -> list[str]:
+        values = () if self._getter is None else self._getter(data)
+        parts = (self._fmt % values).split(_SEP)
+        if len(parts) != len(self._simple):
+            # a value contained the separator; render these columns one by one
+            parts = [self.renderers[i].render(data) for i in self._simple]
+        return parts
+
+    def render(self, docs: T.Iterable[dict[str, T.Any]]) -> list[DisplayRow]:
+        """Render every document in *docs*."""
+        make = DisplayRow._make
+        if not self._simple:
+            renderers = self.renderers
+            return [make([r.render(doc) for r in renderers]) for doc in docs]
+
+        if len(self._simple) == len(self.renderers) and self._getter is not None:
+            # hot path: every column is a simple template, inlined
+            fmt, getter, n = self._fmt, self._getter, len(self._simple)
+            rows = []
+            for doc in docs:
+                parts = (fmt % getter(doc)).split(_SEP)
+                if len(parts) != n:
+                    parts = [r.render(doc) for r in self.renderers]
+                rows.append(make(parts))
+            return rows
+
+        rows = []
+        simple = set(self._simple)
+        for doc in docs:
+            parts = iter(self._render_fused(doc))
+            rows.append(
+                make(
+                    [
+                        next(parts) if i in simple else r.render(doc)
+                        for i, r in enumerate(self.renderers)
+                    ]
+                )
+            )
+        return rows
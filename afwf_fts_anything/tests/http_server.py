@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+A local stand-in for a ``data_url`` host, for tests.
+
+:class:`StaticServer` serves the files of a directory on ``127.0.0.1`` with
+``ETag`` and ``Last-Modified`` headers and answers conditional requests with
+``304 Not Modified``, like a typical static file host.
+"""
+
+import hashlib
+import threading
+import email.utils
+import http.server
+from pathlib import Path
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def do_GET(self):
+        path = self.server.dir_root / self.path.lstrip("/")
+        self.server.requests.append(self.path)
+        if not path.is_file():
+            self.send_error(404)
+            return
+        body = path.read_bytes()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        last_modified = email.utils.formatdate(int(path.stat().st_mtime), usegmt=True)
+        if self.headers.get("If-None-Match") == etag or (
+            self.headers.get("If-None-Match") is None
+            and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            self.server.not_modified += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.send_etag:
+            self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    dir_root: Path
+    send_etag: bool
+    requests: list[str]
+    not_modified: int
+
+
+class StaticServer:
+    """
+    Usage::
+
+        with StaticServer(dir_root) as server:
+            urllib.request.urlopen(server.url("movie-data.json"))
+
+    :param dir_root: the directory to serve.
+    :param send_etag: send ``ETag`` headers; without, clients can only
+        revalidate with ``Last-Modified``.
+    """
+
+    def __init__(self, dir_root: Path, send_etag: bool = True):
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.dir_root = dir_root
+        self._server.send_etag = send_etag
+        self._server.requests = []
+        self._server.not_modified = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def requests(self) -> list[str]:
+        """Paths requested so far."""
+        return self._server.requests
+
+    @property
+    def not_modified(self) -> int:
+        """Number of ``304 Not Modified`` answers so far."""
+        return self._server.not_modified
+
+    def url(self, name: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{name}"
+
+    def __enter__(self) -> "StaticServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic datasets for benchmarks and tests.
+
+:func:`iter_records` generates any number of records matching the fields of a
+:class:`~afwf_fts_anything.setting.Setting`, deterministically from a seed.
+Words are drawn from a fixed vocabulary with a Zipf-like distribution, so
+term frequencies look like natural text: a few words appear in most records,
+most words in only a few.  :func:`make_query_mix` builds queries over the
+same vocabulary, for latency measurements that hit both common and rare
+terms.
+
+- ``ngram`` fields get a short title-cased phrase,
+- ``text`` fields a sentence of 10 to 60 words,
+- ``keyword`` fields one of a few tags,
+- ``numeric`` fields the record number for ``*id*`` names, else a random
+  number of the field's ``kind``,
+- ``boolean`` fields a random bool,
+- ``stored`` fields a URL for ``*url*`` names, the record number for
+  ``*id*`` names, else a word.
+
+``datetime`` fields are left out: a JSON data file cannot hold a date value.
+"""
+
+import json
+import random
+import typing as T
+import itertools
+from pathlib import Path
+
+from sayt2.api import (
+    StoredField,
+    NgramField,
+    TextField,
+    KeywordField,
+    NumericField,
+    BooleanField,
+)
+
+from ..setting import Setting
+
+VOCABULARY_SIZE = 5000
+N_TAGS = 20
+
+_CONSONANTS = "bcdfghklmnprstvz"
+_VOWELS = "aeiou"
+
+
+def make_vocabulary(size: int = VOCABULARY_SIZE, seed: int = 0) -> list[str]:
+    """*size* distinct pronounceable words, most frequent first."""
+    rnd = random.Random(seed)
+    words = []
+    seen = set()
+    while len(words) < size:
+        n_syllables = rnd.choice((1, 2, 2, 3, 3, 4))
+        word = "".join(
+            rnd.choice(_CONSONANTS) + rnd.choice(_VOWELS) for _ in range(n_syllables)
+        )
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+class _Words:
+    """Draws words from a vocabulary with Zipf-like (``1 / rank``) weights."""
+
+    def __init__(self, vocabulary: list[str], rnd: random.Random):
+        self.vocabulary = vocabulary
+        self.rnd = rnd
+        self.cum_weights = list(
+            itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1))
+        )
+
+    def sample(self, k: int) -> list[str]:
+        return self.rnd.choices(self.vocabulary, cum_weights=self.cum_weights, k=k)
+
+
+def _make_value(field: T.Any, i: int, words: _Words) -> T.Any:
+    rnd = words.rnd
+    is_id = "id" in field.name.lower()
+    if isinstance(field, NgramField):
+        return " ".join(words.sample(rnd.randint(2, 4))).title()
+    if isinstance(field, TextField):
+        return " ".join(words.sample(rnd.randint(10, 60)))
+    if isinstance(field, KeywordField):
+        return f"tag{rnd.randrange(N_TAGS)}"
+    if isinstance(field, NumericField):
+        if field.kind == "f64":
+            return round(rnd.uniform(0, 10), 1)
+        if is_id:
+            return i
+        return rnd.randrange(1_000_000)
+    if isinstance(field, BooleanField):
+        return rnd.random() < 0.5
+    if isinstance(field, StoredField):
+        if "url" in field.name.lower():
+            return f"https://example.com/{field.name}/{i}"
+        if is_id:
+            return i
+        return words.sample(1)[0]
+    return None
+
+
+def iter_records(
+    setting: Setting,
+    n: int,
+    seed: int = 42,
+) -> T.Iterator[dict[str, T.Any]]:
+    """Yield *n* records with a value for every field of *setting*."""
+    rnd = random.Random(seed)
+    words = _Words(make_vocabulary(), rnd)
+    for i in range(n):
+        record = {}
+        for field in setting.fields:
+            value = _make_value(field, i, words)
+            if value is not None:
+                record[field.name] = value
+        yield record
+
+
+def write_dataset(
+    dir_root: Path,
+    name: str,
+    setting: Setting,
+    n: int,
+    seed: int = 42,
+) -> Path:
+    """
+    Write *setting* and *n* records as the dataset *name* into the dataset
+    directory *dir_root*, the records as ``{name}-data.jsonl``.  Returns the
+    data file.
+    """
+    dir_root.mkdir(parents=True, exist_ok=True)
+    content = setting.model_dump(mode="json", exclude_none=True)
+    content.pop("data_url", None)
+    content.pop("data_format", None)
+    content.pop("data_compression", None)
+    (dir_root / f"{name}-setting.json").write_text(json.dumps(content, indent=4))
+    path_data = dir_root / f"{name}-data.jsonl"
+    with path_data.open("w") as f:
+        for record in iter_records(setting, n, seed=seed):
+            f.write(json.dumps(record))
+            f.write("\n")
+    return path_data
+
+
+def make_query_mix(n: int = 100, seed: int = 7) -> list[tuple[str, str]]:
+    """
+    Return *n* ``(kind, query)`` pairs cycling through the query kinds:
+
+    - ``common`` — one of the ten most frequent words,
+    - ``rare`` — a word from the tail of the vocabulary,
+    - ``two_words`` — two mid-frequency words,
+    - ``prefix`` — the first three letters of a frequent word, as typed
+      while the user is still typing it,
+    - ``browse`` — the empty query, ``*``.
+    """
+    rnd = random.Random(seed)
+    vocabulary = make_vocabulary()
+    makers = [
+        ("common", lambda: rnd.choice(vocabulary[:10])),
+        ("rare", lambda: rnd.choice(vocabulary[len(vocabulary) // 2 :])),
+        (
+            "two_words",
+            lambda: " ".join(rnd.sample(vocabulary[10:200], 2)),
+        ),
+        ("prefix", lambda: rnd.choice(vocabulary[:100])[:3]),
+        ("browse", lambda: "*"),
+    ]
+    return [
+        (kind, make())
+        for kind, make in itertools.islice(itertools.cycle(makers), n)
+    ]
@@ -11,6 +11,7 @@ def test():
     _ = api.MalformedSettingError
     _ = api.Setting
     _ = api.Dataset
+    _ = api.IndexReader
     _ = api.DataCatalog
     _ = api.DatasetMeta
     _ = api.DatasetMetaStatusEnum
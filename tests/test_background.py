@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+from afwf_fts_anything.dataset import Dataset
+from afwf_fts_anything.background import spawn_refresh, main
+from afwf_fts_anything.index_generation import read_generation
+from afwf_fts_anything.paths import path_enum
+
+dir_movie = path_enum.dir_package_test_data_movie
+
+
+def setup_dataset(dir_root) -> Dataset:
+    for path in dir_movie.glob("movie-*.json"):
+        (dir_root / path.name).write_bytes(path.read_bytes())
+    return Dataset(name="movie", dir_root=dir_root)
+
+
+def change_data(ds: Dataset):
+    records = json.loads(ds.path_data.read_text())
+    records[0]["title"] = "Shawshank Reloaded"
+    ds.path_data.write_text(json.dumps(records))
+
+
+def test_spawn_refresh(tmp_path, monkeypatch):
+    # the child inherits the environment; make this checkout importable there
+    python_path = [str(path_enum.dir_project_root), os.environ.get("PYTHONPATH")]
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(p for p in python_path if p))
+    monkeypatch.chdir(tmp_path)
+    ds = setup_dataset(tmp_path)
+    ds.build_index()
+    generation = read_generation(ds.dir_index)
+    change_data(ds)
+    assert ds.needs_refresh() is True
+
+    path_log = tmp_path / "error.log"
+    proc = spawn_refresh(ds, path_log=path_log)
+    assert proc is not None
+    assert proc.wait(timeout=60) == 0, path_log.read_text()
+    assert read_generation(ds.dir_index) != generation
+    assert ds.needs_refresh() is False
+    assert [doc["movie_id"] for doc in ds.search("reloaded")] == [1]
+
+    # throttled
+    assert spawn_refresh(ds) is None
+    proc = spawn_refresh(ds, throttle=0)
+    assert proc is not None
+    assert proc.wait(timeout=60) == 0
+
+
+def test_main(tmp_path, capsys):
+    ds = setup_dataset(tmp_path)
+    assert main([str(tmp_path), "movie"]) == 0
+    assert ds.has_index()
+
+    # no setting file there
+    assert main([str(tmp_path / "nowhere"), "movie"]) == 1
+    assert "background refresh of 'movie' failed" in capsys.readouterr().err
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.background",
+        preview=False,
+    )
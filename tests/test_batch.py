@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import shutil
+
+import pytest
+
+from afwf_fts_anything.dataset import Dataset
+from afwf_fts_anything.batch import parse_line, iter_results, run_batch
+from afwf_fts_anything.paths import path_enum
+
+dir_movie = path_enum.dir_package_test_data_movie
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    shutil.copy(dir_movie / "movie-setting.json", tmp_path / "movie-setting.json")
+    shutil.copy(dir_movie / "movie-data.json", tmp_path / "movie-data.json")
+    return Dataset(name="movie", dir_root=tmp_path, keep_index_open=True)
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ('"god father"', (None, "god father")),
+        ('{"query": "god father"}', (None, "god father")),
+        ('{"id": [1, "a"], "query": "drama"}', ([1, "a"], "drama")),
+    ],
+)
+def test_parse_line(line, expected):
+    assert parse_line(line) == expected
+
+
+@pytest.mark.parametrize("line", ["not json", "42", '{"id": 1}', '{"query": 1}'])
+def test_parse_line_invalid(line):
+    with pytest.raises(ValueError):
+        parse_line(line)
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_iter_results(dataset, max_workers):
+    lines = [
+        '"god father"\n',
+        "\n",
+        '{"id": 7, "query": "dark knight"}\n',
+        "oops\n",
+        '{"id": "bad", "query": "title:("}\n',
+    ]
+    results = list(iter_results(dataset, lines, limit=2, max_workers=max_workers))
+    assert len(results) == 4
+    assert results[0]["id"] is None
+    assert results[0]["hits"][0]["movie_id"] == 2
+    assert len(results[0]["hits"]) <= 2
+    assert results[1]["id"] == 7
+    assert results[1]["hits"][0]["movie_id"] == 3
+    assert results[2] == {
+        "id": None,
+        "query": None,
+        "error": results[2]["error"],
+    }
+    assert results[2]["error"].startswith("invalid input line 4:")
+    assert results[3]["id"] == "bad"
+    assert results[3]["error"].startswith("ValueError:")
+
+
+def test_run_batch(dataset):
+    lines = [json.dumps({"id": i, "query": "drama"}) for i in range(600)]
+    out = io.StringIO()
+    report = run_batch(dataset, lines, out, limit=3, max_workers=4)
+    assert report.n_queries == 600
+    assert report.n_failed == 0
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [result["id"] for result in results] == list(range(600))
+    assert all(len(result["hits"]) == 3 for result in results)
+    dataset.close()
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(__file__, "afwf_fts_anything.batch", preview=False)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+
+import pytest
+
+from afwf_fts_anything.dataset import Dataset
+from afwf_fts_anything.fts import ActionEnum, fts_script_filter
+from afwf_fts_anything.browse_snapshot import (
+    get_path_snapshot,
+    load_snapshot,
+    read_answer,
+)
+from afwf_fts_anything.paths import path_enum
+
+dir_movie = path_enum.dir_package_test_data_movie
+
+
+@pytest.fixture
+def dir_dataset(tmp_path):
+    dir_dataset = tmp_path / "movie"
+    dir_dataset.mkdir()
+    shutil.copy(dir_movie / "movie-setting.json", dir_dataset / "movie-setting.json")
+    shutil.copy(dir_movie / "movie-data.json", dir_dataset / "movie-data.json")
+    return dir_dataset
+
+
+def search_empty_query(dir_dataset, action, path_error_log):
+    sf = fts_script_filter(
+        dataset_name="movie",
+        query="",
+        dir_datacatalog_root=dir_dataset.parent,
+        action=action,
+        path_error_log=path_error_log,
+    )
+    return json.dumps(sf.to_script_filter(), ensure_ascii=False)
+
+
+def test_no_index(dir_dataset):
+    assert read_answer(dir_dataset, "movie", "open_url") is None
+
+
+@pytest.mark.parametrize("action", list(ActionEnum))
+def test_written_at_build_time(dir_dataset, tmp_path, action):
+    ds = Dataset(name="movie", dir_root=dir_dataset)
+    ds.build_index()
+    assert get_path_snapshot(ds.dir_generation, action.value).exists()
+
+    path_error_log = tmp_path / "error.log"
+    answer = read_answer(dir_dataset, "movie", action.value, path_error_log)
+    assert answer == search_empty_query(dir_dataset, action, path_error_log)
+    items = json.loads(answer)["items"]
+    assert len(items) == 10  # the 9 movies, then "Open error log"
+    assert items[-1]["subtitle"] == str(path_error_log)
+
+    # without an error log
+    answer = read_answer(dir_dataset, "movie", action.value)
+    assert answer == search_empty_query(dir_dataset, action, None)
+
+
+def test_setting_changed(dir_dataset):
+    ds = Dataset(name="movie", dir_root=dir_dataset)
+    ds.build_index()
+    path_setting = dir_dataset / "movie-setting.json"
+    path_setting.write_text(path_setting.read_text() + "\n")
+    assert read_answer(dir_dataset, "movie", "open_url") is None
+
+    # the next empty query saves it again, for its action only
+    answer = search_empty_query(dir_dataset, ActionEnum.open_url, None)
+    assert read_answer(dir_dataset, "movie", "open_url") == answer
+    assert read_answer(dir_dataset, "movie", "open_file") is None
+
+
+def test_load_snapshot(tmp_path):
+    path = tmp_path / "browse-open_url.json"
+    assert load_snapshot(path, "abc") is None
+    path.write_text("not json")
+    assert load_snapshot(path, "abc") is None
+    path.write_text(json.dumps({"version": 1, "setting_hash": "abc"}))
+    assert load_snapshot(path, "abc") is not None
+    assert load_snapshot(path, "def") is None
+    assert load_snapshot(path, None) is None
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(__file__, "afwf_fts_anything.browse_snapshot", preview=False)
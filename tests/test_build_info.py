@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from afwf_fts_anything.build_info import (
+    BuildInfo,
+    stat_data,
+    hash_file,
+    make_build_info,
+)
+
+
+def test_dump_load(tmp_path):
+    assert BuildInfo.load(tmp_path) is None
+    info = BuildInfo(built_at=1.0, refreshed_at=2.0, data_mtime_ns=3, data_size=4, data_sha256="x")
+    info.dump(tmp_path)
+    assert BuildInfo.load(tmp_path) == info
+    (tmp_path / "build-info.json").write_text("{")
+    assert BuildInfo.load(tmp_path) is None
+
+
+def test_make_build_info(tmp_path):
+    path_data = tmp_path / "data.json"
+    path_data.write_text("[]")
+    stat = stat_data(path_data)
+    info = make_build_info(path_data, stat)
+    assert (info.data_mtime_ns, info.data_size) == stat
+    assert info.data_sha256 == hash_file(path_data)
+    assert info.is_data_changed(path_data) is False
+
+    path_data.write_text("[1]")
+    assert info.is_data_changed(path_data) is True
+    # changed while it was indexed: the hash cannot be trusted
+    assert make_build_info(path_data, stat).data_sha256 is None
+
+    info = make_build_info(None, None, refreshed_at=5.0)
+    assert info.refreshed_at == 5.0
+    assert info.data_size is None
+    assert info.is_data_changed(path_data) is False
+
+    assert stat_data(tmp_path / "missing.json") is None
+
+
+def test_is_refresh_due():
+    info = BuildInfo(built_at=time.time(), refreshed_at=time.time() - 100)
+    assert info.is_refresh_due(None) is False
+    assert info.is_refresh_due(1000) is False
+    assert info.is_refresh_due(50) is True
+
+
+def test_needs_refresh(tmp_path):
+    path_data = tmp_path / "movie-data.json"
+    path_data.write_text("[]")
+    info = make_build_info(path_data, stat_data(path_data), refresh_interval=100)
+    assert info.data_file == "movie-data.json"
+    assert info.refresh_due_at == info.refreshed_at + 100
+    assert info.needs_refresh(tmp_path) is False
+
+    path_data.write_text("[1]")
+    assert info.needs_refresh(tmp_path) is True
+
+    info = make_build_info(None, None, refreshed_at=time.time() - 200, refresh_interval=100)
+    assert info.data_file is None
+    assert info.needs_refresh(tmp_path) is True
+    assert make_build_info(None, None).needs_refresh(tmp_path) is False
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.build_info",
+        preview=False,
+    )
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+
+from afwf_fts_anything import setting_cache
+from afwf_fts_anything.catalog_manifest import (
+    ManifestEntry,
+    get_path_manifest,
+    load_manifest,
+    dump_manifest,
+    check_setting,
+)
+from afwf_fts_anything.paths import path_enum
+
+dir_movie = path_enum.dir_package_test_data_movie
+
+
+def test_dump_load(tmp_path):
+    path = get_path_manifest(tmp_path / "cache", tmp_path / "root")
+    assert load_manifest(path) == {}
+    entries = {
+        "movie": ManifestEntry(mtime_ns=1, size=2, is_valid=True, data_url="https://x"),
+        "broken": ManifestEntry(mtime_ns=3, size=4, is_valid=False),
+    }
+    dump_manifest(path, entries)
+    assert load_manifest(path) == entries
+
+    # another layout version is ignored
+    content = json.loads(path.read_text())
+    content["version"] = [0, 0]
+    path.write_text(json.dumps(content))
+    assert load_manifest(path) == {}
+    path.write_text("{truncated")
+    assert load_manifest(path) == {}
+
+
+def test_check_setting(tmp_path, monkeypatch):
+    path_setting = tmp_path / "movie-setting.json"
+    assert check_setting(path_setting, None, None) is None
+
+    shutil.copy(dir_movie / "movie-setting.json", path_setting)
+    entry = check_setting(path_setting, None, None)
+    assert entry.is_valid is True
+    assert entry.data_url.endswith("movie-data.json.zip")
+
+    # unchanged: the setting file is not read again
+    calls = []
+    load_setting = setting_cache.load_setting
+    monkeypatch.setattr(
+        setting_cache,
+        "load_setting",
+        lambda *args: calls.append(args) or load_setting(*args),
+    )
+    assert check_setting(path_setting, None, entry) is entry
+    assert calls == []
+
+    path_setting.write_text("{invalid")
+    entry = check_setting(path_setting, None, entry)
+    assert len(calls) == 1
+    assert (entry.is_valid, entry.data_url) == (False, None)
+    assert entry.size == path_setting.stat().st_size
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.catalog_manifest",
+        preview=False,
+    )
@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
 
+import io
+import os
+import sys
+import json
 import shutil
+import subprocess
 from pathlib import Path
 
+import pytest
+
 import afwf_fts_anything.cli as cli_mod
-from afwf_fts_anything.paths import path_enum
+from afwf_fts_anything.paths import path_enum, PACKAGE_NAME
 
 dir_tests = path_enum.dir_package_test_data
 
@@ -14,6 +21,7 @@ def setup_project_home(tmp_path, monkeypatch) -> Path:
     project_home = tmp_path / "project_home"
     project_home.mkdir()
     monkeypatch.setattr(path_enum, "dir_project_home", project_home)
+    monkeypatch.setattr(path_enum, "dir_cache", project_home / ".cache")
 
     # new layout: project_home/movie/ is the dataset root
     movie_dir = project_home / "movie"
@@ -58,6 +66,290 @@ class TestFts:
         assert sf.items[0].title.startswith("No result found for query:")
 
 
+class TestParseFtsArgv:
+    @pytest.mark.parametrize(
+        "argv, expected",
+        [
+            (
+                ["--dataset-name", "movie", "--action", "open_file", "--query", "god"],
+                {"dataset_name": "movie", "query": "god", "action": "open_file"},
+            ),
+            (
+                ["--dataset_name=movie", "--query=god father"],
+                {"dataset_name": "movie", "query": "god father"},
+            ),
+            # blank Alfred {query} at the end of the command line
+            (
+                ["--dataset-name", "movie", "--query"],
+                {"dataset_name": "movie", "query": ""},
+            ),
+            (
+                ["--query", "--dataset-name", "movie"],
+                {"dataset_name": "movie", "query": ""},
+            ),
+            (["movie", "god"], {"dataset_name": "movie", "query": "god"}),
+            (["movie"], {"dataset_name": "movie", "query": "*"}),
+            # --profile never swallows the next token
+            (
+                ["--profile", "--dataset-name", "movie", "--query", "god"],
+                {"dataset_name": "movie", "query": "god", "profile": ""},
+            ),
+            (
+                ["movie", "--profile", "god"],
+                {"dataset_name": "movie", "query": "god", "profile": ""},
+            ),
+            (
+                ["--dataset-name", "movie", "--profile=5"],
+                {"dataset_name": "movie", "query": "*", "profile": "5"},
+            ),
+        ],
+    )
+    def test_parse(self, argv, expected):
+        assert cli_mod.parse_fts_argv(argv) == expected
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            [],
+            ["--query", "god"],
+            ["--dataset-name", "movie", "--unknown", "x"],
+            ["--dataset-name", "movie", "--dataset-name", "book"],
+            ["movie", "god", "open_url", "extra"],
+        ],
+    )
+    def test_defer_to_fire(self, argv):
+        assert cli_mod.parse_fts_argv(argv) is None
+
+
+class TestMain:
+    def test_fts_fast_path(self, tmp_path, monkeypatch, capsys):
+        setup_project_home(tmp_path, monkeypatch)
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        cli_mod.main(["fts", "--dataset-name", "movie", "--query", "God Father"])
+        sf = json.loads(capsys.readouterr().out)
+        assert sf["items"][0]["arg"] == "https://www.imdb.com/title/tt0068646"
+
+    def test_fts_response_cache(self, tmp_path, monkeypatch, capsys):
+        setup_project_home(tmp_path, monkeypatch)
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        argv = ["fts", "--dataset-name", "movie", "--query", " God  Father"]
+
+        # first call builds the index; no generation yet, nothing is cached
+        cli_mod.main(argv)
+        first = capsys.readouterr().out
+        # second call searches in-process and stores the answer
+        cli_mod.main(argv)
+        assert capsys.readouterr().out == first
+
+        # third call is served from the cache without searching
+        def fail(**kwargs):
+            raise AssertionError("fts should not run on a cache hit")
+
+        monkeypatch.setattr(cli_mod, "fts", fail)
+        cli_mod.main(["fts", "--dataset-name", "movie", "--query", "God Father"])
+        assert capsys.readouterr().out == first
+
+        # rebuilding the index invalidates the cached answer
+        from afwf_fts_anything.data_catalog import DataCatalog
+
+        catalog = DataCatalog(dir_root=path_enum.dir_project_home, dir_cache=path_enum.dir_cache)
+        catalog.get_dataset("movie").build_index()
+        with pytest.raises(AssertionError):
+            cli_mod.main(argv)
+
+    def test_fts_failed_answer_not_cached(self, tmp_path, monkeypatch, capsys):
+        from afwf_fts_anything.dataset import Dataset
+
+        setup_project_home(tmp_path, monkeypatch)
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        argv = ["fts", "--dataset-name", "movie", "--query", "God Father"]
+        cli_mod.main(["fts", "--dataset-name", "movie", "--query", "drama"])  # build
+        capsys.readouterr()
+
+        def fail(self, query, limit=20):
+            raise RuntimeError("boom")
+
+        with monkeypatch.context() as m:
+            m.setattr(Dataset, "search", fail)
+            cli_mod.main(argv)
+            sf = json.loads(capsys.readouterr().out)
+            assert sf["items"][0]["title"].startswith("Search failed")
+
+        cli_mod.main(argv)
+        sf = json.loads(capsys.readouterr().out)
+        assert sf["items"][0]["arg"] == "https://www.imdb.com/title/tt0068646"
+
+    def test_fts_refresh_on_cache_hit(self, tmp_path, monkeypatch, capsys):
+        from afwf_fts_anything import background
+
+        project_home = setup_project_home(tmp_path, monkeypatch)
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        spawned = []
+        monkeypatch.setattr(
+            background,
+            "spawn_refresh_process",
+            lambda dir_root, name, dir_cache, path_log: spawned.append(name),
+        )
+        argv = ["fts", "--dataset-name", "movie", "--query", "God Father"]
+        cli_mod.main(argv)  # build
+        cli_mod.main(argv)  # search and cache
+        cli_mod.main(argv)  # cache hit, index is fresh
+        assert spawned == []
+
+        path_data = project_home / "movie" / "movie-data.json"
+        path_data.write_text(path_data.read_text() + " ")
+        monkeypatch.setattr(cli_mod, "fts", None)
+        cli_mod.main(argv)  # still answered from the cache
+        assert spawned == ["movie"]
+        capsys.readouterr()
+
+    def test_fts_browse_snapshot(self, tmp_path, monkeypatch, capsys):
+        setup_project_home(tmp_path, monkeypatch)
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        argv = ["fts", "--dataset-name", "movie", "--query", " "]
+
+        # first call builds the index, which saves the empty-query answer
+        cli_mod.main(argv)
+        first = capsys.readouterr().out
+
+        def fail(**kwargs):
+            raise AssertionError("fts should not run for a snapshot answer")
+
+        monkeypatch.setattr(cli_mod, "fts", fail)
+        monkeypatch.setattr(cli_mod.response_cache_mod, "ResponseCache", fail)
+        cli_mod.main(argv)
+        assert capsys.readouterr().out == first
+        sf = json.loads(first)
+        assert sf["items"][-1]["subtitle"] == str(path_enum.path_error_log)
+
+        # a stale index still answers from the snapshot, and gets refreshed
+        from afwf_fts_anything import background
+
+        spawned = []
+        monkeypatch.setattr(
+            background,
+            "spawn_refresh_process",
+            lambda dir_root, name, dir_cache, path_log: spawned.append(name),
+        )
+        path_data = path_enum.dir_project_home / "movie" / "movie-data.json"
+        path_data.write_text(path_data.read_text() + " ")
+        cli_mod.main(argv)
+        assert capsys.readouterr().out == first
+        assert spawned == ["movie"]
+
+    def test_fts_profile(self, tmp_path, monkeypatch, capsys):
+        setup_project_home(tmp_path, monkeypatch)
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        monkeypatch.delenv("AFWF_FTS_PROFILE", raising=False)
+        argv = ["fts", "--dataset-name", "movie", "--query", "God Father"]
+        cli_mod.main(argv)  # build the index, without profiling
+        capsys.readouterr()
+        path_timings = path_enum.dir_cache / "profile" / "fts-timings.jsonl"
+        assert not path_timings.exists()
+
+        cli_mod.main(argv + ["--profile=1"])
+        sf = json.loads(capsys.readouterr().out)
+        assert sf["items"][0]["arg"] == "https://www.imdb.com/title/tt0068646"
+        record = json.loads(path_timings.read_text().splitlines()[-1])
+        assert record["dataset"] == "movie"
+        assert record["source"] == "search"
+        for name in ["import", "setting", "open_index", "query", "render", "items", "output"]:
+            assert name in record["phases"], name
+        assert sum(record["phases"].values()) <= record["total_ms"]
+        assert len(list((path_enum.dir_cache / "profile" / "cprofile").iterdir())) == 1
+
+        # answered from the response cache this time
+        monkeypatch.setenv("AFWF_FTS_PROFILE", "1")
+        cli_mod.main(argv)
+        record = json.loads(path_timings.read_text().splitlines()[-1])
+        assert record["source"] == "cache"
+        assert set(record["phases"]) == {"response_cache", "output", "index_check"}
+
+    def test_fts_profile_index_build(self, tmp_path, monkeypatch, capsys):
+        setup_project_home(tmp_path, monkeypatch)
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        monkeypatch.setenv("AFWF_FTS_PROFILE", "1")
+        cli_mod.main(["fts", "--dataset-name", "movie", "--query", "God Father"])
+        capsys.readouterr()
+        path_timings = path_enum.dir_cache / "profile" / "fts-timings.jsonl"
+        phases = json.loads(path_timings.read_text().splitlines()[-1])["phases"]
+        # the first run builds the index; that is not counted as checking it
+        assert phases["index_build"] > phases["index_check"]
+
+    def test_fts_batch(self, tmp_path, monkeypatch, capsys):
+        setup_project_home(tmp_path, monkeypatch)
+        lines = '"God Father"\n{"id": 1, "query": "dark knight"}\n'
+        monkeypatch.setattr(sys, "stdin", io.StringIO(lines))
+        cli_mod.main(["fts-batch", "--dataset-name", "movie", "--limit", "1"])
+        captured = capsys.readouterr()
+        results = [json.loads(line) for line in captured.out.splitlines()]
+        assert [result["hits"][0]["movie_id"] for result in results] == [2, 3]
+        assert results[1]["id"] == 1
+        assert "2 queries in" in captured.err
+
+    def test_bad_action(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        with pytest.raises(ValueError, match="Unsupported action"):
+            cli_mod.main(["fts", "--dataset-name", "movie", "--action", "bad"])
+
+    def test_other_commands_go_through_fire(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        cli_mod.main(["stop-daemon"])
+        assert "daemon is not running" in capsys.readouterr().out
+
+
+class TestImportBudget:
+    """
+    The ``fts`` entry point runs once per keystroke; guard its import cost.
+    """
+
+    # heavy dependencies that must only be imported when actually searching
+    heavy_modules = ["fire", "pydantic", "sayt2", "tantivy", "afwf.api", "diskcache"]
+    # generous cumulative budget for importing the CLI module, in microseconds;
+    # a cached answer adds only sqlite3 (about 8 ms) to it
+    budget_us = 150_000
+
+    def test_cached_fts_import_budget(self, tmp_path, monkeypatch, capsys):
+        project_home = setup_project_home(tmp_path, monkeypatch)
+        monkeypatch.setattr(path_enum, "path_daemon_socket", tmp_path / "no-daemon.sock")
+        argv = ["fts", "--dataset-name", "movie", "--query", "God Father"]
+        cli_mod.main(argv)  # builds the index
+        capsys.readouterr()
+        cli_mod.main(argv)  # stores the answer in the response cache
+        answer = capsys.readouterr().out
+
+        # a fresh interpreter finds the same project home under $HOME
+        home = tmp_path / "home"
+        (home / ".alfred-afwf").mkdir(parents=True)
+        (home / ".alfred-afwf" / PACKAGE_NAME).symlink_to(project_home)
+        python_path = [str(path_enum.dir_project_root), os.environ.get("PYTHONPATH")]
+        env = dict(os.environ, HOME=str(home))
+        env["PYTHONPATH"] = os.pathsep.join(p for p in python_path if p)
+        env.pop("AFWF_FTS_PROFILE", None)
+        code = f"from afwf_fts_anything import cli; cli.main({argv!r})"
+        res = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+        assert res.stdout == answer
+
+        cumulative = {}
+        for line in res.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cum, name = line[len("import time:"):].split("|")
+            if cum.strip().isdigit():
+                cumulative[name.strip()] = int(cum)
+
+        imported = set(cumulative)
+        for heavy in self.heavy_modules:
+            assert heavy not in imported, f"{heavy} imported on the fts path"
+        assert cumulative["afwf_fts_anything.cli"] < self.budget_us
+
+
 class TestListDatasets:
     def test_no_datasets(self, tmp_path, monkeypatch):
         project_home = tmp_path / "empty_home"
@@ -118,6 +410,29 @@ class TestRebuildIndex:
         assert dir_index.exists()
 
 
+class TestRebuildAll:
+    def test_rebuild_all(self, tmp_path, monkeypatch, capsys):
+        project_home = setup_project_home(tmp_path, monkeypatch)
+        path_setting = project_home / "movie" / "movie-setting.json"
+        setting = json.loads(path_setting.read_text())
+        setting.pop("data_url")
+        path_setting.write_text(json.dumps(setting))
+
+        reports = cli_mod.rebuild_all.__wrapped__(max_workers=1)
+        assert [r.name for r in reports] == ["movie"]
+        out = capsys.readouterr().out
+        assert "movie: full rebuild: 9 indexed" in out
+        assert "rebuilt 1 of 1 datasets" in out
+
+        (project_home / "broken").mkdir()
+        (project_home / "broken" / "broken-setting.json").write_text("{invalid")
+        with pytest.raises(SystemExit):
+            cli_mod.rebuild_all.__wrapped__(max_workers=1)
+        out = capsys.readouterr().out
+        assert "broken: FAILED invalid setting file" in out
+        assert "rebuilt 1 of 2 datasets" in out and "1 failed" in out
+
+
 if __name__ == "__main__":
     from afwf_fts_anything.tests import run_cov_test
 
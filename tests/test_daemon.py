@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+import threading
+
+import pytest
+
+from afwf_fts_anything import daemon
+from afwf_fts_anything.fts import fts
+from afwf_fts_anything.paths import path_enum
+
+dir_tests = path_enum.dir_package_test_data
+
+
+def setup_catalog(tmp_path):
+    dir_root = tmp_path / "catalog"
+    shutil.copytree(dir_tests / "movie", dir_root / "movie", ignore=shutil.ignore_patterns("movie-index"))
+    return dir_root
+
+
+requires_unix_sockets = pytest.mark.skipif(
+    not daemon.HAS_UNIX_SOCKETS, reason="the daemon needs Unix domain sockets"
+)
+
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    dir_root = setup_catalog(tmp_path)
+    path_socket = tmp_path / "d.sock"
+    server = daemon.create_server(path_socket=path_socket, dir_datacatalog_root=dir_root)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, path_socket, dir_root
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+class TestClient:
+    def test_no_socket_returns_none(self, tmp_path):
+        path_socket = tmp_path / "missing.sock"
+        assert daemon.request_fts(path_socket, "movie", "god", "open_url") is None
+        assert daemon.is_running(path_socket) is False
+        assert daemon.stop(path_socket) is False
+
+    def test_stale_socket_file_returns_none(self, tmp_path):
+        path_socket = tmp_path / "stale.sock"
+        path_socket.write_text("")
+        assert daemon.request_fts(path_socket, "movie", "god", "open_url") is None
+
+
+@requires_unix_sockets
+class TestDaemon:
+    def test_fts_matches_in_process(self, running_daemon):
+        server, path_socket, dir_root = running_daemon
+        assert daemon.is_running(path_socket) is True
+
+        for query in ["God Father", "", "?", "zzznomatchzzz"]:
+            answer = daemon.request_fts(path_socket, "movie", query, "open_url")
+            expected = [
+                item.to_script_filter()
+                for item in fts(dataset_name="movie", query=query, dir_datacatalog_root=dir_root)
+            ]
+            assert json.loads(answer)["items"] == expected
+
+    def test_dataset_is_kept_warm(self, running_daemon):
+        server, path_socket, dir_root = running_daemon
+        daemon.request_fts(path_socket, "movie", "God Father", "open_url")
+        ds1 = server.fts_daemon.get_dataset("movie")
+        daemon.request_fts(path_socket, "movie", "drama", "open_url")
+        assert server.fts_daemon.get_dataset("movie") is ds1
+        assert len(server.fts_daemon.handle_pool) == 1
+
+    def test_concurrent_requests_during_rebuild(self, running_daemon):
+        from afwf_fts_anything.dataset import Dataset
+
+        server, path_socket, dir_root = running_daemon
+        daemon.request_fts(path_socket, "movie", "God Father", "open_url")  # builds the index
+        dataset = Dataset(name="movie", dir_root=dir_root / "movie")
+        stop = threading.Event()
+
+        def rebuild():
+            while not stop.is_set():
+                dataset.build_index()
+
+        answers = {}
+
+        def search(query):
+            answers[query] = [
+                daemon.request_fts(path_socket, "movie", query, "open_url", timeout=30)
+                for _ in range(10)
+            ]
+
+        rebuilder = threading.Thread(target=rebuild)
+        rebuilder.start()
+        threads = [
+            threading.Thread(target=search, args=(query,))
+            for query in ["god father", "god fat", "god", "drama", "dark knight", "war"]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop.set()
+        rebuilder.join()
+
+        # every request was answered by the daemon, from a complete index
+        for query, query_answers in answers.items():
+            assert None not in query_answers, query
+            assert len({answer for answer in query_answers}) == 1, query
+        first = json.loads(answers["god father"][0])["items"][0]
+        assert first["title"].startswith("The Godfather")
+
+    def test_federated_uses_pool_readers(self, running_daemon):
+        server, path_socket, dir_root = running_daemon
+        dir_film = dir_root / "film"
+        dir_film.mkdir()
+        for suffix in ["setting.json", "data.json"]:
+            shutil.copy(dir_root / "movie" / f"movie-{suffix}", dir_film / f"film-{suffix}")
+
+        answer = daemon.request_fts(path_socket, "movie,film", "God Father", "open_url")
+        assert {item["variables"]["dataset"] for item in json.loads(answer)["items"]} == {
+            "movie",
+            "film",
+        }
+        # both readers live in the daemon's pool, none in the datasets
+        fts_daemon = server.fts_daemon
+        assert len(fts_daemon.handle_pool) == 2
+        for name in ["movie", "film"]:
+            assert fts_daemon.get_dataset(name)._reader is None
+
+    def test_setting_change_reloads_dataset(self, running_daemon):
+        server, path_socket, dir_root = running_daemon
+        ds1 = server.fts_daemon.get_dataset("movie")
+        path_setting = dir_root / "movie" / "movie-setting.json"
+        setting = json.loads(path_setting.read_text())
+        setting["title_field"] = "Movie: {title}"
+        path_setting.write_text(json.dumps(setting))
+
+        answer = daemon.request_fts(path_socket, "movie", "God Father", "open_url")
+        assert json.loads(answer)["items"][0]["title"] == "Movie: The Godfather"
+        assert server.fts_daemon.get_dataset("movie") is not ds1
+
+    def test_failed_search_gets_empty_answer(self, running_daemon):
+        server, path_socket, dir_root = running_daemon
+        # "Setting file not found" is left to the in-process run
+        assert daemon.request_fts(path_socket, "ghost", "god", "open_url") is None
+
+    def test_bad_request_gets_empty_answer(self, running_daemon):
+        server, path_socket, dir_root = running_daemon
+        assert daemon.send_request(path_socket, {"op": "unknown"}) is None
+
+    def test_create_server_refuses_when_running(self, running_daemon):
+        server, path_socket, dir_root = running_daemon
+        with pytest.raises(RuntimeError):
+            daemon.create_server(path_socket=path_socket, dir_datacatalog_root=dir_root)
+
+    def test_stop(self, tmp_path):
+        dir_root = setup_catalog(tmp_path)
+        path_socket = tmp_path / "d.sock"
+        server = daemon.create_server(path_socket=path_socket, dir_datacatalog_root=dir_root)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        assert daemon.stop(path_socket) is True
+        thread.join(timeout=5)
+        server.server_close()
+        assert not path_socket.exists()
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.daemon",
+        preview=False,
+    )
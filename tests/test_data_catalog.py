@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import json
 import shutil
 
-from afwf_fts_anything.data_catalog import DataCatalog, DatasetMeta, DatasetMetaStatusEnum
+from afwf_fts_anything.data_catalog import (
+    DataCatalog,
+    DatasetMeta,
+    DatasetMetaStatusEnum,
+    RebuildReport,
+)
 from afwf_fts_anything.paths import path_enum
 
 dir_tests = path_enum.dir_package_test_data
@@ -77,6 +83,53 @@ class TestDataCatalogScan:
         names = [m.name for m in catalog.scan()]
         assert names == sorted(names)
 
+    def test_scan_with_setting_cache(self, tmp_path):
+        dir_root = tmp_path / "root"
+        good = dir_root / "good"
+        good.mkdir(parents=True)
+        shutil.copy(dir_tests / "movie" / "movie-setting.json", good / "good-setting.json")
+        bad = dir_root / "bad"
+        bad.mkdir()
+        (bad / "bad-setting.json").write_text("{invalid")
+
+        catalog = DataCatalog(dir_root=dir_root, dir_cache=tmp_path / "cache")
+        for _ in range(2):  # cold, then served from the cache
+            metas = {m.name: m for m in catalog.scan()}
+            assert metas["good"].status == DatasetMetaStatusEnum.setting_valid
+            assert metas["bad"].status == DatasetMetaStatusEnum.setting_invalid
+        assert catalog.get_dataset("good").dir_cache == tmp_path / "cache"
+
+    def test_scan_with_manifest(self, tmp_path, monkeypatch):
+        from afwf_fts_anything import setting_cache
+
+        dir_root = tmp_path / "root"
+        for name in ("alpha", "beta"):
+            (dir_root / name).mkdir(parents=True)
+            shutil.copy(dir_tests / "movie" / "movie-setting.json", dir_root / name / f"{name}-setting.json")
+        catalog = DataCatalog(dir_root=dir_root, dir_cache=tmp_path / "cache")
+        metas = catalog.scan()
+        assert [m.name for m in metas] == ["alpha", "beta"]
+        assert metas[0].data_url.endswith("movie-data.json.zip")
+
+        calls = []
+        load_setting = setting_cache.load_setting
+        monkeypatch.setattr(
+            setting_cache,
+            "load_setting",
+            lambda path, dir_cache: calls.append(path.name) or load_setting(path, dir_cache),
+        )
+        assert catalog.scan() == metas
+        assert calls == []  # served from the manifest
+
+        path_setting = dir_root / "beta" / "beta-setting.json"
+        setting = json.loads(path_setting.read_text())
+        setting.pop("data_url")
+        path_setting.write_text(json.dumps(setting))
+        shutil.rmtree(dir_root / "alpha")
+        metas = catalog.scan()
+        assert calls == ["beta-setting.json"]
+        assert [(m.name, m.is_valid, m.data_url) for m in metas] == [("beta", True, None)]
+
     def test_mixed_valid_and_invalid(self, tmp_path):
         # one valid, one broken — both returned with correct statuses
         good = tmp_path / "good"
@@ -93,6 +146,114 @@ class TestDataCatalogScan:
         assert metas["bad"].status == DatasetMetaStatusEnum.setting_invalid
 
 
+def setup_local_dataset(dir_root, name):
+    """Copy the movie sample as dataset *name*, without ``data_url``."""
+    setting = json.loads((dir_tests / "movie" / "movie-setting.json").read_text())
+    setting.pop("data_url")
+    dir_dataset = dir_root / name
+    dir_dataset.mkdir(parents=True)
+    (dir_dataset / f"{name}-setting.json").write_text(json.dumps(setting))
+    shutil.copy(dir_tests / "movie" / "movie-data.json", dir_dataset / f"{name}-data.json")
+
+
+class TestDataCatalogRebuildAll:
+    def setup_catalog(self, tmp_path) -> DataCatalog:
+        for name in ("alpha", "beta"):
+            setup_local_dataset(tmp_path, name)
+        setup_local_dataset(tmp_path, "corrupt")
+        (tmp_path / "corrupt" / "corrupt-data.json").write_text("[{not json")
+        (tmp_path / "bad").mkdir()
+        (tmp_path / "bad" / "bad-setting.json").write_text("{invalid")
+        return DataCatalog(dir_root=tmp_path)
+
+    def check(self, catalog: DataCatalog, reports: list[RebuildReport]):
+        assert [r.name for r in reports] == ["alpha", "bad", "beta", "corrupt"]
+        alpha, bad, beta, corrupt = reports
+        assert alpha.ok and beta.ok
+        assert alpha.result == "full rebuild: 9 indexed"
+        assert alpha.seconds > 0
+        assert bad.error == "invalid setting file"
+        assert corrupt.ok is False
+        assert "corrupt: FAILED" in str(corrupt)
+        for name in ("alpha", "beta"):
+            assert catalog.get_dataset(name).search("god father")
+
+    def test_serial(self, tmp_path):
+        catalog = self.setup_catalog(tmp_path)
+        done = []
+        reports = catalog.rebuild_all(max_workers=1, callback=done.append)
+        self.check(catalog, reports)
+        assert sorted(r.name for r in done) == ["alpha", "bad", "beta", "corrupt"]
+
+        # nothing changed since
+        reports = catalog.rebuild_all(max_workers=1)
+        assert reports[0].result == "full rebuild: 9 indexed"  # no primary_key
+
+    def test_process_pool(self, tmp_path):
+        catalog = self.setup_catalog(tmp_path)
+        self.check(catalog, catalog.rebuild_all(max_workers=2))
+
+
+class TestDataCatalogSearchMany:
+    def setup_catalog(self, tmp_path) -> DataCatalog:
+        for name in ("alpha", "beta"):
+            setup_local_dataset(tmp_path, name)
+        return DataCatalog(dir_root=tmp_path)
+
+    def test_search_many(self, tmp_path):
+        catalog = self.setup_catalog(tmp_path)
+        result = catalog.search_many(["alpha", "beta"], "god father", limit=4)
+        assert result.errors == {}
+        # equally relevant hits interleave in dataset order
+        assert [(hit.dataset, hit.source["movie_id"]) for hit in result.hits] == [
+            ("alpha", 2),
+            ("beta", 2),
+        ]
+        assert result.hits[0].score == result.hits[1].score == 1.0
+
+        result = catalog.search_many(["alpha", "missing"], "god father")
+        assert list(result.errors) == ["missing"]
+        assert "FileNotFoundError" in result.errors["missing"]
+        assert {hit.dataset for hit in result.hits} == {"alpha"}
+
+        assert catalog.search_many([], "god").hits == []
+
+    def test_build_in_progress(self, tmp_path):
+        from afwf_fts_anything.index_generation import get_build_lock
+
+        catalog = self.setup_catalog(tmp_path)
+        # another process is building beta's first index: not waited for
+        with get_build_lock(tmp_path / "beta" / "beta-index"):
+            result = catalog.search_many(["alpha", "beta"], "god father", timeout=5)
+        assert result.building == ["beta"]
+        assert result.errors == {}
+        assert {hit.dataset for hit in result.hits} == {"alpha"}
+
+    def test_timeout(self, tmp_path, monkeypatch):
+        import time
+        import threading
+
+        from afwf_fts_anything.dataset import Dataset
+
+        catalog = self.setup_catalog(tmp_path)
+        catalog.search_many(["alpha", "beta"], "god")  # build the indexes
+        release = threading.Event()
+        search_hits = Dataset.search_hits
+
+        def slow_search_hits(self, query, limit=20):
+            if self.name == "beta":
+                release.wait(10)
+            return search_hits(self, query, limit=limit)
+
+        monkeypatch.setattr(Dataset, "search_hits", slow_search_hits)
+        start = time.perf_counter()
+        result = catalog.search_many(["alpha", "beta"], "god", timeout=0.2)
+        assert time.perf_counter() - start < 5
+        release.set()
+        assert result.errors == {"beta": "timed out after 0.2s"}
+        assert {hit.dataset for hit in result.hits} == {"alpha"}
+
+
 if __name__ == "__main__":
     from afwf_fts_anything.tests import run_cov_test
 
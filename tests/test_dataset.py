@@ -1,11 +1,22 @@
 # -*- coding: utf-8 -*-
 
 import io
+import os
+import gzip
 import json
+import lzma
 import zipfile
 
+import pytest
+
 from afwf_fts_anything.dataset import Dataset
+from afwf_fts_anything.exc import IndexBuildInProgressError
+from afwf_fts_anything.index_generation import read_generation, get_build_lock
+from afwf_fts_anything.index_update import HASHES_FILENAME
+from afwf_fts_anything import display_table
+from afwf_fts_anything.display_table import DISPLAY_TABLE_FILENAME
 from afwf_fts_anything.paths import path_enum
+from afwf_fts_anything.tests.http_server import StaticServer
 
 dir_movie = path_enum.dir_package_test_data_movie
 
@@ -71,10 +82,454 @@ class TestSaveData:
         assert json.loads(ds.path_data.read_bytes()) == records
 
 
+class TestDownloadData:
+    def setup_dataset(self, tmp_path, data_url) -> Dataset:
+        setting = json.loads((dir_movie / "movie-setting.json").read_text())
+        setting["data_url"] = data_url
+        dir_root = tmp_path / "movie"
+        dir_root.mkdir()
+        (dir_root / "movie-setting.json").write_text(json.dumps(setting))
+        return Dataset(name="movie", dir_root=dir_root)
+
+    @pytest.mark.parametrize(
+        "name",
+        ["movie-data.json", "movie-data.json.zip", "movie-data.json.gz"],
+    )
+    def test_conditional_download(self, tmp_path, name):
+        dir_www = tmp_path / "www"
+        dir_www.mkdir()
+        raw = (dir_movie / "movie-data.json").read_bytes()
+        if name.endswith(".zip"):
+            with zipfile.ZipFile(dir_www / name, "w") as zf:
+                zf.writestr("movie-data.json", raw)
+        elif name.endswith(".gz"):
+            (dir_www / name).write_bytes(gzip.compress(raw))
+        else:
+            (dir_www / name).write_bytes(raw)
+
+        with StaticServer(dir_www) as server:
+            ds = self.setup_dataset(tmp_path, server.url(name))
+            assert ds.download_data() is True
+            assert ds.path_data.read_bytes() == raw
+            assert ds.path_download_info.exists()
+            assert ds.download_data() is False
+            assert server.not_modified == 1
+
+            # a hand-edited data file is replaced by a full download
+            ds.path_data.write_text("[]")
+            assert ds.download_data() is True
+            assert ds.path_data.read_bytes() == raw
+            assert sorted(p.name for p in ds.dir_root.iterdir()) == [
+                "movie-data.json",
+                "movie-download.json",
+                "movie-setting.json",
+            ]
+
+    def test_sync(self, tmp_path):
+        dir_www = tmp_path / "www"
+        dir_www.mkdir()
+        path_remote = dir_www / "movie-data.json"
+        records = json.loads((dir_movie / "movie-data.json").read_text())
+        path_remote.write_text(json.dumps(records))
+
+        with StaticServer(dir_www) as server:
+            ds = self.setup_dataset(tmp_path, server.url("movie-data.json"))
+            assert ds.sync().full_rebuild is True
+            generation = read_generation(ds.dir_index)
+
+            # not modified upstream: nothing is reindexed
+            assert ds.sync() is None
+            assert read_generation(ds.dir_index) == generation
+
+            records[0]["title"] = "Shawshank Reloaded"
+            path_remote.write_text(json.dumps(records))
+            assert ds.sync().full_rebuild is True
+            assert read_generation(ds.dir_index) != generation
+            assert [doc["movie_id"] for doc in ds.search("reloaded")] == [1]
+
+
+class TestDataCompression:
+    def write_setting(self, dir_root, **kwargs):
+        setting = json.loads((dir_movie / "movie-setting.json").read_text())
+        setting.pop("data_url")
+        setting.update(kwargs)
+        (dir_root / "movie-setting.json").write_text(json.dumps(setting))
+
+    def test_compress_local_data(self, tmp_path):
+        self.write_setting(tmp_path, data_compression="gz")
+        raw = (dir_movie / "movie-data.json").read_bytes()
+        (tmp_path / "movie-data.json").write_bytes(raw)
+
+        ds = Dataset(name="movie", dir_root=tmp_path)
+        assert ds.data_compression == "gz"
+        assert ds.path_data == tmp_path / "movie-data.json.gz"
+        assert ds.build_index() == 9
+        # the plain copy was converted
+        assert not (tmp_path / "movie-data.json").exists()
+        assert gzip.decompress(ds.path_data.read_bytes()) == raw
+        assert ds.path_data.stat().st_size < len(raw)
+        assert [doc["movie_id"] for doc in ds.search("god father")][:1] == [2]
+        assert len(ds.get_data()) == 9
+        assert ds.needs_refresh() is False
+
+    def test_detect_compressed_data_file(self, tmp_path):
+        self.write_setting(tmp_path)
+        records = json.loads((dir_movie / "movie-data.json").read_text())
+        text = "\n".join(json.dumps(record) for record in records)
+        (tmp_path / "movie-data.jsonl.xz").write_bytes(lzma.compress(text.encode()))
+
+        ds = Dataset(name="movie", dir_root=tmp_path)
+        assert ds.data_format == "jsonl"
+        assert ds.data_compression == "xz"
+        assert list(ds.iter_data()) == records
+
+    @pytest.mark.parametrize("name", ["movie-data.json", "movie-data.json.gz"])
+    def test_download(self, tmp_path, name):
+        dir_www = tmp_path / "www"
+        dir_www.mkdir()
+        raw = (dir_movie / "movie-data.json").read_bytes()
+        if name.endswith(".gz"):
+            (dir_www / name).write_bytes(gzip.compress(raw))
+        else:
+            (dir_www / name).write_bytes(raw)
+        dir_root = tmp_path / "movie"
+        dir_root.mkdir()
+
+        with StaticServer(dir_www) as server:
+            self.write_setting(dir_root, data_url=server.url(name), data_compression="gz")
+            ds = Dataset(name="movie", dir_root=dir_root)
+            assert ds.download_data() is True
+        assert ds.path_data == dir_root / "movie-data.json.gz"
+        assert gzip.decompress(ds.path_data.read_bytes()) == raw
+        if name.endswith(".gz"):
+            # stored as downloaded
+            assert ds.path_data.read_bytes() == (dir_www / name).read_bytes()
+
+
+class TestIterData:
+    def test_iter_data(self):
+        ds = make_dataset()
+        assert list(ds.iter_data()) == ds.get_data()
+
+    def test_build_index_streams_data_file(self, tmp_path):
+        for path in dir_movie.glob("movie-*.json"):
+            (tmp_path / path.name).write_bytes(path.read_bytes())
+        ds = Dataset(name="movie", dir_root=tmp_path)
+        ds.get_data = None  # must not be used to build the index
+        assert ds.build_index() == 9
+        assert ds.search("god father")[0]["movie_id"] == 2
+
+
+class TestDataFormat:
+    def write_setting(self, dir_root, **kwargs):
+        setting = json.loads((dir_movie / "movie-setting.json").read_text())
+        setting.pop("data_url")
+        setting.update(kwargs)
+        (dir_root / "movie-setting.json").write_text(json.dumps(setting))
+
+    def test_detect(self, tmp_path):
+        assert Dataset(name="movie", dir_root=tmp_path).data_format == "json"
+
+        self.write_setting(tmp_path, data_url="https://example.com/movie.jsonl.zip?raw=1")
+        ds = Dataset(name="movie", dir_root=tmp_path)
+        assert ds.data_format == "jsonl"
+        assert ds.path_data == tmp_path / "movie-data.jsonl"
+
+        self.write_setting(tmp_path, data_url="https://example.com/movie.ndjson.xz")
+        assert Dataset(name="movie", dir_root=tmp_path).data_format == "jsonl"
+
+        self.write_setting(tmp_path, data_url="https://example.com/movie.json.zip")
+        assert Dataset(name="movie", dir_root=tmp_path).data_format == "json"
+        (tmp_path / "movie-data.jsonl").write_text("")
+        assert Dataset(name="movie", dir_root=tmp_path).data_format == "jsonl"
+        (tmp_path / "movie-data.json").write_text("[]")
+        assert Dataset(name="movie", dir_root=tmp_path).data_format == "json"
+
+        # explicit setting wins
+        self.write_setting(tmp_path, data_format="jsonl")
+        assert Dataset(name="movie", dir_root=tmp_path).data_format == "jsonl"
+
+    def test_build_index_from_jsonl(self, tmp_path):
+        self.write_setting(tmp_path)
+        records = json.loads((dir_movie / "movie-data.json").read_text())
+        lines = [json.dumps(record) for record in records]
+        (tmp_path / "movie-data.jsonl").write_text("\n".join(lines) + "\n")
+
+        ds = Dataset(name="movie", dir_root=tmp_path)
+        assert ds.get_data() == records
+        assert list(ds.iter_data()) == records
+        assert ds.build_index() == 9
+        assert ds.search("god father")[0]["movie_id"] == 2
+
+    def test_save_jsonl_zip(self, tmp_path):
+        self.write_setting(tmp_path, data_format="jsonl")
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr("readme.json", b"{}")
+            zf.writestr("movies.jsonl", b'{"id": 1}\n{"id": 2}\n')
+        ds = Dataset(name="movie", dir_root=tmp_path)
+        ds._save_data(buf.getvalue(), is_zip=True)
+        assert ds.get_data() == [{"id": 1}, {"id": 2}]
+
+
+class TestUpdateIndex:
+    def setup_dataset(self, dir_root, primary_key="movie_id") -> Dataset:
+        setting = json.loads((dir_movie / "movie-setting.json").read_text())
+        setting.pop("data_url")
+        setting["fields"][0] = {"type": "numeric", "name": "movie_id", "indexed": True}
+        setting["primary_key"] = primary_key
+        (dir_root / "movie-setting.json").write_text(json.dumps(setting))
+        (dir_root / "movie-data.json").write_bytes((dir_movie / "movie-data.json").read_bytes())
+        return Dataset(name="movie", dir_root=dir_root)
+
+    def num_docs(self, ds: Dataset) -> int:
+        return ds.get_index_reader()._index.searcher().num_docs
+
+    def test_update_index(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        records = json.loads((dir_movie / "movie-data.json").read_text())
+
+        # no record hashes yet
+        result = ds.update_index(data=records)
+        assert result.full_rebuild is True
+        assert result.added == 9
+        assert (ds.dir_generation / HASHES_FILENAME).exists()
+
+        generation = read_generation(ds.dir_index)
+        result = ds.update_index(data=records)
+        assert (result.full_rebuild, result.unchanged, result.changed) == (False, 9, 0)
+        assert read_generation(ds.dir_index) == generation
+
+        records[0] = {**records[0], "title": "Shawshank Reloaded"}  # movie_id 1
+        deleted = records.pop(1)  # movie_id 2, The Godfather
+        records.append({**deleted, "movie_id": 100, "title": "The Grandfather"})
+        result = ds.update_index(data=records)
+        assert (result.added, result.updated, result.deleted, result.unchanged) == (1, 1, 1, 7)
+        assert read_generation(ds.dir_index) != generation
+        assert self.num_docs(ds) == 9
+        assert [doc["movie_id"] for doc in ds.search("reloaded")] == [1]
+        assert [doc["movie_id"] for doc in ds.search("grandfather")] == [100]
+        assert 2 not in [doc["movie_id"] for doc in ds.search("godfather")]
+
+        # a full rebuild from the data file starts over
+        assert ds.build_index() == 9
+        result = ds.update_index(data=records)
+        assert (result.added, result.updated, result.deleted) == (1, 1, 1)
+        assert self.num_docs(ds) == 9
+
+    def test_string_primary_key(self, tmp_path):
+        ds = self.setup_dataset(tmp_path, primary_key="url")
+        records = json.loads((dir_movie / "movie-data.json").read_text())
+        ds.build_index(data=records)
+        result = ds.update_index(data=records[1:])
+        assert (result.deleted, result.unchanged) == (1, 8)
+        assert self.num_docs(ds) == 8
+
+    def test_invalid_data_is_not_applied(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        records = json.loads((dir_movie / "movie-data.json").read_text())
+        ds.build_index(data=records)
+        generation = read_generation(ds.dir_index)
+        with pytest.raises(ValueError, match="duplicate"):
+            ds.update_index(data=[{**records[0], "title": "x"}, records[0]])
+        with pytest.raises(ValueError, match="must be a int"):
+            ds.update_index(data=[{**records[0], "movie_id": "1"}])
+        assert read_generation(ds.dir_index) == generation
+        assert self.num_docs(ds) == 9
+        assert ds.update_index(data=records).unchanged == 9
+
+    def test_without_primary_key(self, tmp_path):
+        ds = self.setup_dataset(tmp_path, primary_key=None)
+        assert ds.update_index().full_rebuild is True
+        assert ds.update_index().full_rebuild is True
+        assert not (ds.dir_generation / HASHES_FILENAME).exists()
+
+
+class TestPrerenderDisplay:
+    def setup_dataset(self, dir_root, **changes) -> Dataset:
+        setting = json.loads((dir_movie / "movie-setting.json").read_text())
+        setting.pop("data_url")
+        setting["fields"][0] = {"type": "numeric", "name": "movie_id", "indexed": True}
+        # only rendered, never returned by a search
+        setting["fields"][2]["stored"] = False
+        setting["fields"][3]["stored"] = False
+        setting["primary_key"] = "movie_id"
+        setting["prerender_display"] = True
+        setting.update(changes)
+        (dir_root / "movie-setting.json").write_text(json.dumps(setting))
+        (dir_root / "movie-data.json").write_bytes((dir_movie / "movie-data.json").read_bytes())
+        return Dataset(name="movie", dir_root=dir_root)
+
+    def test_build_and_update(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        ds.build_index()
+        assert (ds.dir_generation / DISPLAY_TABLE_FILENAME).exists()
+        docs = ds.search("godfather")
+        assert "genres" not in docs[0]
+        row = ds.get_display_rows(docs)[0]
+        assert row.title == "The Godfather (Crime, Drama) rate 9.2"
+        assert row.subtitle.startswith("The aging patriarch")
+        assert row.arg == "https://www.imdb.com/title/tt0068646"
+
+        records = json.loads((dir_movie / "movie-data.json").read_text())
+        records[1] = {**records[1], "genres": "Crime"}  # movie_id 2, The Godfather
+        records.append({**records[0], "movie_id": 100, "title": "Shawshank Reloaded"})
+        deleted = records.pop(0)
+        result = ds.update_index(data=records)
+        assert (result.added, result.updated, result.deleted) == (1, 1, 1)
+        rows = display_table.lookup(
+            ds.dir_generation / DISPLAY_TABLE_FILENAME,
+            ds.setting,
+            [1, 2, 100],
+        )
+        assert sorted(rows) == [2, 100]
+        assert rows[2].title == "The Godfather (Crime) rate 9.2"
+        assert rows[100].title.startswith("Shawshank Reloaded")
+        assert deleted["movie_id"] not in [doc["movie_id"] for doc in ds.search("*")]
+
+    def test_template_change(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        ds.build_index()
+        generation = read_generation(ds.dir_index)
+
+        ds = self.setup_dataset(tmp_path, title_field="{title} [{genres}]")
+        docs = ds.search("godfather")
+        assert ds.get_display_rows(docs)[0].title == "The Godfather [Crime, Drama]"
+        # the display table was rendered again, the index was not rebuilt
+        assert read_generation(ds.dir_index) == generation
+        assert ds.render_display_table() == 0
+
+    def test_missing_row_falls_back_to_stored_fields(self, tmp_path):
+        ds = self.setup_dataset(tmp_path, title_field="{title}")
+        ds.build_index()
+        doc = {"movie_id": 999, "title": "Unknown", "description": "d", "url": "u"}
+        assert ds.get_display_rows([doc])[0].title == "Unknown"
+        # the subtitle references a field that is not stored
+        assert ds.get_display_rows([{"movie_id": 999}])[0].title == "999"
+
+
+class TestIndexGeneration:
+    def setup_dataset(self, dir_root) -> Dataset:
+        for path in dir_movie.glob("movie-*.json"):
+            (dir_root / path.name).write_bytes(path.read_bytes())
+        return Dataset(name="movie", dir_root=dir_root)
+
+    def test_search_during_rebuild(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        assert ds.has_index() is False
+        assert ds.ensure_index() is True
+        assert ds.ensure_index() is False
+        generation = read_generation(ds.dir_index)
+
+        seen = []
+
+        def iter_records():
+            # another process searches while the new generation is being built
+            other = Dataset(name="movie", dir_root=tmp_path)
+            seen.append([doc["movie_id"] for doc in other.search("god father")][:1])
+            assert read_generation(ds.dir_index) == generation
+            yield {"movie_id": 100, "title": "Zulu", "description": "", "genres": "War", "rating": 7.0, "url": "u"}
+
+        assert ds.build_index(data=iter_records()) == 1
+        assert seen == [[2]]
+        assert read_generation(ds.dir_index) != generation
+        assert [doc["movie_id"] for doc in ds.search("zulu")] == [100]
+        # the superseded generation is gone
+        assert sorted(p.name for p in ds.dir_index.iterdir()) == sorted(
+            ["build.lock", "current", read_generation(ds.dir_index)]
+        )
+
+    def test_ensure_index_non_blocking(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        with get_build_lock(ds.dir_index):
+            with pytest.raises(IndexBuildInProgressError):
+                ds.ensure_index(blocking=False)
+        assert ds.ensure_index(blocking=False) is True
+        assert ds.ensure_index(blocking=False) is False
+
+    def test_failed_build_keeps_index(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        ds.build_index()
+        generation = read_generation(ds.dir_index)
+
+        def iter_records():
+            yield {"movie_id": 100, "title": "Zulu"}
+            raise ValueError("broken data")
+
+        with pytest.raises(ValueError):
+            ds.build_index(data=iter_records())
+        assert read_generation(ds.dir_index) == generation
+        assert ds.search("god father")[0]["movie_id"] == 2
+
+        # whatever the failed build left behind goes with the next publish
+        ds.build_index()
+        assert len(list(ds.dir_index.glob("gen-*"))) == 1
+
+    def test_needs_refresh(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        assert ds.needs_refresh() is False  # nothing built yet
+        ds.build_index()
+        assert ds.needs_refresh() is False
+        info = ds.get_build_info()
+        assert info.data_sha256 is not None
+
+        # touched, same content: no new generation
+        generation = read_generation(ds.dir_index)
+        os.utime(ds.path_data, ns=(0, 0))
+        assert ds.needs_refresh() is True
+        assert ds.refresh().changed == 0
+        assert read_generation(ds.dir_index) == generation
+        assert ds.needs_refresh() is False
+
+        records = json.loads(ds.path_data.read_text())
+        records[0]["title"] = "Shawshank Reloaded"
+        ds.path_data.write_text(json.dumps(records))
+        assert ds.needs_refresh() is True
+        assert ds.refresh().full_rebuild is True
+        assert read_generation(ds.dir_index) != generation
+        assert ds.needs_refresh() is False
+        assert [doc["movie_id"] for doc in ds.search("reloaded")] == [1]
+
+        # another build is running
+        with get_build_lock(ds.dir_index):
+            assert ds.refresh() is None
+
+    def test_refresh_interval(self, tmp_path, monkeypatch):
+        ds = self.setup_dataset(tmp_path)
+        setting = json.loads(ds.path_setting.read_text())
+        setting["refresh_interval"] = 3600
+        ds.path_setting.write_text(json.dumps(setting))
+        downloads = []
+        monkeypatch.setattr(Dataset, "download_data", lambda self: downloads.append(1))
+
+        ds.build_index()
+        assert ds.needs_refresh() is False
+        info = ds.get_build_info()
+        info.refreshed_at -= 3600
+        info.dump(ds.dir_generation)
+        assert ds.needs_refresh() is True
+        assert ds.refresh().changed == 0
+        assert downloads == [1]
+        assert ds.needs_refresh() is False
+
+    def test_leased_generation_survives(self, tmp_path):
+        ds = self.setup_dataset(tmp_path)
+        ds.build_index()
+        reader = ds.get_index_reader()
+        ds.build_index()
+        assert reader.is_stale() is True
+        assert reader.dir_index.exists()
+        assert reader.search("god father")[0].source["movie_id"] == 2
+        reader.close()
+
+        ds.build_index()
+        assert not reader.dir_index.exists()
+
+
 class TestDatasetIndexing:
     def test_search(self):
         ds = make_dataset()
-        ds.build_index(data=ds.get_data(), rebuild=True)
+        ds.build_index(data=ds.get_data())
 
         # cache hit: same result on repeated calls
         for _ in range(3):
@@ -89,6 +544,114 @@ class TestDatasetIndexing:
         assert ratings[1] == 9.2
         assert ratings[2] == 9.0
 
+    def test_build_index_rebuild_is_deprecated(self, tmp_path):
+        ds = Dataset(name="movie", dir_root=tmp_path)
+        for path in dir_movie.glob("movie-*.json"):
+            (tmp_path / path.name).write_bytes(path.read_bytes())
+        ds.build_index()
+        generation = read_generation(ds.dir_index)
+
+        # rebuild=False still builds a new generation
+        with pytest.warns(DeprecationWarning, match="rebuild"):
+            assert ds.build_index(rebuild=False) == 9
+        assert read_generation(ds.dir_index) != generation
+
+    def test_keep_index_open(self, tmp_path):
+        ds = Dataset(name="movie", dir_root=tmp_path, keep_index_open=True)
+        for path in dir_movie.glob("movie-*.json"):
+            (tmp_path / path.name).write_bytes(path.read_bytes())
+        ds.build_index(data=ds.get_data())
+
+        assert ds.search("god father")[0]["movie_id"] == 2
+        reader = ds._reader
+        assert reader is not None and reader.is_stale() is False
+
+        # reader is reused while the index is unchanged
+        ds.search("drama")
+        assert ds._reader is reader
+
+        # a rebuild makes the reader stale; the next search reopens it
+        ds.build_index(data=[{"movie_id": 100, "title": "Zulu", "description": "", "genres": "War", "rating": 7.0, "url": "u"}])
+        assert reader.is_stale() is True
+        assert [doc["movie_id"] for doc in ds.search("zulu")] == [100]
+        assert ds._reader is not reader
+
+        ds.close()
+        assert ds._reader is None
+
+    @pytest.mark.parametrize("max_workers", [None, 4])
+    def test_search_many(self, tmp_path, max_workers):
+        for path in dir_movie.glob("movie-*.json"):
+            (tmp_path / path.name).write_bytes(path.read_bytes())
+        ds = Dataset(name="movie", dir_root=tmp_path)
+        assert ds.search_many([]) == []
+
+        # builds the index first
+        queries = ["god father", "drama", "dark knight"] * 10
+        results = ds.search_many(queries, limit=3, max_workers=max_workers)
+        assert results == [ds.search(query, limit=3) for query in queries]
+
+        # an invalid query
+        with pytest.raises(ValueError):
+            ds.search_many(["god", "title:("], max_workers=max_workers)
+        results = ds.search_many(
+            ["god", "title:("],
+            max_workers=max_workers,
+            return_exceptions=True,
+        )
+        assert results[0][0]["movie_id"] == 2
+        assert isinstance(results[1], ValueError)
+
+    def test_search_incremental(self, tmp_path):
+        setting = json.loads((dir_movie / "movie-setting.json").read_text())
+        setting["incremental_search"] = True
+        (tmp_path / "movie-setting.json").write_text(json.dumps(setting))
+        (tmp_path / "movie-data.json").write_bytes((dir_movie / "movie-data.json").read_bytes())
+        dir_cache = tmp_path / "cache"
+        ds = Dataset(name="movie", dir_root=tmp_path, dir_cache=dir_cache)
+        ds.build_index()
+
+        def search_fresh(query):
+            # a new process: no candidates in memory or on disk
+            return Dataset(name="movie", dir_root=tmp_path).search(query, limit=100)
+
+        for query in ["th", "the", "the ", "the d", "the da", "the dark", "god", "godf"]:
+            assert ds.search(query, limit=100) == search_fresh(query)
+        # the candidates were refined, and persisted for the next process
+        assert ds._candidates.query == "godf"
+        assert Dataset(name="movie", dir_root=tmp_path, dir_cache=dir_cache).search("godfa")[0]["movie_id"] == 2
+
+        assert [doc["movie_id"] for doc in ds.search("the dark")] == [3]
+        # every word must match, unlike the normal OR semantics
+        assert ds.search("godfather dark") == []
+
+        # queries with tantivy syntax are searched normally
+        assert ds.search("*", limit=100) == search_fresh("*")
+        assert len(ds.search("*", limit=100)) == 9
+
+        # a rebuild invalidates the candidates
+        ds.build_index(data=[{"movie_id": 100, "title": "The Dark Knight Rises", "description": "", "genres": "Action", "rating": 7.0, "url": "u"}])
+        assert [doc["movie_id"] for doc in ds.search("the dark")] == [100]
+
+    def test_search_incremental_unsorted(self, tmp_path):
+        setting = json.loads((dir_movie / "movie-setting.json").read_text())
+        setting["incremental_search"] = True
+        setting.pop("sort")
+        (tmp_path / "movie-setting.json").write_text(json.dumps(setting))
+        (tmp_path / "movie-data.json").write_bytes((dir_movie / "movie-data.json").read_bytes())
+        ds = Dataset(name="movie", dir_root=tmp_path, dir_cache=tmp_path / "cache")
+        ds.build_index()
+
+        def search_fresh(query):
+            return Dataset(name="movie", dir_root=tmp_path).search(query, limit=100)
+
+        # ranked by relevance to each query, never by an earlier one
+        for query in ["th", "the", "the d", "the dark", "god", "godf"]:
+            assert ds.search(query, limit=100) == search_fresh(query)
+            assert ds._candidates is None
+        assert not ds.path_candidates.exists()
+        assert ds.search("godfather dark") == []
+
 
 if __name__ == "__main__":
     from afwf_fts_anything.tests import run_cov_test
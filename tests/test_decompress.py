@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import bz2
+import gzip
+import lzma
+import zipfile
+
+import pytest
+
+from afwf_fts_anything.decompress import (
+    CompressionEnum,
+    detect_compression,
+    strip_compression_suffix,
+    decompress_file,
+)
+
+
+@pytest.mark.parametrize(
+    "url,compression,stripped",
+    [
+        ("https://host/data.json", None, "/data.json"),
+        ("https://host/data.json.zip", CompressionEnum.zip, "/data.json"),
+        ("https://host/data.jsonl.gz?token=x", CompressionEnum.gz, "/data.jsonl"),
+        ("https://host/data.json.bz2", CompressionEnum.bz2, "/data.json"),
+        ("https://host/data.ndjson.xz", CompressionEnum.xz, "/data.ndjson"),
+        ("https://host/data.json.zst#top", CompressionEnum.zst, "/data.json"),
+    ],
+)
+def test_detect_compression(url, compression, stripped):
+    assert detect_compression(url) is compression
+    assert strip_compression_suffix(url) == stripped
+
+
+RAW = b'[{"id": 1}, {"id": 2}]' * 10_000
+
+
+def compress(compression: CompressionEnum, path):
+    if compression is CompressionEnum.zip:
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("README.txt", b"not this one")
+            zf.writestr("data.json", RAW)
+    elif compression is CompressionEnum.gz:
+        path.write_bytes(gzip.compress(RAW))
+    elif compression is CompressionEnum.bz2:
+        path.write_bytes(bz2.compress(RAW))
+    elif compression is CompressionEnum.xz:
+        path.write_bytes(lzma.compress(RAW))
+    elif compression is CompressionEnum.zst:
+        zstandard = pytest.importorskip("zstandard")
+        path.write_bytes(zstandard.ZstdCompressor().compress(RAW))
+
+
+@pytest.mark.parametrize("compression", list(CompressionEnum))
+def test_decompress_file(tmp_path, compression):
+    path_src = tmp_path / f"data.json.{compression.value}"
+    compress(compression, path_src)
+    path_dst = tmp_path / "data.json"
+    decompress_file(path_src, path_dst, compression)
+    assert path_dst.read_bytes() == RAW
+
+
+def test_zip_without_data_file(tmp_path):
+    path_src = tmp_path / "data.zip"
+    with zipfile.ZipFile(path_src, "w") as zf:
+        zf.writestr("README.txt", b"nothing")
+    with pytest.raises(ValueError, match="no member ending with .json"):
+        decompress_file(path_src, tmp_path / "data.json", CompressionEnum.zip)
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.decompress",
+        preview=False,
+    )
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+from afwf_fts_anything.setting import Setting
+from afwf_fts_anything.index_update import hash_record
+from afwf_fts_anything.display_table import (
+    DisplayTable,
+    get_templates_hash,
+    write_table,
+    is_current,
+    lookup,
+    TableUpdate,
+)
+
+
+def make_setting(**kwargs) -> Setting:
+    return Setting.model_validate(
+        {
+            "fields": [
+                {"type": "keyword", "name": "id"},
+                {"type": "ngram", "name": "title"},
+                {"type": "stored", "name": "url", "stored": False},
+            ],
+            "arg_field": "{url}",
+            "primary_key": "id",
+            "prerender_display": True,
+            **kwargs,
+        }
+    )
+
+
+def make_records(n: int) -> list[dict]:
+    return [
+        {"id": f"r{i}", "title": f"Title {i}", "url": f"https://example.com/{i}"}
+        for i in range(n)
+    ]
+
+
+def test_templates_hash():
+    assert get_templates_hash(make_setting()) == get_templates_hash(make_setting())
+    assert get_templates_hash(make_setting()) != get_templates_hash(
+        make_setting(title_field="{title}!")
+    )
+
+
+def test_write_and_lookup(tmp_path):
+    setting = make_setting()
+    path = tmp_path / "display.sqlite"
+    assert lookup(path, setting, ["r1"]) is None
+    assert not path.exists()  # a lookup does not create the table
+
+    assert write_table(path, setting, make_records(2500)) == 2500
+    assert is_current(path, setting)
+    rows = lookup(path, setting, ["r1", "r2499", "missing"])
+    assert sorted(rows) == ["r1", "r2499"]
+    assert rows["r1"].title == "Title 1"
+    assert rows["r1"].arg == "https://example.com/1"
+    assert len(lookup(path, setting, [f"r{i}" for i in range(1200)])) == 1200
+
+    other = make_setting(title_field="{title}!")
+    assert not is_current(path, other)
+    assert lookup(path, other, ["r1"]) is None
+    write_table(path, other, make_records(3))
+    assert lookup(path, other, ["r1"])["r1"].title == "Title 1!"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_table_update(tmp_path):
+    setting = make_setting()
+    path_src = tmp_path / "old.sqlite"
+    records = make_records(5)
+    write_table(path_src, setting, records)
+    old_hashes = {r["id"]: hash_record(r) for r in records}
+
+    new_records = records[1:] + [{"id": "r9", "title": "New", "url": "u9"}]
+    new_records[0] = {**new_records[0], "title": "Changed"}  # r1
+    path_dst = tmp_path / "new.sqlite"
+    with TableUpdate(path_src, path_dst, setting, old_hashes) as update:
+        assert update.is_full is False
+        assert list(update.tee(new_records)) == new_records
+        assert update.writer._buffer == [new_records[0], new_records[-1]]
+        update.finish({r["id"]: hash_record(r) for r in new_records})
+    rows = lookup(path_dst, setting, ["r0", "r1", "r2", "r9"])
+    assert sorted(rows) == ["r1", "r2", "r9"]
+    assert rows["r1"].title == "Changed"
+
+    # other templates: every record is rendered
+    other = make_setting(title_field="{title}!")
+    path_dst = tmp_path / "other.sqlite"
+    with TableUpdate(path_src, path_dst, other, old_hashes) as update:
+        assert update.is_full is True
+        list(update.tee(new_records))
+        assert not is_current(path_dst, other)
+        update.finish({})
+    assert len(lookup(path_dst, other, [r["id"] for r in new_records])) == 5
+
+
+def test_display_table(tmp_path):
+    with DisplayTable(tmp_path / "t.sqlite") as table:
+        assert table.templates_hash is None
+        table.set_templates_hash("abc")
+        assert table.templates_hash == "abc"
+        table.set_templates_hash(None)
+        assert table.templates_hash is None
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.display_table",
+        preview=False,
+    )
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import os
+import urllib.error
+
+import pytest
+
+from afwf_fts_anything.download import DownloadInfo, fetch
+from afwf_fts_anything.tests.http_server import StaticServer
+
+
+class TestDownloadInfo:
+    def test_dump_load(self, tmp_path):
+        path = tmp_path / "download.json"
+        assert DownloadInfo.load(path) is None
+        path_data = tmp_path / "data.json"
+        path_data.write_text("[]")
+        st = path_data.stat()
+        info = DownloadInfo(
+            url="http://x/data.json",
+            etag='"abc"',
+            data_mtime_ns=st.st_mtime_ns,
+            data_size=st.st_size,
+        )
+        info.dump(path)
+        assert DownloadInfo.load(path) == info
+
+        assert info.is_valid_for("http://x/data.json", path_data) is True
+        assert info.is_valid_for("http://y/data.json", path_data) is False
+        path_data.write_text("[1]")  # edited by hand
+        assert info.is_valid_for("http://x/data.json", path_data) is False
+        path_data.unlink()
+        assert info.is_valid_for("http://x/data.json", path_data) is False
+
+
+class TestFetch:
+    @pytest.mark.parametrize("send_etag", [True, False])
+    def test_conditional(self, tmp_path, send_etag):
+        dir_www = tmp_path / "www"
+        dir_www.mkdir()
+        (dir_www / "data.json").write_bytes(b"[1, 2, 3]" * 100_000)
+        path = tmp_path / "data.json"
+
+        with StaticServer(dir_www, send_etag=send_etag) as server:
+            url = server.url("data.json")
+            info = fetch(url, path)
+            assert path.read_bytes() == (dir_www / "data.json").read_bytes()
+            assert (info.etag is not None) is send_etag
+            assert info.last_modified is not None
+
+            path.unlink()
+            assert fetch(url, path, etag=info.etag, last_modified=info.last_modified) is None
+            assert not path.exists()
+            assert server.not_modified == 1
+
+            (dir_www / "data.json").write_bytes(b"[4]")
+            os.utime(dir_www / "data.json", (0, 0))
+            new_info = fetch(url, path, etag=info.etag, last_modified=info.last_modified)
+            assert new_info is not None
+            assert path.read_bytes() == b"[4]"
+
+            with pytest.raises(urllib.error.HTTPError):
+                fetch(server.url("missing.json"), path)
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.download",
+        preview=False,
+    )
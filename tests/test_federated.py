@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+from sayt2.api import Hit, SortKey
+
+from afwf_fts_anything.federated import (
+    FederatedHit,
+    split_dataset_names,
+    is_federated,
+    normalize_hits,
+    merge_hits,
+)
+
+
+def test_split_dataset_names():
+    assert split_dataset_names("movie") == ["movie"]
+    assert split_dataset_names(" a, b,,a ") == ["a", "b"]
+    assert is_federated("a,b") is True
+    assert is_federated("movie") is False
+
+
+def test_normalize_hits():
+    hits = normalize_hits("a", [Hit(source={"id": 1}, score=4.0), Hit(source={"id": 2}, score=1.0)])
+    assert [(h.dataset, h.score, h.rank) for h in hits] == [("a", 1.0, 0), ("a", 0.25, 1)]
+    # all-documents queries score 0
+    hits = normalize_hits("a", [Hit(source={}, score=0.0)])
+    assert hits[0].score == 1.0
+    assert normalize_hits("a", []) == []
+
+
+def make(dataset, scores, **fields):
+    return normalize_hits(
+        dataset,
+        [Hit(source={"id": f"{dataset}{i}", **fields}, score=score) for i, score in enumerate(scores)],
+    )
+
+
+def ids(hits: list[FederatedHit]) -> list[str]:
+    return [hit.source["id"] for hit in hits]
+
+
+def test_merge_by_score():
+    a = make("a", [10.0, 5.0, 1.0])
+    b = make("b", [2.0, 1.9])
+    # b1 (0.95) beats a1 (0.5); equal top scores interleave in dataset order
+    assert ids(merge_hits([a, b], limit=10)) == ["a0", "b0", "b1", "a1", "a2"]
+    assert ids(merge_hits([a, b], limit=2)) == ["a0", "b0"]
+    assert merge_hits([], limit=10) == []
+
+
+def test_merge_by_sort_key():
+    a = normalize_hits("a", [Hit(source={"id": "a0", "rating": 7}, score=3.0), Hit(source={"id": "a1"}, score=2.0)])
+    b = normalize_hits("b", [Hit(source={"id": "b0", "rating": 9}, score=1.0), Hit(source={"id": "b1", "rating": 7}, score=0.5)])
+    sort = [SortKey(name="rating", descending=True)]
+    # missing values last; ties keep the score order
+    assert ids(merge_hits([a, b], limit=10, sort=sort)) == ["b0", "a0", "b1", "a1"]
+    sort = [SortKey(name="rating", descending=False)]
+    assert ids(merge_hits([a, b], limit=3, sort=sort)) == ["a0", "b1", "b0"]
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.federated",
+        preview=False,
+    )
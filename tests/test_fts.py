@@ -2,7 +2,14 @@
 
 import pytest
 
-from afwf_fts_anything.fts import fts, ActionEnum
+from afwf_fts_anything.fts import (
+    fts,
+    fts_script_filter,
+    ActionEnum,
+    FailedScriptFilter,
+    RERUN_INTERVAL,
+)
+from afwf_fts_anything.index_generation import get_build_lock
 from afwf_fts_anything.paths import path_enum
 
 # afwf_fts_anything/tests/data/ is the DataCatalog root; .../data/movie/ is the "movie" dataset root
@@ -99,6 +106,8 @@ class TestFtsErrorCases:
         assert "not found" in item.title
         assert item.variables.get("open_file") == "y"
         assert item.arg is not None and item.arg.endswith("ghost-setting.json")
+        sf = fts_script_filter(dataset_name="ghost", query="anything", dir_datacatalog_root=tmp_path)
+        assert isinstance(sf, FailedScriptFilter)
 
     def test_build_index_error_returns_error_item(self, tmp_path):
         # dataset dir exists with a valid setting (no data_url) but no data file;
@@ -122,6 +131,113 @@ class TestFtsErrorCases:
         assert item.arg is not None and item.arg.endswith("empty-setting.json")
 
 
+
+class TestFtsBuildInProgress:
+    def test_another_process_is_building(self, tmp_path):
+        import shutil
+
+        dataset_dir = tmp_path / "movie"
+        dataset_dir.mkdir()
+        for name in ["movie-setting.json", "movie-data.json"]:
+            shutil.copy(dir_tests / "movie" / name, dataset_dir / name)
+
+        # simulate the process that is building the index
+        with get_build_lock(dataset_dir / "movie-index"):
+            sf = fts_script_filter(dataset_name="movie", query="god", dir_datacatalog_root=tmp_path)
+            assert isinstance(sf, FailedScriptFilter)
+            assert sf.rerun == RERUN_INTERVAL
+            assert len(sf.items) == 1
+            assert "in progress" in sf.items[0].title
+            assert sf.items[0].valid is False
+
+        sf = fts_script_filter(dataset_name="movie", query="god father", dir_datacatalog_root=tmp_path)
+        assert not isinstance(sf, FailedScriptFilter)
+        assert sf.rerun is None
+        assert "Godfather" in sf.items[0].title
+
+
+class TestFtsFederated:
+    def setup_catalog(self, tmp_path):
+        import json
+        import shutil
+
+        for name in ("alpha", "beta"):
+            setting = json.loads((dir_tests / "movie" / "movie-setting.json").read_text())
+            setting.pop("data_url")
+            dir_dataset = tmp_path / name
+            dir_dataset.mkdir()
+            (dir_dataset / f"{name}-setting.json").write_text(json.dumps(setting))
+            shutil.copy(dir_tests / "movie" / "movie-data.json", dir_dataset / f"{name}-data.json")
+
+    def test_federated(self, tmp_path):
+        self.setup_catalog(tmp_path)
+        items = fts(dataset_name="alpha,beta", query="god father", dir_datacatalog_root=tmp_path)
+        assert "Godfather" in items[0].title
+        assert items[0].subtitle.startswith("[alpha] ")
+        assert items[1].subtitle.startswith("[beta] ")
+        assert items[0].variables["dataset"] == "alpha"
+        assert items[0].variables["open_url"] == "y"
+
+        sf = fts_script_filter(dataset_name="alpha,missing", query="god father", dir_datacatalog_root=tmp_path)
+        assert isinstance(sf, FailedScriptFilter)
+        assert sf.items[-1].title == "Search failed for dataset 'missing'"
+        assert sf.items[-1].valid is False
+
+        items = fts(dataset_name="alpha,beta", query="zzzzzz", dir_datacatalog_root=tmp_path)
+        assert len(items) == 1
+        assert "No result found" in items[0].title
+
+        items = fts(dataset_name="alpha,beta", query="?", dir_datacatalog_root=tmp_path)
+        assert [item.title for item in items] == [
+            "Open 'alpha' dataset folder location",
+            "Open 'beta' dataset folder location",
+        ]
+
+    def test_federated_build_in_progress(self, tmp_path):
+        self.setup_catalog(tmp_path)
+        # another process is building beta's first index
+        with get_build_lock(tmp_path / "beta" / "beta-index"):
+            sf = fts_script_filter(dataset_name="alpha,beta", query="god father", dir_datacatalog_root=tmp_path)
+        assert isinstance(sf, FailedScriptFilter)
+        assert sf.rerun == RERUN_INTERVAL
+        assert sf.items[0].subtitle.startswith("[alpha] ")
+        assert sf.items[-1].title == "Indexing dataset 'beta' in progress …"
+        assert all(not item.subtitle.startswith("[beta] ") for item in sf.items)
+
+        sf = fts_script_filter(dataset_name="alpha,beta", query="god father", dir_datacatalog_root=tmp_path)
+        assert sf.rerun is None
+        assert sf.items[1].subtitle.startswith("[beta] ")
+
+
+class TestFtsStaleIndex:
+    def test_refresh_in_background(self, tmp_path, monkeypatch):
+        import json
+        import shutil
+
+        from afwf_fts_anything import background
+
+        dataset_dir = tmp_path / "movie"
+        dataset_dir.mkdir()
+        for name in ["movie-setting.json", "movie-data.json"]:
+            shutil.copy(dir_tests / "movie" / name, dataset_dir / name)
+        spawned = []
+        monkeypatch.setattr(
+            background, "spawn_refresh", lambda dataset, path_log: spawned.append(dataset.name)
+        )
+
+        fts(dataset_name="movie", query="god", dir_datacatalog_root=tmp_path)
+        assert spawned == []
+
+        path_data = dataset_dir / "movie-data.json"
+        records = json.loads(path_data.read_text())
+        records[1]["title"] = "The Grandfather"
+        path_data.write_text(json.dumps(records))
+        # answered from the existing index, refresh requested
+        items = fts(dataset_name="movie", query="god father", dir_datacatalog_root=tmp_path)
+        assert "Godfather" in items[0].title
+        assert spawned == ["movie"]
+
+
 if __name__ == "__main__":
     from afwf_fts_anything.tests import run_cov_test
 
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from afwf_fts_anything.handle_pool import HandlePool
+from afwf_fts_anything.data_catalog import DataCatalog
+from afwf_fts_anything.paths import path_enum
+
+dir_movie = path_enum.dir_package_test_data_movie
+
+
+def is_open(reader) -> bool:
+    return reader.lease._lock.locked
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    for name in ["movie", "film"]:
+        dir_dataset = tmp_path / name
+        dir_dataset.mkdir()
+        shutil.copy(dir_movie / "movie-setting.json", dir_dataset / f"{name}-setting.json")
+        shutil.copy(dir_movie / "movie-data.json", dir_dataset / f"{name}-data.json")
+    with DataCatalog(dir_root=tmp_path, handle_pool=HandlePool()) as catalog:
+        yield catalog
+
+
+def test_bad_max_open():
+    with pytest.raises(ValueError):
+        HandlePool(max_open=0)
+
+
+def test_no_index(catalog):
+    ds = catalog.get_dataset("movie")
+    with pytest.raises(FileNotFoundError):
+        with catalog.handle_pool.reader(ds):
+            pass
+    assert len(catalog.handle_pool) == 0
+
+
+def test_reuse(catalog):
+    pool = catalog.handle_pool
+    docs = catalog.get_dataset("movie").search("God Father")  # builds the index
+    assert docs[0]["movie_id"] == 2
+    assert len(pool) == 1
+    assert pool.open_bytes > 0
+
+    with pool.reader(catalog.get_dataset("movie")) as reader_1:
+        pass
+    catalog.get_dataset("movie").search("Dark Knight")
+    with pool.reader(catalog.get_dataset("movie")) as reader_2:
+        assert reader_2 is reader_1
+    assert is_open(reader_1)
+
+    catalog.close()
+    assert len(pool) == 0
+    assert not is_open(reader_1)
+
+
+def test_reopen_after_build(catalog):
+    pool = catalog.handle_pool
+    ds = catalog.get_dataset("movie")
+    ds.search("God Father")
+    with pool.reader(ds) as old:
+        dir_old = old.lease.dir_generation
+
+    ds.build_index()
+    # discarded at publish, so the old generation was collected right away
+    assert not is_open(old)
+    assert not dir_old.exists()
+    with pool.reader(ds) as new:
+        assert new is not old
+        assert new.lease.dir_generation == ds.dir_generation
+
+    # published by another process: noticed on the next use
+    other = DataCatalog(dir_root=catalog.dir_root).get_dataset("movie")
+    other.build_index()
+    with pool.reader(ds) as newer:
+        assert newer is not new
+    assert not is_open(new)
+
+
+def test_reopen_after_setting_change(catalog):
+    pool = catalog.handle_pool
+    ds = catalog.get_dataset("movie")
+    ds.search("God Father")
+    with pool.reader(ds) as old:
+        pass
+
+    path_setting = ds.path_setting
+    setting = json.loads(path_setting.read_text())
+    setting["sort"] = [{"name": "rating", "descending": False}]
+    path_setting.write_text(json.dumps(setting))
+    ds = catalog.get_dataset("movie")
+    with pool.reader(ds) as new:
+        assert new is not old
+        assert new.sort == ds.setting.sort
+    assert not is_open(old)
+
+
+def test_evict_least_recently_used(catalog):
+    catalog.handle_pool = pool = HandlePool(max_open=1)
+    movie, film = catalog.get_dataset("movie"), catalog.get_dataset("film")
+    movie.search("God Father")
+    with pool.reader(movie) as reader_movie:
+        # still in use: evicted from the pool, but not closed yet
+        film.search("God Father")
+        assert len(pool) == 1
+        assert is_open(reader_movie)
+        assert reader_movie.search("God Father")[0].source["movie_id"] == 2
+    assert not is_open(reader_movie)
+
+    # by size: the most recently used reader is always kept
+    catalog.handle_pool = pool = HandlePool(max_bytes=1)
+    movie = catalog.get_dataset("movie")
+    movie.search("God Father")
+    catalog.get_dataset("film").search("God Father")
+    assert len(pool) == 1
+    with pool.reader(movie) as reader:
+        assert reader.lease.dir_generation.parent == movie.dir_index
+    pool.close()
+
+
+def test_threads(catalog):
+    catalog.get_dataset("movie").build_index()
+    catalog.get_dataset("film").build_index()
+
+    def search(i: int) -> int:
+        name = ["movie", "film"][i % 2]
+        return catalog.get_dataset(name).search("God Father")[0]["movie_id"]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert set(executor.map(search, range(64))) == {2}
+    assert len(catalog.handle_pool) == 2
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(__file__, "afwf_fts_anything.handle_pool", preview=False)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from sayt2.api import SortKey
+
+from afwf_fts_anything.incremental import (
+    parse_terms,
+    make_haystack,
+    sort_docs,
+    CandidateSet,
+    get_path_candidates,
+    load_candidates,
+    dump_candidates,
+)
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("God Father", ["god", "father"]),
+        ("  matrix ", ["matrix"]),
+        ("", None),
+        ("*", None),
+        ("m", None),  # shorter than min_gram
+        ("god f", None),
+        ("title:god", None),
+        ("god AND father", None),
+        ("schindler's", None),
+    ],
+)
+def test_parse_terms(query, expected):
+    assert parse_terms(query, min_gram=2) == expected
+
+
+def test_sort_docs():
+    docs = [
+        {"id": 1, "year": 2000, "rating": 8.0},
+        {"id": 2, "year": 2001, "rating": 9.0},
+        {"id": 3, "rating": 9.0},
+        {"id": 4, "year": 1999, "rating": 9.0},
+    ]
+    assert sort_docs(docs, None) is docs
+    sort = [SortKey(name="rating"), SortKey(name="year", descending=False)]
+    assert [doc["id"] for doc in sort_docs(docs, sort)] == [3, 4, 2, 1]
+
+
+class TestCandidateSet:
+    docs = [
+        {"id": 1, "title": "The Matrix", "genres": "Sci-Fi"},
+        {"id": 2, "title": "The Matrix Reloaded", "genres": "Sci-Fi"},
+        {"id": 3, "title": "Mad Max", "genres": "Action"},
+    ]
+
+    def make(self, query: str) -> CandidateSet:
+        return CandidateSet.from_docs(
+            query=query,
+            stamp="s1",
+            docs=self.docs,
+            terms=parse_terms(query, 2),
+            field_names=["title"],
+        )
+
+    def test_from_docs(self):
+        assert make_haystack(self.docs[0], ["title", "genres"]) == "the matrix\nsci-fi"
+        candidates = self.make("ma")
+        assert [doc["id"] for doc in candidates.docs] == [1, 2, 3]
+        assert candidates.haystacks == ["the matrix", "the matrix reloaded", "mad max"]
+
+    def test_refine(self):
+        candidates = self.make("ma")
+        assert candidates.can_refine("ma", "s1")
+        assert candidates.refine("ma", ["ma"]) is candidates
+        assert candidates.can_refine("matr", "s1")
+        assert not candidates.can_refine("matr", "s2")  # index was rebuilt
+        assert not candidates.can_refine("m", "s1")  # not an extension
+
+        refined = candidates.refine("matr", parse_terms("matr", 2))
+        assert [doc["id"] for doc in refined.docs] == [1, 2]
+        refined = refined.refine("matr rel", parse_terms("matr rel", 2))
+        assert [doc["id"] for doc in refined.docs] == [2]
+        # same result as computing the candidates from scratch
+        assert refined.docs == self.make("matr rel").docs
+
+    def test_persist(self, tmp_path):
+        path = get_path_candidates(tmp_path / "cache", tmp_path / "movie-index")
+        assert load_candidates(path) is None
+        candidates = self.make("ma")
+        dump_candidates(path, candidates)
+        assert load_candidates(path) == candidates
+        path.write_bytes(b"garbage")
+        assert load_candidates(path) is None
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.incremental",
+        preview=False,
+    )
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from afwf_fts_anything import index_generation
+from afwf_fts_anything.locks import FileLock
+from afwf_fts_anything.index_generation import (
+    CURRENT_LINK,
+    LEASE_FILENAME,
+    read_generation,
+    get_current_dir,
+    create_generation,
+    link_tree,
+    publish,
+    collect_garbage,
+    lease_generation,
+)
+
+
+def test_publish(tmp_path):
+    dir_index = tmp_path / "movie-index"
+    assert read_generation(dir_index) is None
+    assert get_current_dir(dir_index) is None
+    assert lease_generation(dir_index) is None
+
+    dir_gen1 = create_generation(dir_index)
+    assert (dir_gen1 / LEASE_FILENAME).exists()
+    assert read_generation(dir_index) is None  # not published yet
+    publish(dir_index, dir_gen1)
+    assert read_generation(dir_index) == dir_gen1.name
+    assert get_current_dir(dir_index) == dir_gen1
+
+    dir_gen2 = create_generation(dir_index)
+    publish(dir_index, dir_gen2)
+    assert read_generation(dir_index) == dir_gen2.name
+    if index_generation.USE_SYMLINK:
+        assert os.readlink(dir_index / CURRENT_LINK) == dir_gen2.name
+
+
+def test_publish_pointer_file(tmp_path, monkeypatch):
+    # the Windows layout
+    monkeypatch.setattr(index_generation, "USE_SYMLINK", False)
+    dir_index = tmp_path / "movie-index"
+    assert read_generation(dir_index) is None
+    dir_gen1 = create_generation(dir_index)
+    publish(dir_index, dir_gen1)
+    dir_gen2 = create_generation(dir_index)
+    publish(dir_index, dir_gen2)
+    path_link = dir_index / CURRENT_LINK
+    assert not path_link.is_symlink()
+    assert path_link.read_text() == dir_gen2.name
+    assert read_generation(dir_index) == dir_gen2.name
+    with lease_generation(dir_index) as lease:
+        assert lease.is_current()
+    assert collect_garbage(dir_index) == [dir_gen1.name]
+
+
+def test_collect_garbage(tmp_path):
+    dir_index = tmp_path / "movie-index"
+    dir_gen1 = create_generation(dir_index)
+    publish(dir_index, dir_gen1)
+    lease = lease_generation(dir_index)
+    assert lease.dir_generation == dir_gen1
+
+    dir_gen2 = create_generation(dir_index)
+    publish(dir_index, dir_gen2)
+    (dir_index / "generation").write_text("left by an older release")
+
+    # the leased generation survives
+    assert collect_garbage(dir_index) == ["generation"]
+    assert dir_gen1.exists()
+
+    lease.release()
+    assert collect_garbage(dir_index) == [dir_gen1.name]
+    assert not dir_gen1.exists()
+    assert dir_gen2.exists()
+    assert collect_garbage(dir_index) == []
+
+
+def test_lease_skips_generation_being_removed(tmp_path):
+    dir_index = tmp_path / "movie-index"
+    dir_gen1 = create_generation(dir_index)
+    publish(dir_index, dir_gen1)
+    # simulate collect_garbage holding the generation
+    lock = FileLock(dir_gen1 / LEASE_FILENAME)
+    lock.acquire()
+    dir_gen2 = create_generation(dir_index)
+    publish(dir_index, dir_gen2)
+    with lease_generation(dir_index) as lease:
+        assert lease.generation == dir_gen2.name
+    lock.release()
+
+
+def test_link_tree(tmp_path):
+    dir_src = tmp_path / "src"
+    (dir_src / "sub").mkdir(parents=True)
+    (dir_src / "meta.json").write_text("{}")
+    (dir_src / "sub" / "a.idx").write_text("a")
+    (dir_src / ".tantivy-writer.lock").write_text("")
+    dir_dst = tmp_path / "dst"
+    link_tree(dir_src, dir_dst)
+    assert (dir_dst / "meta.json").stat().st_ino == (dir_src / "meta.json").stat().st_ino
+    assert (dir_dst / "sub" / "a.idx").read_text() == "a"
+    assert not (dir_dst / ".tantivy-writer.lock").exists()
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.index_generation",
+        preview=False,
+    )
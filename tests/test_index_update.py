@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from afwf_fts_anything.index_update import (
+    UpdateResult,
+    hash_record,
+    iter_hashed,
+    load_hashes,
+    dump_hashes,
+)
+
+
+def test_hash_record():
+    assert hash_record({"a": 1, "b": "x"}) == hash_record({"b": "x", "a": 1})
+    assert hash_record({"a": 1}) != hash_record({"a": 2})
+    assert len(hash_record({})) == 16
+
+
+def test_iter_hashed():
+    records = [{"id": "a", "v": 1}, {"id": "b", "v": 2}]
+    hashes = {}
+    assert list(iter_hashed(records, "id", str, hashes)) == records
+    assert hashes == {"a": hash_record(records[0]), "b": hash_record(records[1])}
+
+    with pytest.raises(ValueError, match="duplicate"):
+        list(iter_hashed(records + records[:1], "id", str, {}))
+    with pytest.raises(ValueError, match="must be a str"):
+        list(iter_hashed([{"id": 1}], "id", str, {}))
+    with pytest.raises(ValueError, match="no primary key"):
+        list(iter_hashed([{"v": 1}], "id", str, {}))
+
+
+def test_load_dump_hashes(tmp_path):
+    path = tmp_path / "index" / "record-hashes.pickle"
+    assert load_hashes(path, "schema", "id") is None
+
+    hashes = {"a": b"1", "b": b"2"}
+    dump_hashes(path, "schema", "id", hashes)
+    assert load_hashes(path, "schema", "id") == hashes
+    assert load_hashes(path, "other-schema", "id") is None
+    assert load_hashes(path, "schema", "other-key") is None
+
+    path.write_bytes(b"garbage")
+    assert load_hashes(path, "schema", "id") is None
+
+
+def test_update_result():
+    result = UpdateResult(added=1, updated=2, deleted=3, unchanged=4)
+    assert result.changed == 6
+    assert str(result) == "1 added, 2 updated, 3 deleted, 4 unchanged"
+    assert str(UpdateResult(added=9, full_rebuild=True)) == "full rebuild: 9 indexed"
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.index_update",
+        preview=False,
+    )
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import io
+import gzip
+import json
+
+import pytest
+
+from afwf_fts_anything.json_stream import (
+    iter_json_array,
+    iter_json_array_file,
+    iter_json_lines,
+    iter_json_lines_file,
+)
+from afwf_fts_anything.decompress import CompressionEnum
+
+records = [
+    {"id": 1, "title": "The Godfather", "rating": 9.2, "tags": ["crime", "drama"]},
+    {"id": 2, "title": 'quote " and bracket ] and comma ,', "rating": -2.5e10},
+    {"id": 3, "title": "unicode 漢字 é", "rating": None, "nested": {"a": [1, {"b": True}]}},
+    123456789,
+    1.5,
+    "string",
+    [],
+    {},
+]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 1024 * 1024])
+def test_iter_json_array(indent, chunk_size):
+    text = json.dumps(records, ensure_ascii=False, indent=indent)
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == records
+
+
+def test_empty_array():
+    assert list(iter_json_array(io.StringIO(" [ ] \n"), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["", "{}", "[1,]", "[1 2]", "[1]x", "[1", "[", "[{]", "[1x]", "[1.]"],
+)
+@pytest.mark.parametrize("chunk_size", [1, 4, 100])
+def test_invalid(text, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+
+
+def test_iter_json_array_file(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+    assert list(iter_json_array_file(path, chunk_size=16)) == records
+
+
+def test_iter_json_array_file_compressed(tmp_path):
+    path = tmp_path / "data.json.gz"
+    path.write_bytes(gzip.compress(json.dumps(records, ensure_ascii=False).encode("utf-8")))
+    result = iter_json_array_file(path, chunk_size=16, compression=CompressionEnum.gz)
+    assert list(result) == records
+
+
+class TestJsonLines:
+    def write(self, path):
+        lines = [json.dumps(record, ensure_ascii=False) for record in records]
+        lines.insert(2, "   ")  # blank lines are skipped
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def test_iter_json_lines(self):
+        text = "\n".join(json.dumps(record) for record in records)
+        assert list(iter_json_lines(io.StringIO(text))) == records
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_iter_json_lines_file(self, tmp_path, workers):
+        path = tmp_path / "data.jsonl"
+        self.write(path)
+        result = iter_json_lines_file(path, workers=workers, block_size=64)
+        assert list(result) == records
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_iter_json_lines_file_compressed(self, tmp_path, workers):
+        path = tmp_path / "data.jsonl"
+        self.write(path)
+        path_gz = tmp_path / "data.jsonl.gz"
+        path_gz.write_bytes(gzip.compress(path.read_bytes()))
+        result = iter_json_lines_file(
+            path_gz,
+            workers=workers,
+            block_size=64,
+            compression=CompressionEnum.gz,
+        )
+        assert list(result) == records
+
+    @pytest.mark.parametrize("workers", [0, 2])
+    def test_invalid_line(self, tmp_path, workers):
+        path = tmp_path / "data.jsonl"
+        path.write_text('{"id": 1}\n\n{"id": \n', encoding="utf-8")
+        with pytest.raises(ValueError, match="line 3"):
+            list(iter_json_lines_file(path, workers=workers, block_size=4))
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.json_stream",
+        preview=False,
+    )
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from afwf_fts_anything.locks import FileLock
+
+
+def test_exclusive(tmp_path):
+    path = tmp_path / "x.lock"
+    with FileLock(path) as lock:
+        assert lock.locked is True
+        other = FileLock(path)
+        assert other.acquire(blocking=False) is False
+        assert other.acquire(shared=True, blocking=False) is False
+        assert other.locked is False
+    assert lock.locked is False
+    assert other.acquire(blocking=False) is True
+    other.release()
+    other.release()
+
+
+def test_shared(tmp_path):
+    path = tmp_path / "x.lock"
+    lock1, lock2 = FileLock(path), FileLock(path)
+    assert lock1.acquire(shared=True, blocking=False) is True
+    assert lock2.acquire(shared=True, blocking=False) is True
+    assert FileLock(path).acquire(blocking=False) is False
+    with pytest.raises(RuntimeError):
+        lock1.acquire()
+    lock1.release()
+    lock2.release()
+    assert FileLock(path).acquire(blocking=False) is True
+
+
+def test_no_create(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        FileLock(tmp_path / "missing.lock", create=False).acquire()
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.locks",
+        preview=False,
+    )
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+
+from afwf_fts_anything import profiling
+from afwf_fts_anything.profiling import (
+    PhaseTimer,
+    phase,
+    get_top_n,
+    append_record,
+    keep_slowest,
+    profile_invocation,
+    get_path_timings,
+)
+
+
+def test_get_top_n(monkeypatch):
+    monkeypatch.delenv(profiling.ENV_PROFILE, raising=False)
+    monkeypatch.delenv(profiling.ENV_PROFILE_TOP, raising=False)
+    assert get_top_n() is None
+    assert get_top_n("") == 0
+    assert get_top_n("5") == 5
+
+    monkeypatch.setenv(profiling.ENV_PROFILE, "0")
+    assert get_top_n() is None
+    monkeypatch.setenv(profiling.ENV_PROFILE, "1")
+    assert get_top_n() == 0
+    monkeypatch.setenv(profiling.ENV_PROFILE_TOP, "3")
+    assert get_top_n() == 3
+    assert get_top_n("2") == 2
+
+
+def test_phase_timer():
+    timer = PhaseTimer()
+    with timer.phase("outer"):
+        time.sleep(0.02)
+        with timer.phase("inner"):
+            time.sleep(0.02)
+    with timer.phase("inner"):
+        pass
+    # nested time counts for the inner phase only
+    assert 0.015 < timer.phases["outer"] < 0.035
+    assert timer.phases["inner"] >= 0.015
+    assert sum(timer.phases.values()) <= timer.elapsed()
+
+
+def test_phase_disabled():
+    assert profiling._timer is None
+    with phase("anything"):
+        pass
+
+
+def test_append_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "MAX_LOG_BYTES", 100)
+    path = tmp_path / "profile" / "timings.jsonl"
+    for i in range(5):
+        append_record(path, {"i": i, "padding": "x" * 30})
+    rotated = path.with_name("timings.jsonl.1")
+    assert rotated.exists()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert records[-1]["i"] == 4
+    assert len(path.read_text()) + len(rotated.read_text()) < 5 * 60
+
+
+class FakeProfiler:
+    def dump_stats(self, path):
+        with open(path, "w") as f:
+            f.write("stats")
+
+
+def test_keep_slowest(tmp_path):
+    dir_cprofile = tmp_path / "cprofile"
+    assert keep_slowest(dir_cprofile, FakeProfiler(), 0.2, 2) is not None
+    assert keep_slowest(dir_cprofile, FakeProfiler(), 0.1, 2) is not None
+    # faster than both kept captures
+    assert keep_slowest(dir_cprofile, FakeProfiler(), 0.05, 2) is None
+    # slower: replaces the fastest one
+    assert keep_slowest(dir_cprofile, FakeProfiler(), 1.5, 2) is not None
+    names = sorted(p.name for p in dir_cprofile.iterdir())
+    assert [name.split("ms")[0] for name in names] == ["00000200.000", "00001500.000"]
+
+
+def test_profile_invocation(tmp_path):
+    with profile_invocation(tmp_path, 1, dataset="movie") as record:
+        with phase("query"):
+            with phase("setting"):
+                pass
+        record["source"] = "search"
+    assert profiling._timer is None
+
+    (line,) = get_path_timings(tmp_path).read_text().splitlines()
+    record = json.loads(line)
+    assert record["dataset"] == "movie"
+    assert record["source"] == "search"
+    assert set(record["phases"]) == {"query", "setting"}
+    assert record["total_ms"] >= 0
+    assert len(list((tmp_path / "profile" / "cprofile").glob("*.prof"))) == 1
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.profiling",
+        preview=False,
+    )
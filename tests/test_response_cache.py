@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import sqlite3
+
+import pytest
+
+from afwf_fts_anything.dataset import Dataset
+from afwf_fts_anything.response_cache import (
+    normalize_query,
+    make_key,
+    ResponseCache,
+)
+from afwf_fts_anything.index_generation import create_generation, publish
+from afwf_fts_anything.paths import path_enum
+
+dir_movie = path_enum.dir_package_test_data_movie
+
+
+@pytest.fixture
+def dir_dataset(tmp_path):
+    dir_dataset = tmp_path / "movie"
+    dir_dataset.mkdir()
+    shutil.copy(dir_movie / "movie-setting.json", dir_dataset / "movie-setting.json")
+    shutil.copy(dir_movie / "movie-data.json", dir_dataset / "movie-data.json")
+    return dir_dataset
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("", ""),
+        ("   ", ""),
+        ("god father", "god father"),
+        ("  god   father ", "god father"),
+        ("?", "?"),
+    ],
+)
+def test_normalize_query(query, expected):
+    assert normalize_query(query) == expected
+
+
+def publish_generation(dir_index):
+    publish(dir_index, create_generation(dir_index))
+
+
+class TestMakeKey:
+    def test_no_generation(self, dir_dataset):
+        assert make_key(dir_dataset, "movie", "god", "open_url") is None
+
+    def test_no_setting(self, tmp_path):
+        publish_generation(tmp_path / "movie-index")
+        assert make_key(tmp_path, "movie", "god", "open_url") is None
+
+    def test_key_changes(self, dir_dataset):
+        publish_generation(dir_dataset / "movie-index")
+        key = make_key(dir_dataset, "movie", "god", "open_url")
+        assert key is not None
+        assert key == make_key(dir_dataset, "movie", "god", "open_url")
+        assert key != make_key(dir_dataset, "movie", "god", "open_file")
+        assert key != make_key(dir_dataset, "movie", "godf", "open_url")
+
+        # new index generation
+        publish_generation(dir_dataset / "movie-index")
+        key2 = make_key(dir_dataset, "movie", "god", "open_url")
+        assert key2 != key
+
+        # edited setting file
+        path_setting = dir_dataset / "movie-setting.json"
+        path_setting.write_text(path_setting.read_text() + "\n")
+        assert make_key(dir_dataset, "movie", "god", "open_url") != key2
+
+
+class TestResponseCache:
+    def test_get_set_evict(self, tmp_path):
+        with ResponseCache(tmp_path / "cache") as cache:
+            assert cache.evict("movie") == 0
+            assert cache.get("k1") is None
+            cache.set("k1", "movie", '{"items": []}')
+            cache.set("k2", "book", '{"items": [1]}')
+            assert cache.get("k1") == '{"items": []}'
+
+            assert cache.evict("movie") == 1
+            assert cache.get("k1") is None
+            assert cache.get("k2") == '{"items": [1]}'
+
+    def test_get_reads_without_diskcache(self, tmp_path):
+        small = '{"items": []}'
+        large = '{"items": ["%s"]}' % ("x" * 50_000)  # stored in a file
+        with ResponseCache(tmp_path / "cache") as cache:
+            cache.set("small", "movie", small)
+            cache.set("large", "movie", large)
+        path_db = tmp_path / "cache" / "response" / "cache.db"
+        with sqlite3.connect(path_db) as con:
+            con.execute("UPDATE Cache SET access_time = 0")
+
+        with ResponseCache(tmp_path / "cache") as cache:
+            assert cache.get("small") == small
+            assert cache.get("large") == large
+            assert cache.get("missing") is None
+            assert cache._cache is None
+
+        # the hits count as uses for the least-recently-used eviction
+        with sqlite3.connect(path_db) as con:
+            rows = con.execute("SELECT access_time FROM Cache").fetchall()
+        assert all(access_time > 0 for (access_time,) in rows)
+
+        # no database yet
+        assert ResponseCache(tmp_path / "empty").get("small") is None
+        assert not (tmp_path / "empty").exists()
+
+    def test_size_limit(self, tmp_path):
+        with ResponseCache(tmp_path / "cache", size_limit=0) as cache:
+            for i in range(20):
+                cache.set(f"k{i}", "movie", "x" * 1000)
+            # diskcache culls the least recently used entries on write
+            assert len(cache.cache) < 20
+
+
+def test_build_index_invalidates(dir_dataset, tmp_path):
+    dir_cache = tmp_path / "cache"
+    ds = Dataset(name="movie", dir_root=dir_dataset, dir_cache=dir_cache)
+    ds.build_index()
+    key = make_key(dir_dataset, "movie", "god", "open_url")
+    assert key is not None
+
+    with ResponseCache(dir_cache) as cache:
+        cache.set(key, "movie", "answer")
+        assert cache.get(key) == "answer"
+
+    ds.build_index()
+    assert make_key(dir_dataset, "movie", "god", "open_url") != key
+    with ResponseCache(dir_cache) as cache:
+        assert cache.get(key) is None
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.response_cache",
+        preview=False,
+    )
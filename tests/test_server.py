@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+import socket
+import asyncio
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from afwf_fts_anything.server import (
+    SearchServer,
+    LatencyStats,
+    check_host,
+)
+from afwf_fts_anything.paths import path_enum
+
+dir_movie = path_enum.dir_package_test_data_movie
+
+
+@pytest.fixture
+def server(tmp_path):
+    dir_dataset = tmp_path / "movie"
+    dir_dataset.mkdir()
+    shutil.copy(dir_movie / "movie-setting.json", dir_dataset / "movie-setting.json")
+    shutil.copy(dir_movie / "movie-data.json", dir_dataset / "movie-data.json")
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "broken-setting.json").write_text("not json")
+
+    search_server = SearchServer(dir_datacatalog_root=tmp_path, max_workers=4)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    aserver = asyncio.run_coroutine_threadsafe(
+        search_server.start("127.0.0.1", 0), loop
+    ).result()
+    search_server.port = aserver.sockets[0].getsockname()[1]
+    yield search_server
+
+    asyncio.run_coroutine_threadsafe(search_server.shutdown(aserver), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+    search_server.close()
+
+
+def get(conn: http.client.HTTPConnection, path: str) -> tuple[int, dict, http.client.HTTPResponse]:
+    conn.request("GET", path)
+    res = conn.getresponse()
+    return res.status, json.loads(res.read()), res
+
+
+def test_check_host():
+    for host in ["127.0.0.1", "::1", "localhost"]:
+        check_host(host)
+    for host in ["0.0.0.0", "192.168.1.2", "example.com"]:
+        with pytest.raises(ValueError):
+            check_host(host)
+
+
+def test_latency_stats():
+    stats = LatencyStats(window=100)
+    assert stats.summary() == {"count": 0, "errors": 0}
+    for ms in range(1, 201):
+        stats.record(ms / 1000, 200 if ms % 50 else 404)
+    summary = stats.summary()
+    assert summary["count"] == 200
+    assert summary["errors"] == 4
+    # only the last 100 requests: 101 .. 200 ms
+    assert summary["p50_ms"] == 150
+    assert summary["p95_ms"] == 195
+    assert summary["p99_ms"] == 199
+
+
+def test_endpoints(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+    # every request over the same keep-alive connection
+    status, body, res = get(conn, "/search?dataset=movie&q=god+father")
+    assert status == 200
+    assert body["hits"][0]["movie_id"] == 2
+    assert body["query"] == "god father"
+    assert res.getheader("Connection") == "keep-alive"
+    assert res.getheader("Server-Timing").startswith("total;dur=")
+    sock = conn.sock
+
+    status, body, _ = get(conn, "/search?dataset=movie&limit=3")
+    assert status == 200
+    assert len(body["hits"]) == 3
+    assert conn.sock is sock
+
+    status, body, _ = get(conn, "/datasets")
+    assert status == 200
+    assert [(d["name"], d["status"]) for d in body["datasets"]] == [
+        ("broken", "setting_invalid"),
+        ("movie", "setting_valid"),
+    ]
+
+    for path, expected in [
+        ("/search?q=god", 400),
+        ("/search?dataset=movie&limit=0", 400),
+        ("/search?dataset=movie&limit=x", 400),
+        ("/search?dataset=movie&q=title:(", 400),
+        ("/search?dataset=nothing", 404),
+        ("/search?dataset=..", 404),
+        ("/search?dataset=broken", 500),
+        ("/nowhere", 404),
+    ]:
+        status, body, _ = get(conn, path)
+        assert status == expected, path
+        assert "error" in body
+
+    conn.request("POST", "/search", body=b"{}")
+    res = conn.getresponse()
+    assert res.status == 405
+    res.read()
+    assert conn.sock is sock
+
+    status, body, _ = get(conn, "/health")
+    assert status == 200
+    assert body["status"] == "ok"
+    assert body["open_indexes"] == 1
+    search = body["endpoints"]["/search"]
+    assert search["count"] == 10
+    assert search["errors"] == 8
+    assert search["p50_ms"] <= search["p99_ms"]
+    assert body["endpoints"]["other"]["count"] == 1
+    conn.close()
+
+
+def test_concurrent_requests(server):
+    def search(i: int) -> int:
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+        try:
+            ids = []
+            for _ in range(5):
+                status, body, _ = get(conn, "/search?dataset=movie&q=god+father")
+                assert status == 200
+                ids.append(body["hits"][0]["movie_id"])
+            return ids
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(search, range(16)))
+    assert all(ids == [2] * 5 for ids in results)
+    assert len(server.catalog.handle_pool) == 1
+
+
+def test_connection_close(server):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=10) as sock:
+        sock.sendall(b"GET /health HTTP/1.0\r\n\r\n")
+        data = b""
+        while chunk := sock.recv(65536):
+            data += chunk
+    head, _, content = data.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK")
+    assert b"Connection: close" in head
+    assert json.loads(content)["status"] == "ok"
+
+    with socket.create_connection(("127.0.0.1", server.port), timeout=10) as sock:
+        sock.sendall(b"garbage\r\n\r\n")
+        data = sock.recv(65536)
+    assert data.startswith(b"HTTP/1.1 400 Bad Request")
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(__file__, "afwf_fts_anything.server", preview=False)
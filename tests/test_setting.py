@@ -51,6 +51,66 @@ class TestSetting:
         assert len(setting.searchable_fields) == 4
         assert len(setting.sortable_fields) == 1
 
+    def test_incremental_search(self):
+        setting = Setting(fields=make_movie_fields(), incremental_search=True)
+        assert setting.incremental_fields == ["title"]
+        assert setting.incremental_min_gram == 2
+
+        fields = make_movie_fields()
+        fields[1] = NgramField(name="title", prefix_only=True)
+        with pytest.raises((MalformedSettingError, ValidationError)):
+            Setting(fields=fields, incremental_search=True)
+
+    def test_primary_key(self):
+        assert Setting(fields=make_movie_fields()).primary_key_type is None
+        assert Setting(fields=make_movie_fields(), primary_key="url").primary_key_type is str
+
+        fields = make_movie_fields()
+        fields[0] = NumericField(name="movie_id", indexed=True)
+        setting = Setting(fields=fields, primary_key="movie_id")
+        assert setting.primary_key_type is int
+
+        for primary_key in ["undefined", "title", "description"]:
+            with pytest.raises((MalformedSettingError, ValidationError)):
+                Setting(fields=make_movie_fields(), primary_key=primary_key)
+
+    def test_prerender_display(self):
+        fields = make_movie_fields()
+        fields[2] = TextField(name="description", stored=False)
+        # a template may reference a field that is not stored ...
+        setting = Setting(
+            fields=fields,
+            subtitle_field="{description}",
+            primary_key="url",
+            prerender_display=True,
+        )
+        assert "description" not in setting.store_fields
+        with pytest.raises((MalformedSettingError, ValidationError)):
+            Setting(fields=fields, subtitle_field="{description}", primary_key="url")
+        # ... but it must be defined
+        with pytest.raises((MalformedSettingError, ValidationError)):
+            Setting(
+                fields=fields,
+                subtitle_field="{undefined}",
+                primary_key="url",
+                prerender_display=True,
+            )
+        # rows are looked up by a stored primary key
+        with pytest.raises((MalformedSettingError, ValidationError)):
+            Setting(fields=make_movie_fields(), prerender_display=True)
+        fields = make_movie_fields()
+        fields[5] = StoredField(name="url", stored=False)
+        with pytest.raises((MalformedSettingError, ValidationError)):
+            Setting(fields=fields, primary_key="url", prerender_display=True)
+
+    def test_data_compression(self):
+        setting = Setting(fields=make_movie_fields(), data_compression="gz")
+        assert setting.data_compression == "gz"
+        with pytest.raises((MalformedSettingError, ValidationError)):
+            Setting(fields=make_movie_fields(), data_compression="zip")
+        with pytest.raises(ValidationError):
+            Setting(fields=make_movie_fields(), data_compression="rar")
+
     def test_duplicate_field_names(self):
         with pytest.raises((MalformedSettingError, ValidationError)):
             Setting(fields=[StoredField(name="field1"), StoredField(name="field1")])
@@ -81,6 +141,39 @@ class TestSetting:
                 title_field="Movie Title: {movie_title}",
             )
 
+    def test_display_template_reference_not_stored(self):
+        with pytest.raises((MalformedSettingError, ValidationError)):
+            Setting(
+                fields=[StoredField(name="title"), NgramField(name="desc", stored=False)],
+                subtitle_field="{desc}",
+            )
+
+    def test_render_batch(self):
+        setting = Setting(
+            fields=make_movie_fields(),
+            title_field="Movie Title: {title} [{genres}]",
+            subtitle_field="{description}",
+            arg_field="{url}",
+        )
+        docs = [
+            {"movie_id": "1", "title": "A", "description": "d1", "genres": "g", "rating": 9.0, "url": "u1"},
+            {"movie_id": "2", "title": "B", "description": "d2", "genres": "h", "rating": 8.0, "url": "u2",
+             "autocomplete": "ac", "icon": "i.png"},
+        ]
+        rows = setting.render_batch(docs)
+        assert len(rows) == 2
+        for row, doc in zip(rows, docs):
+            assert row.title == setting.format_title(doc)
+            assert row.subtitle == setting.format_subtitle(doc)
+            assert row.arg == setting.format_arg(doc)
+            assert row.autocomplete == setting.format_autocomplete(doc)
+            assert row.icon == setting.format_icon(doc)
+        assert rows[0].title == "Movie Title: A [g]"
+        # columns without a template fall back to the document key
+        assert rows[0].autocomplete is None
+        assert rows[1].autocomplete == "ac"
+        assert rows[1].icon == "i.png"
+
 
 if __name__ == "__main__":
     from afwf_fts_anything.tests import run_cov_test
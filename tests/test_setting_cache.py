@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import pickle
+import shutil
+
+import pytest
+
+from afwf_fts_anything.setting import Setting
+from afwf_fts_anything import setting_cache
+from afwf_fts_anything.setting_cache import load_setting, get_path_cache, get_header
+from afwf_fts_anything.paths import path_enum
+
+path_movie_setting = path_enum.path_package_test_movie_setting
+
+
+@pytest.fixture
+def path_setting(tmp_path):
+    path = tmp_path / "movie-setting.json"
+    shutil.copy(path_movie_setting, path)
+    return path
+
+
+def count_validations(monkeypatch) -> list:
+    calls = []
+    original = Setting.model_validate_json.__func__
+
+    def model_validate_json(cls, *args, **kwargs):
+        calls.append(1)
+        return original(cls, *args, **kwargs)
+
+    monkeypatch.setattr(Setting, "model_validate_json", classmethod(model_validate_json))
+    return calls
+
+
+class TestLoadSetting:
+    def test_without_cache_dir(self, path_setting):
+        setting = load_setting(path_setting)
+        assert setting == Setting.from_json_file(path_setting)
+
+    def test_hit_skips_validation(self, path_setting, tmp_path, monkeypatch):
+        dir_cache = tmp_path / "cache"
+        calls = count_validations(monkeypatch)
+
+        setting1 = load_setting(path_setting, dir_cache)
+        assert len(calls) == 1
+        assert get_path_cache(dir_cache, path_setting).exists()
+
+        setting2 = load_setting(path_setting, dir_cache)
+        assert len(calls) == 1
+        assert setting2 == setting1
+        # derived properties are precomputed and survive the round trip
+        assert "fields_mapper" in setting2.__dict__
+        assert setting2.store_fields == setting1.store_fields
+
+    def test_touch_without_edit_reuses_entry(self, path_setting, tmp_path, monkeypatch):
+        dir_cache = tmp_path / "cache"
+        calls = count_validations(monkeypatch)
+        load_setting(path_setting, dir_cache)
+
+        st = path_setting.stat()
+        os.utime(path_setting, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        load_setting(path_setting, dir_cache)
+        assert len(calls) == 1
+
+    def test_edit_invalidates_entry(self, path_setting, tmp_path):
+        dir_cache = tmp_path / "cache"
+        assert load_setting(path_setting, dir_cache).title_field == "{title} ({genres}) rate {rating}"
+
+        data = json.loads(path_setting.read_text())
+        data["title_field"] = "{title}"
+        path_setting.write_text(json.dumps(data))
+        assert load_setting(path_setting, dir_cache).title_field == "{title}"
+
+    def test_corrupt_entry_is_ignored(self, path_setting, tmp_path):
+        dir_cache = tmp_path / "cache"
+        load_setting(path_setting, dir_cache)
+        get_path_cache(dir_cache, path_setting).write_bytes(b"garbage")
+        assert load_setting(path_setting, dir_cache).title_field is not None
+
+    def test_other_versions_miss(self, path_setting, tmp_path, monkeypatch):
+        dir_cache = tmp_path / "cache"
+        calls = count_validations(monkeypatch)
+        load_setting(path_setting, dir_cache)
+        assert len(calls) == 1
+
+        # e.g. pydantic was upgraded since the entry was written
+        cache_version, version, pydantic_version, sayt2_version = get_header()
+        header = (cache_version, version, "0.0.0", sayt2_version)
+        monkeypatch.setattr(setting_cache, "get_header", lambda: header)
+        load_setting(path_setting, dir_cache)
+        assert len(calls) == 2
+        load_setting(path_setting, dir_cache)
+        assert len(calls) == 2
+
+    def test_unpickling_error_is_a_miss(self, path_setting, tmp_path):
+        dir_cache = tmp_path / "cache"
+        load_setting(path_setting, dir_cache)
+        # the header matches but the entry references a class that is gone
+        path_cache = get_path_cache(dir_cache, path_setting)
+        entry = pickle.dumps({"setting": object()}).replace(b"builtins", b"nomodule")
+        path_cache.write_bytes(pickle.dumps(get_header()) + entry)
+        assert load_setting(path_setting, dir_cache).title_field is not None
+
+    def test_invalid_setting_raises(self, tmp_path):
+        path = tmp_path / "bad-setting.json"
+        path.write_text("{invalid")
+        with pytest.raises(Exception):
+            load_setting(path, tmp_path / "cache")
+        assert not get_path_cache(tmp_path / "cache", path).exists()
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.setting_cache",
+        preview=False,
+    )
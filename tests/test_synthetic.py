@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+from afwf_fts_anything.paths import path_enum
+from afwf_fts_anything.setting import Setting
+from afwf_fts_anything.dataset import Dataset
+from afwf_fts_anything.tests.synthetic import (
+    make_vocabulary,
+    iter_records,
+    write_dataset,
+    make_query_mix,
+)
+
+
+def test_make_vocabulary():
+    words = make_vocabulary(100)
+    assert len(set(words)) == 100
+    assert words == make_vocabulary(100)
+
+
+def test_iter_records():
+    setting = Setting.from_json_file(path_enum.path_package_test_movie_setting)
+    records = list(iter_records(setting, 50))
+    assert len(records) == 50
+    assert records == list(iter_records(setting, 50))
+    assert set(records[0]) == {f.name for f in setting.fields}
+    assert records[3]["url"] == "https://example.com/url/3"
+    assert isinstance(records[0]["rating"], float)
+
+
+def test_write_dataset(tmp_path):
+    setting = Setting.from_json_file(path_enum.path_package_test_movie_setting)
+    write_dataset(tmp_path, "synthetic", setting, 300)
+    ds = Dataset(name="synthetic", dir_root=tmp_path)
+    assert ds.setting.data_url is None
+    assert ds.build_index() == 300
+
+    queries = make_query_mix(10)
+    assert [kind for kind, _ in queries[:5]] == [
+        "common",
+        "rare",
+        "two_words",
+        "prefix",
+        "browse",
+    ]
+    assert ds.search(queries[0][1], limit=5)  # a frequent word matches
+    assert len(ds.search("*", limit=5)) == 5
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.tests.synthetic",
+        preview=False,
+    )
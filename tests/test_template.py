@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+
+import pytest
+
+from afwf_fts_anything.template import (
+    parse_field_names,
+    CompiledTemplate,
+    FieldGetter,
+    DisplayRow,
+    BatchRenderer,
+)
+
+data = {
+    "title": "The Godfather",
+    "genres": "Crime, Drama",
+    "rating": 9.2,
+    "movie": {"year": 1972},
+    "tags": ["a", "b"],
+}
+
+
+def test_parse_field_names():
+    assert parse_field_names("{title} ({genres})") == ["title", "genres"]
+    assert parse_field_names("{movie[year]} {tags[0]} {rating:.1f}") == ["movie", "tags", "rating"]
+    assert parse_field_names("no fields {{escaped}}") == []
+    assert parse_field_names("{movie.title} {movie.cast[0].name}") == ["movie", "movie"]
+
+
+class TestCompiledTemplate:
+    @pytest.mark.parametrize(
+        "template",
+        [
+            "{title}",
+            "{title} ({genres}) rate {rating}",
+            "100% {title}",
+            "{{literal}} {title}",
+            "constant",
+            "",
+            # complex placeholders fall back to format_map
+            "{rating:.2f}",
+            "{title!r}",
+            "{movie[year]}",
+            "{tags[0]}",
+        ],
+    )
+    def test_render_matches_format_map(self, template):
+        assert CompiledTemplate(template).render(data) == template.format_map(data)
+
+    def test_missing_key(self):
+        with pytest.raises(KeyError):
+            CompiledTemplate("{title} {missing}").render(data)
+
+    def test_pickle(self):
+        tpl = pickle.loads(pickle.dumps(CompiledTemplate("{title} - {rating}")))
+        assert tpl.render(data) == "The Godfather - 9.2"
+        getter = pickle.loads(pickle.dumps(FieldGetter("title")))
+        assert getter.render(data) == "The Godfather"
+
+
+def test_field_getter():
+    assert FieldGetter("title").render(data) == "The Godfather"
+    assert FieldGetter("nope").render(data) is None
+
+
+class TestBatchRenderer:
+    def check(self, renderers, docs):
+        rows = BatchRenderer(renderers).render(docs)
+        assert rows == [DisplayRow(*[r.render(doc) for r in renderers]) for doc in docs]
+        return rows
+
+    def test_all_simple(self):
+        renderers = [CompiledTemplate(t) for t in ["{title}", "{genres}", "{rating}", "x", "{title}.png"]]
+        rows = self.check(renderers, [data, dict(data, title="Other")])
+        assert rows[1].icon == "Other.png"
+
+    def test_single_key(self):
+        renderers = [CompiledTemplate("{title}!")] + [CompiledTemplate("c")] * 4
+        rows = self.check(renderers, [data])
+        assert rows[0] == DisplayRow("The Godfather!", "c", "c", "c", "c")
+
+    def test_no_keys(self):
+        self.check([CompiledTemplate("c")] * 5, [data])
+
+    def test_mixed_columns(self):
+        renderers = [
+            CompiledTemplate("{title} ({genres})"),
+            FieldGetter("subtitle"),
+            CompiledTemplate("{rating:.1f}"),
+            CompiledTemplate("{title}"),
+            FieldGetter("icon"),
+        ]
+        self.check(renderers, [data, dict(data, subtitle="s", icon="i.png")])
+
+    def test_no_simple_columns(self):
+        self.check([FieldGetter(k) for k in ["title", "subtitle", "arg", "autocomplete", "icon"]], [data])
+
+    def test_separator_in_value(self):
+        doc = dict(data, title="a\x1fb")
+        renderers = [CompiledTemplate(t) for t in ["{title}", "{genres}", "{rating}", "{title}", "{genres}"]]
+        rows = self.check(renderers, [doc])
+        assert rows[0].title == "a\x1fb"
+        mixed = renderers[:4] + [FieldGetter("icon")]
+        self.check(mixed, [doc])
+
+    def test_missing_key(self):
+        with pytest.raises(KeyError):
+            BatchRenderer([CompiledTemplate("{missing}")] * 5).render([data])
+
+    def test_pickle(self):
+        renderers = [CompiledTemplate("{title}"), FieldGetter("x")] + [CompiledTemplate("{genres}")] * 3
+        br = pickle.loads(pickle.dumps(BatchRenderer(renderers)))
+        assert br.render([data])[0].title == "The Godfather"
+
+
+def test_display_row():
+    row = DisplayRow("t", "s", "a", "c", "i")
+    assert row.title == "t" and row.icon == "i"
+
+
+if __name__ == "__main__":
+    from afwf_fts_anything.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "afwf_fts_anything.template",
+        preview=False,
+    )
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: index build time and disk usage of a plain vs compressed data file.
+
+Writes the same synthetic dataset as ``{name}-data.json`` and with every
+available :attr:`.Setting.data_compression`, builds each index from scratch
+and reports the data file size, the index size and the build time.
+
+Usage::
+
+    python tests_load/bench_data_compression.py
+"""
+
+import json
+import time
+import random
+import tempfile
+from pathlib import Path
+
+from afwf_fts_anything.dataset import Dataset
+from afwf_fts_anything.decompress import STREAM_COMPRESSIONS, recompress_file
+
+N_RECORDS = 50_000
+REPEAT = 3
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima "
+    "mike november oscar papa quebec romeo sierra tango uniform victor whiskey "
+    "xray yankee zulu crime drama comedy thriller action romance western war"
+).split()
+
+SETTING = {
+    "fields": [
+        {"type": "numeric", "name": "movie_id", "indexed": True},
+        {"type": "ngram", "name": "title", "min_gram": 2, "max_gram": 8},
+        {"type": "text", "name": "description"},
+        {"type": "keyword", "name": "genres"},
+        {"type": "numeric", "name": "rating", "kind": "f64", "indexed": True},
+        {"type": "stored", "name": "url"},
+    ],
+    "title_field": "{title}",
+    "subtitle_field": "{description}",
+    "arg_field": "{url}",
+}
+
+
+def make_records() -> list[dict]:
+    rnd = random.Random(42)
+    return [
+        {
+            "movie_id": i,
+            "title": " ".join(rnd.choices(WORDS, k=3)).title(),
+            "description": " ".join(rnd.choices(WORDS, k=40)),
+            "genres": rnd.choice(WORDS),
+            "rating": round(rnd.uniform(1, 10), 1),
+            "url": f"https://example.com/movie/{i}",
+        }
+        for i in range(N_RECORDS)
+    ]
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def bench(dir_root: Path, path_plain: Path, compression) -> tuple[int, int, float]:
+    name = "bench"
+    dir_root.mkdir()
+    setting = dict(SETTING, data_compression=compression)
+    (dir_root / f"{name}-setting.json").write_text(json.dumps(setting))
+    ds = Dataset(name=name, dir_root=dir_root)
+    recompress_file(path_plain, ds.path_data, None, compression)
+
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        ds.build_index()
+        timings.append(time.perf_counter() - start)
+    return ds.path_data.stat().st_size, dir_size(ds.dir_index), min(timings)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        dir_tmp = Path(dir_tmp)
+        path_plain = dir_tmp / "plain.json"
+        path_plain.write_text(json.dumps(make_records()))
+
+        print(f"{N_RECORDS} records, best of {REPEAT} builds")
+        print(f"{'compression':<12} {'data file':>12} {'index':>12} {'build':>9}")
+        for compression in [None, *STREAM_COMPRESSIONS]:
+            label = "plain" if compression is None else compression.value
+            try:
+                data_size, index_size, seconds = bench(
+                    dir_tmp / label, path_plain, compression
+                )
+            except ImportError as e:
+                print(f"{label:<12} skipped: {e}")
+                continue
+            print(
+                f"{label:<12} {data_size / 1e6:>10.2f}MB "
+                f"{index_size / 1e6:>10.2f}MB {seconds:>8.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark: per-document ``str.format_map`` vs :meth:`Setting.render_batch`.
+
+Renders the five Alfred display columns for one result page of wide records,
+the way ``fts()`` does for the empty-query (``*``) browse path, and reports
+the time per page for both approaches.
+
+Usage::
+
+    python tests_load/bench_render_batch.py
+"""
+
+import timeit
+
+from afwf_fts_anything.setting import Setting
+
+N_FIELDS = 40
+PAGE_SIZE = 20
+REPEAT = 5
+NUMBER = 2000
+
+
+def make_setting() -> Setting:
+    fields = [{"type": "stored", "name": f"f{i}"} for i in range(N_FIELDS)]
+    fields[0] = {"type": "ngram", "name": "title"}
+    fields[1] = {"type": "text", "name": "description"}
+    fields[2] = {"type": "numeric", "name": "rating", "kind": "f64", "indexed": True}
+    return Setting.model_validate(
+        {
+            "fields": fields,
+            "title_field": "{title} ({f3}, {f4}) rate {rating}",
+            "subtitle_field": "{description} | {f5} | {f6} | {f7}",
+            "arg_field": "https://example.com/{f8}/{f9}",
+            "autocomplete_field": "{title}",
+            "icon_field": "{f10}.png",
+        }
+    )
+
+
+def make_docs() -> list[dict]:
+    docs = []
+    for n in range(PAGE_SIZE):
+        doc = {f"f{i}": f"value-{n}-{i}" for i in range(N_FIELDS)}
+        doc["title"] = f"Title {n}"
+        doc["description"] = f"A fairly long description for record number {n}"
+        doc["rating"] = 5.0 + n / 10
+        docs.append(doc)
+    return docs
+
+
+def render_format_map(setting: Setting, docs: list[dict]) -> list[tuple]:
+    """The original per-document path: five raw ``format_map`` calls per hit."""
+    return [
+        (
+            setting.title_field.format_map(doc),
+            setting.subtitle_field.format_map(doc),
+            setting.arg_field.format_map(doc),
+            setting.autocomplete_field.format_map(doc),
+            setting.icon_field.format_map(doc),
+        )
+        for doc in docs
+    ]
+
+
+def main():
+    setting = make_setting()
+    docs = make_docs()
+    assert [tuple(row) for row in setting.render_batch(docs)] == render_format_map(setting, docs)
+
+    results = {}
+    for name, func in [
+        ("format_map", lambda: render_format_map(setting, docs)),
+        ("render_batch", lambda: setting.render_batch(docs)),
+    ]:
+        best = min(timeit.repeat(func, repeat=REPEAT, number=NUMBER))
+        results[name] = best / NUMBER * 1_000_000
+    print(f"{PAGE_SIZE} docs x {N_FIELDS} fields, best of {REPEAT} x {NUMBER} runs")
+    for name, us in results.items():
+        print(f"  {name:<12} {us:8.1f} us / page")
+    print(f"  speedup      {results['format_map'] / results['render_batch']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
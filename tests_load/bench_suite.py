@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark suite of the hot paths, on synthetic datasets of growing size.
+
+For each size, a dataset matching a setting file (the bundled movie schema
+by default) is generated with :mod:`afwf_fts_anything.tests.synthetic`, then
+measured:
+
+- ``build`` — :meth:`.Dataset.build_index` wall time and records per second,
+  and the index size on disk;
+- ``search`` — :meth:`.Dataset.search` latency over a query mix
+  (p50 / p95 / p99, overall and per query kind);
+- ``fts`` — end-to-end :func:`.fts.fts` latency, setting load and Alfred
+  item rendering included;
+- ``cold_start`` — wall time of a fresh ``afwf-fts-anything fts`` process,
+  for queries not yet in the response cache (``miss``) and repeated ones
+  (``hit``).
+
+The results are written as JSON (``--output``, by default
+``tmp/bench/bench-{timestamp}.json``); ``--compare`` prints how they moved
+against an earlier results file.
+
+Usage::
+
+    python tests_load/bench_suite.py --sizes 1k,100k,1M
+    python tests_load/bench_suite.py --sizes 1k --compare tmp/bench/bench-....json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import typing as T
+from pathlib import Path
+from datetime import datetime, timezone
+from importlib import metadata
+
+import afwf.api as afwf
+
+from afwf_fts_anything.paths import path_enum, PACKAGE_NAME
+from afwf_fts_anything.setting import Setting
+from afwf_fts_anything.dataset import Dataset
+from afwf_fts_anything.fts import fts
+from afwf_fts_anything.tests.synthetic import write_dataset, make_query_mix
+
+RESULT_VERSION = 1
+DATASET_NAME = "bench"
+
+N_QUERIES = 200
+"""Queries in the mix for ``search`` and ``fts``."""
+N_COLD_START = 10
+"""Processes started per ``cold_start`` measurement."""
+
+_SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(size: str) -> int:
+    """``"100k"`` -> ``100000``, ``"1M"`` -> ``1000000``."""
+    size = size.strip().lower()
+    if size[-1:] in _SIZE_SUFFIXES:
+        return int(float(size[:-1]) * _SIZE_SUFFIXES[size[-1]])
+    return int(size)
+
+
+def summarize(seconds: list[float]) -> dict[str, float]:
+    """Count and p50 / p95 / p99 / max of *seconds*, in milliseconds."""
+    ms = sorted(s * 1000 for s in seconds)
+    if len(ms) == 1:
+        q = ms * 99
+    else:
+        q = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "n": len(ms),
+        "p50_ms": round(q[49], 3),
+        "p95_ms": round(q[94], 3),
+        "p99_ms": round(q[98], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def summarize_by_kind(timings: list[tuple[str, float]]) -> dict[str, T.Any]:
+    kinds = sorted({kind for kind, _ in timings})
+    return {
+        "all": summarize([s for _, s in timings]),
+        **{
+            kind: summarize([s for k, s in timings if k == kind])
+            for kind in kinds
+        },
+    }
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def bench_build(dir_dataset: Path, n: int) -> dict[str, T.Any]:
+    ds = Dataset(name=DATASET_NAME, dir_root=dir_dataset)
+    start = time.perf_counter()
+    ds.build_index()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": round(seconds, 3),
+        "records_per_second": round(n / seconds, 1),
+        "data_bytes": ds.path_data.stat().st_size,
+        "index_bytes": dir_size(ds.dir_index),
+    }
+
+
+def bench_search(dir_dataset: Path, queries: list[tuple[str, str]]) -> dict[str, T.Any]:
+    ds = Dataset(name=DATASET_NAME, dir_root=dir_dataset)
+    ds.search(queries[0][1])  # warm up the page cache
+    timings = []
+    for kind, query in queries:
+        start = time.perf_counter()
+        ds.search(query)
+        timings.append((kind, time.perf_counter() - start))
+    return summarize_by_kind(timings)
+
+
+def bench_fts(dir_root: Path, queries: list[tuple[str, str]]) -> dict[str, T.Any]:
+    items = fts(dataset_name=DATASET_NAME, query="*", dir_datacatalog_root=dir_root)
+    if items[0].icon is not None and items[0].icon.path == afwf.IconFileEnum.error:
+        raise RuntimeError(f"fts failed: {items[0].title}")
+    timings = []
+    for kind, query in queries:
+        start = time.perf_counter()
+        fts(dataset_name=DATASET_NAME, query=query, dir_datacatalog_root=dir_root)
+        timings.append((kind, time.perf_counter() - start))
+    return summarize_by_kind(timings)
+
+
+def _run_cli_fts(dir_home: Path, query: str) -> float:
+    env = dict(os.environ)
+    env["HOME"] = str(dir_home)
+    # run the working tree even when the package is not installed
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in [str(path_enum.dir_project_root), env.get("PYTHONPATH")] if p
+    )
+    args = [
+        sys.executable,
+        "-c",
+        "from afwf_fts_anything.cli import main; main()",
+        "fts",
+        "--dataset-name",
+        DATASET_NAME,
+        "--query",
+        query,
+    ]
+    start = time.perf_counter()
+    res = subprocess.run(args, env=env, capture_output=True, check=True)
+    seconds = time.perf_counter() - start
+    if not json.loads(res.stdout)["items"]:
+        raise RuntimeError(f"no items for {query!r}")
+    return seconds
+
+
+def bench_cold_start(dir_home: Path, queries: list[tuple[str, str]]) -> dict[str, T.Any]:
+    words = [query for kind, query in queries if kind != "browse"]
+    miss = [_run_cli_fts(dir_home, query) for query in words[:N_COLD_START]]
+    hit = [_run_cli_fts(dir_home, words[0]) for _ in range(N_COLD_START)]
+    return {"miss": summarize(miss), "hit": summarize(hit)}
+
+
+def run_size(dir_tmp: Path, setting: Setting, n: int) -> dict[str, T.Any]:
+    # the layout of the workflow home, so the CLI finds the dataset
+    dir_home = dir_tmp / f"home-{n}"
+    dir_root = dir_home / ".alfred-afwf" / PACKAGE_NAME
+    dir_dataset = dir_root / DATASET_NAME
+    start = time.perf_counter()
+    write_dataset(dir_dataset, DATASET_NAME, setting, n)
+    generate_seconds = time.perf_counter() - start
+
+    queries = make_query_mix(N_QUERIES)
+    result = {
+        "records": n,
+        "generate_seconds": round(generate_seconds, 3),
+        "build": bench_build(dir_dataset, n),
+        "search": bench_search(dir_dataset, queries),
+        "fts": bench_fts(dir_root, queries),
+        "cold_start": bench_cold_start(dir_home, queries),
+    }
+    shutil.rmtree(dir_home, ignore_errors=True)
+    return result
+
+
+def get_environment() -> dict[str, T.Any]:
+    versions = {}
+    for dist in [PACKAGE_NAME, "sayt2", "tantivy", "afwf", "pydantic"]:
+        try:
+            versions[dist] = metadata.version(dist)
+        except metadata.PackageNotFoundError:
+            versions[dist] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+# (path into a size result, label) of the figures compared between runs
+_COMPARED = [
+    (("build", "records_per_second"), "build records/s"),
+    (("search", "all", "p50_ms"), "search p50 ms"),
+    (("search", "all", "p99_ms"), "search p99 ms"),
+    (("fts", "all", "p50_ms"), "fts p50 ms"),
+    (("fts", "all", "p99_ms"), "fts p99 ms"),
+    (("cold_start", "miss", "p50_ms"), "cold start miss p50 ms"),
+    (("cold_start", "hit", "p50_ms"), "cold start hit p50 ms"),
+]
+
+
+def _get(result: dict, path: tuple[str, ...]) -> float | None:
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(old: dict[str, T.Any], new: dict[str, T.Any]) -> None:
+    """Print the figures of *new* next to those of *old*, per dataset size."""
+    old_by_size = {r["records"]: r for r in old["results"]}
+    print(f"\ncompared with {old['timestamp']}")
+    for result in new["results"]:
+        base = old_by_size.get(result["records"])
+        if base is None:
+            continue
+        print(f"{result['records']} records")
+        for path, label in _COMPARED:
+            a, b = _get(base, path), _get(result, path)
+            if a is None or b is None:
+                continue
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            print(f"  {label:<24} {a:>12.2f} -> {b:>12.2f}  {change}")
+
+
+def print_result(result: dict[str, T.Any]) -> None:
+    build = result["build"]
+    print(
+        f"{result['records']} records: build {build['seconds']:.2f}s "
+        f"({build['records_per_second']:.0f} records/s, "
+        f"index {build['index_bytes'] / 1e6:.1f}MB)"
+    )
+    for name in ["search", "fts"]:
+        s = result[name]["all"]
+        print(
+            f"  {name:<10} p50 {s['p50_ms']:8.2f}ms  p95 {s['p95_ms']:8.2f}ms  "
+            f"p99 {s['p99_ms']:8.2f}ms"
+        )
+    for name, s in result["cold_start"].items():
+        print(f"  cold {name:<5} p50 {s['p50_ms']:8.2f}ms  max {s['max_ms']:8.2f}ms")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--sizes",
+        default="1k,100k,1M",
+        help="comma-separated record counts, e.g. 1k,100k,1M",
+    )
+    parser.add_argument(
+        "--setting",
+        type=Path,
+        default=path_enum.path_package_test_movie_setting,
+        help="setting file whose fields the synthetic records match",
+    )
+    parser.add_argument("--output", type=Path, help="results JSON file")
+    parser.add_argument("--compare", type=Path, help="earlier results JSON file")
+    args = parser.parse_args(argv)
+
+    setting = Setting.from_json_file(args.setting)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output = {
+        "version": RESULT_VERSION,
+        "timestamp": timestamp,
+        "setting": str(args.setting),
+        "environment": get_environment(),
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        for size in args.sizes.split(","):
+            result = run_size(Path(dir_tmp), setting, parse_size(size))
+            print_result(result)
+            output["results"].append(result)
+
+    path_output = args.output or path_enum.dir_tmp / "bench" / f"bench-{timestamp}.json"
+    path_output.parent.mkdir(parents=True, exist_ok=True)
+    path_output.write_text(json.dumps(output, indent=2))
+    print(f"results written to {path_output}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), output)
+
+
+if __name__ == "__main__":
+    main()